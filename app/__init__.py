@@ -0,0 +1,6 @@
+# /app/__init__.py
+import time
+
+# First thing run when the app is imported: the reference point of the
+# import-to-ready time reported by app.startup.
+IMPORT_STARTED = time.perf_counter()
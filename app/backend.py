@@ -0,0 +1,21 @@
+# /app/backend.py
+"""The implementation of the crud interface the routes call.
+
+``store`` is app.crud (the database) unless something installs another
+implementation with ``use``, e.g. a ``repository.MemoryRepository(notify=True)``
+so benchmarks can measure the app without the database. Routes look
+``backend.store`` up on every call, so a swap takes effect immediately.
+"""
+from types import ModuleType
+from typing import Any, Union
+
+from . import crud
+
+store: Union[ModuleType, Any] = crud
+
+
+def use(implementation: Union[ModuleType, Any]) -> Union[ModuleType, Any]:
+    """Make ``implementation`` the store; return the previous one."""
+    global store
+    previous, store = store, implementation
+    return previous
@@ -0,0 +1,195 @@
+# /app/core/admission.py
+"""Load shedding: in-flight limits and per-client token buckets.
+
+``AdmissionMiddleware`` caps the requests being served at once, overall
+and per route (``AdmissionControl``), and answers the excess with an
+immediate 503 instead of letting every request slow down together. The
+in-flight counters are only touched on the event loop thread, so they
+need no lock.
+
+``RateLimiter`` gives each client (authenticated subject or IP address) a
+token bucket; an empty bucket means 429. Bucket state lives behind
+``RateLimitStore`` so a shared store can replace the in-process one when
+several workers must enforce one limit.
+"""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .config import settings
+
+
+class RateLimitStore(ABC):
+    """Token bucket state for ``RateLimiter``.
+
+    ``take`` must be atomic per key; a shared store would run it
+    server-side (e.g. as a Redis script).
+    """
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Take a token from ``key``'s bucket.
+
+        Return 0.0 if one was available, else the seconds until there is one.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """In-process buckets, at most ``max_keys`` of them (least recently used go first).
+
+    An evicted bucket comes back full, which only ever errs towards
+    admitting a request.
+    """
+
+    def __init__(self, max_keys: int = 65536):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            if tokens >= 1.0:
+                tokens -= 1.0
+                wait = 0.0
+            else:
+                wait = (1.0 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class RateLimiter:
+    """``rate`` requests per second per key, with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int, store: Optional[RateLimitStore] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.store = store if store is not None else MemoryRateLimitStore()
+        self.clock = clock
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, key: str) -> float:
+        """0.0 if ``key`` may proceed, else the seconds it should wait."""
+        if not self.enabled:
+            return 0.0
+        wait = self.store.take(key, self.rate, self.burst, self.clock())
+        if wait:
+            self.rejected += 1
+        return wait
+
+
+def retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+# Authenticated callers, keyed on the token subject (dependencies.get_current_user).
+user_rate_limiter = RateLimiter(settings.RATE_LIMIT_USER_PER_SECOND, settings.RATE_LIMIT_USER_BURST)
+# Unauthenticated entry points (login, sign-up), keyed on the client address.
+client_rate_limiter = RateLimiter(settings.RATE_LIMIT_IP_PER_SECOND, settings.RATE_LIMIT_IP_BURST)
+
+
+# ----------------------------------------------------------------------------
+# In-flight limits and their ASGI middleware
+# ----------------------------------------------------------------------------
+
+class AdmissionControl:
+    """In-flight limits: ``max_in_flight`` overall (0: unlimited) and per path.
+
+    ``route_limits`` maps request paths (e.g. "/api/v1/token") to their own
+    in-flight limit, checked on top of the global one. ``exempt_paths`` are
+    always admitted and not counted: long-lived streams would otherwise
+    hold slots for as long as they stay open.
+    """
+
+    def __init__(self, max_in_flight: int = 0, route_limits: Optional[Dict[str, int]] = None,
+                 exempt_paths: Iterable[str] = ()):
+        self.max_in_flight = max_in_flight
+        self.route_limits = dict(route_limits or {})
+        self.exempt_paths = frozenset(exempt_paths)
+        self.in_flight = 0
+        self.route_in_flight: Dict[str, int] = {path: 0 for path in self.route_limits}
+        self.rejected: Dict[str, int] = {"global": 0, "route": 0}
+
+    def admit(self, path: str) -> bool:
+        if path in self.exempt_paths:
+            return True
+        route_limit = self.route_limits.get(path)
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self.rejected["global"] += 1
+            return False
+        if route_limit is not None and self.route_in_flight[path] >= route_limit:
+            self.rejected["route"] += 1
+            return False
+        self.in_flight += 1
+        if route_limit is not None:
+            self.route_in_flight[path] += 1
+        return True
+
+    def release(self, path: str) -> None:
+        if path in self.exempt_paths:
+            return
+        self.in_flight -= 1
+        if path in self.route_in_flight:
+            self.route_in_flight[path] -= 1
+
+
+admission = AdmissionControl(
+    settings.ADMISSION_MAX_IN_FLIGHT, settings.ADMISSION_ROUTE_LIMITS, settings.ADMISSION_EXEMPT_PATHS
+)
+
+
+class AdmissionMiddleware:
+    """Answer requests ``control`` does not admit with an immediate 503.
+
+    Runs before routing, so a shed request costs no database work.
+    """
+
+    def __init__(self, app, control: AdmissionControl = admission):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if not self.control.admit(path):
+            await _service_unavailable(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.control.release(path)
+
+
+async def _service_unavailable(send) -> None:
+    body = b'{"detail":"Server busy, retry shortly"}'
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", b"1"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
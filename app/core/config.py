@@ -1,11 +1,79 @@
 # /app/core/config.py
 import os
+from typing import Dict, List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     SECRET_KEY: str = "mysecretkey"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Per-route latency/DB middleware and /api/v1/metrics
+    METRICS_ENABLED: bool = True
+    # Verified-claims cache in front of jwt.decode (see core/token_cache.py)
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAXSIZE: int = 4096
+    # bcrypt executor: worker threads and max calls running or queued (0: unlimited)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    # Per-owner versioned cache of GET /tasks/ pages (see core/response_cache.py)
+    TASK_LIST_CACHE_ENABLED: bool = True
+    TASK_LIST_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # How long a cached page may be served (0: until invalidated). Writes on
+    # other workers do not invalidate this one's pages; this bounds the lag.
+    TASK_LIST_CACHE_TTL_SECONDS: float = 5.0
+    # Identical concurrent task reads share one query (see core/singleflight.py)
+    COALESCE_READS_ENABLED: bool = True
+    # GET /tasks/stream (see app/events.py): open streams per worker (0:
+    # unlimited), frames a stream may fall behind before it is closed, and
+    # the keep-alive interval in seconds.
+    TASK_STREAM_MAX_SUBSCRIBERS: int = 50000
+    TASK_STREAM_MAX_PENDING: int = 64
+    TASK_STREAM_KEEPALIVE_SECONDS: float = 15.0
+
+    # Admission control (see core/admission.py): requests served at once,
+    # overall (0: unlimited) and per path, beyond which requests get 503.
+    ADMISSION_MAX_IN_FLIGHT: int = 512
+    ADMISSION_ROUTE_LIMITS: Dict[str, int] = {"/api/v1/token": 32, "/api/v1/users/": 32}
+    # Long-lived paths left out of the in-flight counts (they have their own limits).
+    ADMISSION_EXEMPT_PATHS: List[str] = ["/api/v1/tasks/stream"]
+    # Token buckets (requests per second, burst; 0/s disables): per token
+    # subject on authenticated routes, per client IP on login and sign-up.
+    RATE_LIMIT_USER_PER_SECOND: float = 50.0
+    RATE_LIMIT_USER_BURST: int = 100
+    RATE_LIMIT_IP_PER_SECOND: float = 5.0
+    RATE_LIMIT_IP_BURST: int = 20
+
+    # Startup: what to do with the schema ("create", "check" or "skip", see
+    # app/startup.py), whether to warm up before serving and how many pool
+    # connections to open per engine while doing so.
+    SCHEMA_MODE: str = "create"
+    STARTUP_WARMUP: bool = True
+    STARTUP_WARM_CONNECTIONS: int = 2
+
+    # Database
+    DATABASE_URL: str = "sqlite:///./test.db"
+    # "sync": blocking engine, CRUD calls offloaded to the threadpool.
+    # "async": AsyncEngine/AsyncSession (aiosqlite for SQLite).
+    DATABASE_MODE: str = "sync"
+    # SQLite storage profile applied to every new connection ("default",
+    # "wal" or "performance", see database.SQLITE_PROFILES). The SQLITE_*
+    # settings below override single pragmas of the chosen profile.
+    SQLITE_PROFILE: str = "wal"
+    SQLITE_JOURNAL_MODE: Optional[str] = None
+    SQLITE_SYNCHRONOUS: Optional[str] = None
+    SQLITE_MMAP_SIZE: Optional[int] = None
+    SQLITE_CACHE_SIZE: Optional[int] = None
+    SQLITE_TEMP_STORE: Optional[str] = None
+    SQLITE_BUSY_TIMEOUT_MS: Optional[int] = None
+    # Read replicas (JSON list of URLs) used by GET routes, and how long a
+    # user's reads stay on the primary after they write (read-your-writes).
+    READ_DATABASE_URLS: List[str] = []
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # Max items accepted by the /tasks/bulk endpoints
+    BULK_MAX_ITEMS: int = 1000
+    # Rows per fetch (and per streamed chunk) in /tasks/export
+    EXPORT_BATCH_SIZE: int = 1000
 
     class Config:
         env_file = ".env"
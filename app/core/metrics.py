@@ -0,0 +1,198 @@
+# /app/core/metrics.py
+"""Per-route latency and database metrics in Prometheus text format.
+
+Nothing here takes a lock. Route histograms and counters are only updated by
+``MetricsMiddleware``, which runs on the event loop thread. The cursor
+hooks, which may fire on threadpool threads, only touch the ``RequestStats``
+object of their own request, and the middleware folds it into the route
+totals once the request completes.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+EVENT_STREAM = b"text/event-stream"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+class RouteDBStats:
+    __slots__ = ("queries", "db_seconds", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.db_time = Histogram()
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.db: Dict[Tuple[str, str], RouteDBStats] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """Register a callable yielding extra exposition lines (HELP/TYPE included)."""
+        self._collectors.append(collector)
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route, str(status))
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(seconds)
+
+        db_stats = self.db.get((method, route))
+        if db_stats is None:
+            db_stats = self.db[(method, route)] = RouteDBStats()
+        db_stats.queries += stats.queries
+        db_stats.db_seconds += stats.db_seconds
+        db_stats.db_time.observe(stats.db_seconds)
+
+    def reset(self) -> None:
+        self.latency.clear()
+        self.db.clear()
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route template and status code.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), histogram in sorted(self.latency.items()):
+            lines.extend(_histogram_lines(
+                "http_request_duration_seconds", histogram,
+                f'method="{method}",route="{_escape(route)}",status="{status}"',
+            ))
+        lines += [
+            "# HELP http_db_queries_total SQL statements executed while serving the route.",
+            "# TYPE http_db_queries_total counter",
+        ]
+        for (method, route), db_stats in sorted(self.db.items()):
+            lines.append(f'http_db_queries_total{{method="{method}",route="{_escape(route)}"}} {db_stats.queries}')
+        lines += [
+            "# HELP http_db_duration_seconds Time spent in the database per request.",
+            "# TYPE http_db_duration_seconds histogram",
+        ]
+        for (method, route), db_stats in sorted(self.db.items()):
+            lines.extend(_histogram_lines(
+                "http_db_duration_seconds", db_stats.db_time, f'method="{method}",route="{_escape(route)}"',
+            ))
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: str) -> Iterable[str]:
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+    yield f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}'
+    yield f"{name}_sum{{{labels}}} {histogram.sum}"
+    yield f"{name}_count{{{labels}}} {histogram.count}"
+
+
+registry = MetricsRegistry()
+
+
+# ----------------------------------------------------------------------------
+# SQLAlchemy hooks
+# ----------------------------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count statements and database time of ``engine`` towards the current request."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ----------------------------------------------------------------------------
+# ASGI middleware
+# ----------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        elapsed = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, elapsed
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # An event stream stays open for as long as the client
+                # listens: time it to the start of the response, not its end.
+                if dict(message.get("headers", ())).get(b"content-type", b"").startswith(EVENT_STREAM):
+                    elapsed = time.perf_counter() - start
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if elapsed is None:
+                elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = scope.get("route")
+            # Label by route template, never by raw path, to bound cardinality.
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            self.registry.record(scope["method"], path, status_code, elapsed, stats)
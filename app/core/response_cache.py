@@ -0,0 +1,173 @@
+# /app/core/response_cache.py
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+
+
+class CacheBackend(ABC):
+    """Storage behind ``VersionedCache``.
+
+    Values are opaque bytes so a shared store (Redis, memcached) can
+    implement the same four operations. ``bump`` must be atomic.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def version(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    def bump(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class MemoryLRUCache(CacheBackend):
+    """In-process LRU bounded by the total size of the stored values.
+
+    Version counters are kept apart from the LRU: evicting one would reset
+    it and could resurrect pages cached under an old version.
+
+    The counters only see this process's writes, so with several workers a
+    page can outlive a write made on another one. ``ttl`` (seconds, 0 for
+    none) bounds how long that can last.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 0.0, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.size_bytes = 0
+        self.evictions = 0
+        # key -> (expiry, value); the expiry is None without a ttl.
+        self._entries: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires <= self.clock():
+                del self._entries[key]
+                self.size_bytes -= len(value)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        expires = self.clock() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous[1])
+            self._entries[key] = (expires, value)
+            self.size_bytes += len(value)
+            while self.size_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: str) -> int:
+        with self._lock:
+            version = self._versions.get(namespace, 0) + 1
+            self._versions[namespace] = version
+            return version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.size_bytes = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self.size_bytes, "evictions": self.evictions}
+
+
+class VersionedCache:
+    """Cache keyed by ``(namespace, version, params)``.
+
+    ``invalidate`` bumps the namespace's version, so every entry cached
+    under the old one stops being reachable at once and simply ages out of
+    the backend. Bump *after* the write commits: a reader that saw the old
+    version can then only store its page under a key nobody asks for again.
+    """
+
+    def __init__(self, prefix: str, backend: Optional[CacheBackend] = None):
+        self.prefix = prefix
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def key(self, namespace: Any, *params: Any) -> Optional[str]:
+        if self.backend is None:
+            return None
+        namespace = f"{self.prefix}:{namespace}"
+        return f"{namespace}:v{self.backend.version(namespace)}:" + ":".join(repr(param) for param in params)
+
+    def get(self, key: Optional[str]) -> Optional[bytes]:
+        if key is None:
+            return None
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: Optional[str], value: bytes) -> None:
+        if key is not None:
+            self.backend.set(key, value)
+
+    def invalidate(self, namespace: Any) -> None:
+        if self.backend is not None:
+            self.backend.bump(f"{self.prefix}:{namespace}")
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        backend = self.backend.stats() if self.backend is not None else {}
+        return {"hits": self.hits, "misses": self.misses, **backend}
+
+
+# Listing pages of GET /tasks/, namespaced by owner id.
+task_list_cache = VersionedCache(
+    "tasks",
+    MemoryLRUCache(settings.TASK_LIST_CACHE_MAX_BYTES, settings.TASK_LIST_CACHE_TTL_SECONDS)
+    if settings.TASK_LIST_CACHE_ENABLED else None,
+)
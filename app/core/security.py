@@ -1,14 +1,78 @@
 # /app/core/security.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.token_cache import TokenCache
 
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_MAXSIZE)
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+class PasswordHasher:
+    """Dedicated, size-limited executor for bcrypt.
+
+    bcrypt releases the GIL, so a small thread pool gives real parallelism
+    while keeping hashing off the event loop and out of the threadpool that
+    serves the CRUD routes. At most ``max_pending`` calls (running or queued)
+    are admitted, 0 meaning no limit; beyond that ``PasswordHasherBusy`` is
+    raised immediately.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending > 0 else None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="password-hasher"
+                    )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        slots = self._slots
+        if slots is not None and not slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
@@ -24,9 +88,33 @@ def create_access_token(
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """Verify ``token`` and return its claims; raises ``jose.JWTError``.
+
+    Repeated tokens are answered from ``token_cache`` without re-running the
+    HMAC check until the token expires.
+    """
+    if settings.TOKEN_CACHE_ENABLED:
+        claims = token_cache.get(token)
+        if claims is not None:
+            return claims
+    claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if settings.TOKEN_CACHE_ENABLED:
+        token_cache.set(token, claims)
+    return claims
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    return await password_hasher.run(get_password_hash, password)
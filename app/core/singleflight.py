@@ -0,0 +1,90 @@
+# /app/core/singleflight.py
+"""Coalesce identical concurrent reads into one computation.
+
+The first request for a key (the leader) runs the read; requests for the
+same key that arrive while it is running wait for it and share its
+result, exceptions included. Nothing is kept once the leader finishes:
+this is not a cache, only de-duplication of work already in flight.
+
+Keys carry a per-namespace generation, as ``VersionedCache`` keys carry a
+version: ``invalidate`` after a write commits, and later requests start a
+new flight instead of joining one that may have read the old data.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .config import settings
+
+
+class SingleFlight:
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self.executions = 0
+        self.coalesced = 0
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._generations: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def key(self, namespace: Any, *params: Any) -> Hashable:
+        return (namespace, self._generations.get(namespace, 0), params)
+
+    def invalidate(self, namespace: Any) -> None:
+        # Called from crud, possibly on a threadpool thread.
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """``await compute()``, or the result of the flight already running for ``key``."""
+        if not self.enabled:
+            return await compute()
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is not None and flight.get_loop() is loop:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # The leader was cancelled (its client went away), not us:
+                # do the read ourselves.
+        return await self._lead(key, compute, loop)
+
+    async def _lead(self, key: Hashable, compute: Callable[[], Awaitable[Any]], loop) -> Any:
+        flight = loop.create_future()
+        self._flights[key] = flight
+        self.executions += 1
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            # Followers retrieve it; mark it retrieved in case there are none.
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def clear(self) -> None:
+        self._flights.clear()
+        with self._lock:
+            self._generations.clear()
+        self.executions = 0
+        self.coalesced = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+
+# Reads of GET /tasks/{task_id} and GET /tasks/ (on a cache miss), namespaced
+# by owner id; crud._tasks_changed invalidates them with the listing cache.
+task_read_flights = SingleFlight("task", settings.COALESCE_READS_ENABLED)
+task_list_flights = SingleFlight("task_list", settings.COALESCE_READS_ENABLED)
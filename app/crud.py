@@ -1,8 +1,24 @@
 # /app/crud.py
+import functools
+import re
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Row, Select, String, and_, case, delete, func, insert, literal_column, null, or_, select, type_coerce,
+    union_all, update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
 from . import models, schemas
+from .core.response_cache import task_list_cache
+from .core.singleflight import task_list_flights, task_read_flights
 from .core.security import get_password_hash
+from .events import task_events
 
 # ============================================================================
 # CRUD - USUÁRIOS
@@ -17,44 +33,497 @@ def get_user_by_email(db: Session, email: str):
 def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.User).offset(skip).limit(limit).all()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(email=user.email, hashed_password=hashed_password)
-    db.add(db_user)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    """Insert the user with a single INSERT ... RETURNING.
+
+    Returns None when the email is already registered: the unique constraint
+    decides, so there is no pre-SELECT (and no race between check and insert).
+    """
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
+    try:
+        db_user = db.scalars(
+            insert(models.User)
+            .values(email=user.email, hashed_password=hashed_password)
+            .returning(models.User)
+        ).one()
+    except IntegrityError:
+        db.rollback()
+        return None
     db.commit()
-    db.refresh(db_user)
     return db_user
 
+def load_user_tasks(db: Session, db_user: models.User, limit: int):
+    """Populate ``db_user.tasks`` with at most ``limit`` tasks, ordered by id.
+
+    ``User.tasks`` is ``raise_on_sql``, and an eager ``selectinload`` cannot
+    be bounded per parent. This is the same IN-style load for a single user,
+    with a LIMIT, served by ix_tasks_owner_id_id.
+    """
+    tasks = get_tasks_by_owner(db, owner_id=db_user.id, limit=limit)
+    set_committed_value(db_user, "tasks", tasks)
+    return tasks
+
 # ============================================================================
 # CRUD - TAREFAS
 # ============================================================================
 
+def _tasks_changed(*owner_ids: int) -> None:
+    # Every task write ends here, after its commit: drops the owners' cached
+    # listing pages (see core/response_cache.VersionedCache) and keeps later
+    # reads from joining flights started before the write.
+    for owner_id in set(owner_ids):
+        task_list_cache.invalidate(owner_id)
+        task_read_flights.invalidate(owner_id)
+        task_list_flights.invalidate(owner_id)
+
+def _publish(event: str, *db_tasks: models.Task) -> None:
+    # After the commit as well: a stream must never announce a write that
+    # was rolled back.
+    for db_task in db_tasks:
+        task_events.publish(event, db_task)
+
 def get_task(db: Session, task_id: int):
     return db.query(models.Task).filter(models.Task.id == task_id).first()
 
 def get_tasks(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Task).offset(skip).limit(limit).all()
 
-def get_tasks_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Task).filter(models.Task.owner_id == owner_id).offset(skip).limit(limit).all()
+# Listing order: (column name, descending) pairs. id always closes the order
+# so it is total and a keyset cursor (the last row's key values) is exact.
+TASK_SORT_KEYS = ("priority", "created_at", "id")
+
+def task_listing_order(sort: Sequence[Tuple[str, bool]] = ()) -> List[Tuple[str, bool]]:
+    order = []
+    for name, descending in sort:
+        order.append((name, descending))
+        if name == "id":
+            return order
+    # Same direction as the last key, so an index on the sort keys (which
+    # holds rowids in ascending order) can still be read in one direction.
+    order.append(("id", order[-1][1] if order else False))
+    return order
+
+def _after_clause(order: Sequence[Tuple[str, bool]], values: Sequence[Any]):
+    """Rows strictly after the key ``values`` in ``order``."""
+    columns = [getattr(models.Task, name) for name, _ in order]
+    clauses = []
+    for i, (column, (_, descending)) in enumerate(zip(columns, order)):
+        ties = [previous == value for previous, value in zip(columns[:i], values)]
+        clauses.append(and_(*ties, column < values[i] if descending else column > values[i]))
+    if len(clauses) == 1:
+        return clauses[0]
+    # Redundant bound on the leading key: lets the index seek to the page
+    # instead of filtering from the start of the owner's range.
+    leading = columns[0] <= values[0] if order[0][1] else columns[0] >= values[0]
+    return and_(leading, or_(*clauses))
+
+def _task_filter_clauses(filters: schemas.TaskFilter) -> list:
+    clauses = []
+    if filters.completed is not None:
+        clauses.append(models.Task.completed == filters.completed)
+    if filters.priority_min is not None:
+        clauses.append(models.Task.priority >= filters.priority_min)
+    if filters.priority_max is not None:
+        clauses.append(models.Task.priority <= filters.priority_max)
+    if filters.created_after is not None:
+        clauses.append(models.Task.created_at > filters.created_after)
+    if filters.created_before is not None:
+        clauses.append(models.Task.created_at < filters.created_before)
+    return clauses
+
+def task_listing_statement(
+    owner_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Sequence[Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[schemas.TaskFilter] = None,
+    sort: Sequence[Tuple[str, bool]] = (),
+) -> Select:
+    """SELECT for one page of ``owner_id``'s tasks.
+
+    ``after`` holds the key values (see task_listing_order) of the last row
+    of the previous page; without it the legacy ``skip`` offset applies.
+    ``columns`` narrows the SELECT to those Task columns.
+    """
+    order = task_listing_order(sort)
+    entities = [getattr(models.Task, name) for name in columns] if columns else [models.Task]
+    statement = select(*entities).where(models.Task.owner_id == owner_id)
+    if filters is not None:
+        statement = statement.where(*_task_filter_clauses(filters))
+    if after is not None:
+        statement = statement.where(_after_clause(order, after))
+    else:
+        statement = statement.offset(skip)
+    sort_columns = [getattr(models.Task, name) for name, _ in order]
+    return statement.order_by(
+        *[column.desc() if descending else column for column, (_, descending) in zip(sort_columns, order)]
+    ).limit(limit)
+
+def get_tasks_by_owner(
+    db: Session,
+    owner_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Sequence[Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[schemas.TaskFilter] = None,
+    sort: Sequence[Tuple[str, bool]] = (),
+):
+    # Every supported filter/sort combination is served by one of the
+    # (owner_id, ...) indexes on models.Task; see test_tasks' query plan test.
+    # With ``columns`` the result is plain rows instead of ORM objects.
+    statement = task_listing_statement(owner_id, skip, limit, after, columns, filters, sort)
+    if columns:
+        return db.execute(statement).all()
+    return db.scalars(statement).all()
+
+# Full-text search (models.tasks_fts). Query words are reduced to quoted
+# FTS5 terms, so user input can never be read as query syntax; the last one
+# is a prefix term for search-as-you-type.
+#
+# Ranking: title hits first, then description-only hits, newest first within
+# each. Both are computed on the owner-scoped match set. FTS5's bm25() is
+# avoided on purpose: it counts every phrase across the whole index to get
+# its IDF, which for a common word means scanning millions of entries.
+SEARCH_MAX_TERMS = 16
+_SEARCH_WORD = re.compile(r"\w+")
+
+def _search_terms(q: str) -> Optional[str]:
+    terms = [f'"{word}"' for word in _SEARCH_WORD.findall(q)[:SEARCH_MAX_TERMS]]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return f"({' AND '.join(terms)})"
+
+def _fts_match(expression: str):
+    return literal_column("tasks_fts").op("MATCH")(expression)
+
+def search_tasks_by_owner(db: Session, owner_id: int, q: str, skip: int = 0, limit: int = 20):
+    terms = _search_terms(q)
+    if terms is None:
+        return []
+    owner = f'owner_id : "{int(owner_id)}"'
+    rowid = models.tasks_fts.c.rowid
+    title_hits = select(rowid).where(_fts_match(f"{owner} AND title : {terms}"))
+    # Rank and page inside the index; only the page's rows are read from tasks.
+    hits = (
+        select(rowid.label("id"), rowid.in_(title_hits).label("title_hit"))
+        .where(_fts_match(f"{owner} AND {{title description}} : {terms}"))
+        .order_by(literal_column("title_hit").desc(), rowid.desc())
+        .offset(skip)
+        .limit(limit)
+        .subquery()
+    )
+    return db.scalars(
+        select(models.Task)
+        .join(hits, hits.c.id == models.Task.id)
+        .order_by(hits.c.title_hit.desc(), hits.c.id.desc())
+    ).all()
 
 def create_user_task(db: Session, task: schemas.TaskCreate, user_id: int):
-    db_task = models.Task(**task.model_dump(), owner_id=user_id)
-    db.add(db_task)
+    db_task = db.scalars(
+        insert(models.Task).values(**task.model_dump(), owner_id=user_id).returning(models.Task)
+    ).one()
     db.commit()
-    db.refresh(db_task)
+    _tasks_changed(user_id)
+    _publish("created", db_task)
     return db_task
 
-def update_task(db: Session, db_task: models.Task, task_in: schemas.TaskUpdate):
-    task_data = task_in.model_dump(exclude_unset=True)
-    for key, value in task_data.items():
-        setattr(db_task, key, value)
-    db.add(db_task)
+def _counter_filter_clauses(filters: Optional[schemas.TaskFilter]) -> Optional[list]:
+    """``filters`` as conditions on task_counters; None if they need tasks itself."""
+    if filters is None:
+        return []
+    if filters.created_after is not None or filters.created_before is not None:
+        return None
+    clauses = []
+    if filters.completed is not None:
+        clauses.append(models.TaskCounter.completed == filters.completed)
+    if filters.priority_min is not None:
+        clauses.append(models.TaskCounter.priority >= filters.priority_min)
+    if filters.priority_max is not None:
+        clauses.append(models.TaskCounter.priority <= filters.priority_max)
+    return clauses
+
+def _counted(owner_id: int, *clauses):
+    return (
+        select(func.coalesce(func.sum(models.TaskCounter.count), 0))
+        .where(models.TaskCounter.owner_id == owner_id, *clauses)
+        .scalar_subquery()
+    )
+
+def get_task_list_version(db: Session, owner_id: int, filters: Optional[schemas.TaskFilter] = None) -> Row:
+    """(count, created_at, updated_at, total) for the owner's listings.
+
+    ``count`` is the owner's number of tasks and ``created_at``/``updated_at``
+    the newest of each; list ETags are built from them. ``total`` is how many
+    tasks match ``filters`` (X-Total-Count), or None when a created_at bound
+    makes it more than a counter lookup. Counts come from task_counters and
+    each MAX is a single seek on its (owner_id, ...) index, so this is much
+    cheaper than fetching a page.
+    """
+    owned = models.Task.owner_id == owner_id
+    counted = _counter_filter_clauses(filters)
+    return db.execute(
+        select(
+            _counted(owner_id).label("count"),
+            select(func.max(models.Task.created_at)).where(owned).scalar_subquery().label("created_at"),
+            select(func.max(models.Task.updated_at)).where(owned).scalar_subquery().label("updated_at"),
+            (_counted(owner_id, *counted) if counted is not None else literal_column("NULL")).label("total"),
+        )
+    ).one()
+
+def get_task_stats(db: Session, owner_id: int) -> schemas.TaskStats:
+    """Totals of the owner's tasks, read from its task_counters buckets."""
+    buckets = db.execute(
+        select(models.TaskCounter.priority, models.TaskCounter.completed, models.TaskCounter.count)
+        .where(models.TaskCounter.owner_id == owner_id, models.TaskCounter.count != 0)
+    ).all()
+    by_priority: Dict[int, int] = {}
+    for priority, _, count in buckets:
+        by_priority[priority] = by_priority.get(priority, 0) + count
+    completed = sum(count for _, done, count in buckets if done)
+    total = sum(count for _, _, count in buckets)
+    return schemas.TaskStats(
+        total=total, completed=completed, open=total - completed, by_priority=dict(sorted(by_priority.items()))
+    )
+
+# The owner-scoped writes below are one UPDATE/DELETE ... WHERE id = ? AND
+# owner_id = ? RETURNING statement. They return None when no row matched;
+# the caller can then tell 404 from 403 with get_task_owners, off the hot path.
+# ``versions`` (from If-Match) adds "AND the task's last change is one of
+# these" to the same statement, so the check and the write are atomic.
+
+# Versions are matched as text in one format. SQLAlchemy stores
+# 'YYYY-MM-DD HH:MM:SS.ffffff', but the func.now() server default (every
+# row from before ETags, and raw inserts) stores 'YYYY-MM-DD HH:MM:SS';
+# the stored side is padded to microseconds before the comparison.
+_VERSION_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+def _task_version_text():
+    stored = type_coerce(func.coalesce(models.Task.updated_at, models.Task.created_at), String)
+    return case((func.length(stored) == 19, stored + ".000000"), else_=stored)
+
+def _owned_task_clause(task_id: int, user_id: int, versions: Optional[List[datetime]]):
+    clause = [models.Task.id == task_id, models.Task.owner_id == user_id]
+    if versions is not None:
+        clause.append(_task_version_text().in_([version.strftime(_VERSION_FORMAT) for version in versions]))
+    return clause
+
+def update_user_task(
+    db: Session, task_id: int, user_id: int, values: Dict[str, Any], versions: Optional[List[datetime]] = None
+):
+    if not values:
+        return get_user_task(db, task_id=task_id, user_id=user_id, versions=versions)
+    db_task = db.scalars(
+        update(models.Task)
+        .where(*_owned_task_clause(task_id, user_id, versions))
+        .values(**values)
+        .returning(models.Task)
+    ).one_or_none()
     db.commit()
-    db.refresh(db_task)
+    if db_task is not None:
+        _tasks_changed(user_id)
+        _publish("updated", db_task)
     return db_task
 
-def delete_task(db: Session, db_task: models.Task):
-    db.delete(db_task)
+def delete_user_task(db: Session, task_id: int, user_id: int, versions: Optional[List[datetime]] = None):
+    db_task = db.scalars(
+        delete(models.Task)
+        .where(*_owned_task_clause(task_id, user_id, versions))
+        .returning(models.Task)
+    ).one_or_none()
+    if db_task is not None:
+        # Detach the RETURNING snapshot so commit cannot expire it.
+        db.expunge(db_task)
     db.commit()
+    if db_task is not None:
+        _tasks_changed(user_id)
+        _publish("deleted", db_task)
     return db_task
+
+def get_user_task(db: Session, task_id: int, user_id: int, versions: Optional[List[datetime]] = None):
+    return db.query(models.Task).filter(*_owned_task_clause(task_id, user_id, versions)).first()
+
+# Plain column rows (no ORM identity map) for streaming exports.
+TASK_EXPORT_COLUMNS = (
+    models.Task.id,
+    models.Task.title,
+    models.Task.description,
+    models.Task.priority,
+    models.Task.completed,
+    models.Task.owner_id,
+    models.Task.created_at,
+    models.Task.updated_at,
+)
+
+def _task_export_statement(owner_id: int, batch_size: int):
+    return (
+        select(*TASK_EXPORT_COLUMNS)
+        .where(models.Task.owner_id == owner_id)
+        .order_by(models.Task.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+def iter_task_batches_by_owner(db: Session, owner_id: int, batch_size: int = 1000) -> Iterator[Sequence[Row]]:
+    """Yield the owner's tasks in batches read from a server-side cursor."""
+    result = db.execute(_task_export_statement(owner_id, batch_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+async def aiter_task_batches_by_owner(db, owner_id: int, batch_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+    if isinstance(db, AsyncSession):
+        result = await db.stream(_task_export_statement(owner_id, batch_size))
+        try:
+            async for batch in result.partitions():
+                yield batch
+        finally:
+            await result.close()
+    else:
+        async for batch in iterate_in_threadpool(iter_task_batches_by_owner(db, owner_id, batch_size)):
+            yield batch
+
+# ============================================================================
+# CRUD - FEED DE ALTERAÇÕES
+# ============================================================================
+# Tasks and tombstones changed after a change_seq, merged in change_seq
+# order by a single UNION ALL: one statement reads one SQLite snapshot, so
+# no change can fall between the two halves. Each half walks its
+# (owner_id, change_seq) index from ``since`` and stops after ``limit`` rows.
+
+def task_changes_statement(owner_id: int, since: int, limit: int):
+    changed = select(
+        *TASK_EXPORT_COLUMNS,
+        models.Task.change_seq,
+        type_coerce(null(), models.TaskTombstone.deleted_at.type).label("deleted_at"),
+    ).where(models.Task.owner_id == owner_id, models.Task.change_seq > since)
+    tombstone = models.TaskTombstone
+    deleted = select(
+        tombstone.id, null(), null(), null(), null(), tombstone.owner_id, null(), null(),
+        tombstone.change_seq, tombstone.deleted_at,
+    ).where(tombstone.owner_id == owner_id, tombstone.change_seq > since)
+    return union_all(changed, deleted).order_by("change_seq").limit(limit)
+
+def get_task_changes(db: Session, owner_id: int, since: int = 0, limit: int = 100) -> List[Row]:
+    """The owner's task changes after ``since``, oldest first.
+
+    Rows carry the task's columns plus ``change_seq`` and ``deleted_at``;
+    a deleted task has ``deleted_at`` set and only ``id``/``owner_id``.
+    """
+    return db.execute(task_changes_statement(owner_id, since, limit)).all()
+
+# ============================================================================
+# CRUD - TAREFAS EM LOTE
+# ============================================================================
+# One statement per batch and a single commit: inserts and updates are sent
+# as executemany, ownership is resolved with one SELECT.
+
+def get_task_owners(db: Session, task_ids: List[int]) -> Dict[int, int]:
+    """Map each existing id in ``task_ids`` to its owner_id."""
+    if not task_ids:
+        return {}
+    rows = db.execute(
+        select(models.Task.id, models.Task.owner_id).where(models.Task.id.in_(set(task_ids)))
+    )
+    return {task_id: owner_id for task_id, owner_id in rows}
+
+def create_user_tasks(db: Session, tasks: List[schemas.TaskCreate], user_id: int) -> List[models.Task]:
+    if not tasks:
+        return []
+    rows = [{**task.model_dump(), "owner_id": user_id} for task in tasks]
+    # Sent as batched multi-row INSERT ... RETURNING. SQLite does not promise
+    # RETURNING order, but ids are assigned in VALUES order, so sorting by id
+    # restores the request order (sort_by_parameter_order would instead fall
+    # back to one statement per row).
+    db_tasks = db.scalars(insert(models.Task).returning(models.Task), rows).all()
+    db.commit()
+    _tasks_changed(user_id)
+    db_tasks = sorted(db_tasks, key=lambda db_task: db_task.id)
+    _publish("created", *db_tasks)
+    return db_tasks
+
+def update_tasks(db: Session, values: List[Dict[str, Any]], owner_id: Optional[int] = None) -> List[models.Task]:
+    """Apply ``values`` (dicts holding ``id`` plus the columns to set) by primary key.
+
+    With ``owner_id`` only that owner's tasks are written; ids that match
+    none (deleted meanwhile, or someone else's) are left out of the result.
+    """
+    if not values:
+        return []
+    statement, scope = update(models.Task), []
+    if owner_id is not None:
+        scope = [models.Task.owner_id == owner_id]
+        # The returned rows are re-read below; nothing in the session to sync.
+        statement = statement.where(*scope).execution_options(synchronize_session=None)
+    db.execute(statement, values)
+    db_tasks = db.scalars(
+        select(models.Task)
+        .where(models.Task.id.in_({row["id"] for row in values}), *scope)
+        .execution_options(populate_existing=True)
+    ).all()
+    db.commit()
+    _tasks_changed(*(db_task.owner_id for db_task in db_tasks))
+    _publish("updated", *db_tasks)
+    return db_tasks
+
+def delete_tasks(db: Session, task_ids: List[int], owner_id: Optional[int] = None) -> List[models.Task]:
+    """Delete ``task_ids``, only ``owner_id``'s when given; returns the deleted rows."""
+    if not task_ids:
+        return []
+    scope = [] if owner_id is None else [models.Task.owner_id == owner_id]
+    db_tasks = db.scalars(
+        delete(models.Task).where(models.Task.id.in_(set(task_ids)), *scope).returning(models.Task)
+    ).all()
+    # Detach the RETURNING snapshots so commit cannot expire them.
+    for db_task in db_tasks:
+        db.expunge(db_task)
+    db.commit()
+    _tasks_changed(*(db_task.owner_id for db_task in db_tasks))
+    _publish("deleted", *db_tasks)
+    return db_tasks
+
+# ============================================================================
+# CRUD - ASSÍNCRONO
+# ============================================================================
+# The async variants below are the API used by the routers. The query logic
+# lives once, in the sync functions above:
+#   - with an AsyncSession they run through ``AsyncSession.run_sync``, i.e.
+#     on the event loop with non-blocking driver I/O (aiosqlite);
+#   - with a plain Session they are offloaded to the threadpool, so the
+#     thread is only held for the database round trip itself.
+
+def _async_variant(func):
+    @functools.wraps(func)
+    async def wrapper(db, *args, **kwargs):
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(func, *args, **kwargs)
+        return await run_in_threadpool(func, db, *args, **kwargs)
+
+    wrapper.__name__ = wrapper.__qualname__ = f"a{func.__name__}"
+    return wrapper
+
+aget_user = _async_variant(get_user)
+aget_user_by_email = _async_variant(get_user_by_email)
+aget_users = _async_variant(get_users)
+acreate_user = _async_variant(create_user)
+aload_user_tasks = _async_variant(load_user_tasks)
+
+aget_task = _async_variant(get_task)
+aget_tasks = _async_variant(get_tasks)
+aget_tasks_by_owner = _async_variant(get_tasks_by_owner)
+asearch_tasks_by_owner = _async_variant(search_tasks_by_owner)
+acreate_user_task = _async_variant(create_user_task)
+aupdate_user_task = _async_variant(update_user_task)
+adelete_user_task = _async_variant(delete_user_task)
+aget_user_task = _async_variant(get_user_task)
+aget_task_list_version = _async_variant(get_task_list_version)
+aget_task_stats = _async_variant(get_task_stats)
+aget_task_changes = _async_variant(get_task_changes)
+
+aget_task_owners = _async_variant(get_task_owners)
+acreate_user_tasks = _async_variant(create_user_tasks)
+aupdate_tasks = _async_variant(update_tasks)
+adelete_tasks = _async_variant(delete_tasks)
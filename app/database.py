@@ -1,21 +1,290 @@
 # /app/database.py
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from .core.config import settings
+from .core.metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+DATABASE_MODES = ("sync", "async")
+
+if settings.DATABASE_MODE not in DATABASE_MODES:
+    raise ValueError(
+        f"DATABASE_MODE must be one of {DATABASE_MODES}, got {settings.DATABASE_MODE!r}"
+    )
+
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+# ============================================================================
+# SQLITE STORAGE PROFILE
+# ============================================================================
+# "default" leaves SQLite as it is (rollback journal, synchronous=FULL).
+# "wal" lets readers run alongside the single writer and waits on locks
+# instead of failing with "database is locked". "performance" also trades
+# memory for fewer reads (mmap, a 64 MiB page cache, in-memory temp tables).
+
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "wal": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout": 5000,
+    },
+    "performance": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout": 5000,
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "memory",
+    },
+}
+
+# PRAGMA synchronous/temp_store read back as integers.
+_PRAGMA_ENUMS = {
+    "synchronous": {"off": 0, "normal": 1, "full": 2, "extra": 3},
+    "temp_store": {"default": 0, "file": 1, "memory": 2},
+}
+
+
+def get_sqlite_pragmas(profile: Optional[str] = None) -> Dict[str, Any]:
+    """Pragmas for ``profile`` (default: settings.SQLITE_PROFILE) plus explicit overrides."""
+    profile = profile or settings.SQLITE_PROFILE
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"SQLITE_PROFILE must be one of {tuple(SQLITE_PROFILES)}, got {profile!r}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    overrides = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    }
+    pragmas.update({name: value for name, value in overrides.items() if value is not None})
+    return {name: value.lower() if isinstance(value, str) else value for name, value in pragmas.items()}
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    """Run ``pragmas`` on every new DBAPI connection of ``engine``."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def check_sqlite_profile(engine: Engine, pragmas: Dict[str, Any]) -> Dict[str, Any]:
+    """Read the pragmas back from a live connection and report any that did not stick.
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+    E.g. an in-memory database silently stays in journal_mode=memory.
+    """
+    if engine.dialect.name != "sqlite":
+        return {"backend": engine.dialect.name, "read_replicas": len(read_engines)}
+    effective = {}
+    mismatches = {}
+    with engine.connect() as conn:
+        for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout"):
+            effective[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    for name, wanted in pragmas.items():
+        expected = _PRAGMA_ENUMS.get(name, {}).get(wanted, wanted)
+        actual = effective[name]
+        if str(actual).lower() != str(expected).lower():
+            mismatches[name] = {"requested": wanted, "effective": actual}
+    if mismatches:
+        logger.warning("SQLite profile %r not fully applied: %s", settings.SQLITE_PROFILE, mismatches)
+    return {
+        "backend": "sqlite",
+        "read_replicas": len(read_engines),
+        "profile": settings.SQLITE_PROFILE,
+        "pragmas": effective,
+        "mismatches": mismatches,
+    }
+
+
+SQLITE_PRAGMAS = get_sqlite_pragmas()
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+apply_sqlite_profile(engine, SQLITE_PRAGMAS)
+# expire_on_commit=False: committed objects are serialized as they are
+# instead of being re-SELECTed attribute by attribute (one query per row).
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
+# Whatever ``get_db`` yields, depending on DATABASE_MODE.
+DBSession = Union[Session, AsyncSession]
+
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync SQLAlchemy URL to its asyncio driver (sqlite -> aiosqlite)."""
+    url = make_url(url)
+    if url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DATABASE_MODE == "async":
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(get_async_database_url(SQLALCHEMY_DATABASE_URL))
+    apply_sqlite_profile(async_engine.sync_engine, SQLITE_PRAGMAS)
+    # Objects must stay usable after commit: an expired attribute would need
+    # an implicit lazy load, which AsyncSession cannot do outside run_sync.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+# ============================================================================
+# READ REPLICAS
+# ============================================================================
+
+read_engines: List[Any] = []
+_read_sessionmakers: List[Any] = []
+_next_replica = itertools.count()
+
+
+def configure_read_replicas(urls: Sequence[str]) -> None:
+    """(Re)build the replica engines; an empty list routes every read to the primary."""
+    for old in read_engines:
+        # An AsyncEngine can only be disposed from its event loop; its pooled
+        # connections go away with it.
+        if isinstance(old, Engine):
+            old.dispose()
+    read_engines.clear()
+    _read_sessionmakers.clear()
+    for url in urls:
+        if settings.DATABASE_MODE == "async":
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            read_engine = create_async_engine(get_async_database_url(url))
+            apply_sqlite_profile(read_engine.sync_engine, SQLITE_PRAGMAS)
+            instrument_engine(read_engine.sync_engine)
+            factory = async_sessionmaker(bind=read_engine, autoflush=False, expire_on_commit=False)
+        else:
+            read_engine = create_engine(url, connect_args={"check_same_thread": False})
+            apply_sqlite_profile(read_engine, SQLITE_PRAGMAS)
+            instrument_engine(read_engine)
+            factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
+        read_engines.append(read_engine)
+        _read_sessionmakers.append(factory)
+
+
+def has_read_replicas() -> bool:
+    return bool(_read_sessionmakers)
+
+
+def new_read_session() -> DBSession:
+    """Session on the next replica, round-robin."""
+    read_db = _read_sessionmakers[next(_next_replica) % len(_read_sessionmakers)]()
+    read_db.info["replica"] = True
+    return read_db
+
+
+def is_replica_session(db: DBSession) -> bool:
+    """True for sessions from ``new_read_session``, whose data may lag."""
+    return db.info.get("replica", False)
+
+
+class PrimaryStickiness:
+    """Remembers who wrote recently, so their reads stay on the primary.
+
+    Replicas may lag; for ``window`` seconds after a write the writer keeps
+    reading from the primary and sees their own changes.
+    """
+
+    def __init__(self, window: float, max_entries: int = 100_000, clock=time.monotonic):
+        self.window = window
+        self.max_entries = max_entries
+        self.clock = clock
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key: str) -> None:
+        if self.window <= 0:
+            return
+        now = self.clock()
+        # Writes come from threadpool routes as well as the event loop; the
+        # prune iterates the dict, so the whole update holds the lock.
+        with self._lock:
+            self._until[key] = now + self.window
+            if len(self._until) > self.max_entries:
+                for stale in [k for k, until in self._until.items() if until <= now]:
+                    del self._until[stale]
+
+    def is_sticky(self, key: str) -> bool:
+        until = self._until.get(key)
+        return until is not None and until > self.clock()
+
+
+primary_stickiness = PrimaryStickiness(window=settings.READ_YOUR_WRITES_SECONDS)
+
+configure_read_replicas(settings.READ_DATABASE_URLS)
+
+
+def new_session_like(db: DBSession) -> DBSession:
+    """Open a fresh session of the same kind, bound to the same engine as ``db``.
+
+    For work that outlives the request's own session, such as a streamed
+    response body.
+    """
+    if isinstance(db, AsyncSession):
+        return AsyncSession(bind=db.bind, autoflush=False, expire_on_commit=False)
+    return Session(bind=db.get_bind(), autoflush=False, expire_on_commit=False)
+
+
+async def aclose_session(db: DBSession) -> None:
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        db.close()
+
+
+_storage_report: Optional[Dict[str, Any]] = None
+
+
+def get_storage_report(refresh: bool = False) -> Dict[str, Any]:
+    """Storage profile check for the app engine; computed once, at startup."""
+    global _storage_report
+    if _storage_report is None or refresh:
+        _storage_report = check_sqlite_profile(engine, SQLITE_PRAGMAS)
+    return _storage_report
+
+
 # Dependency
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+get_db = get_async_db if settings.DATABASE_MODE == "async" else get_sync_db
@@ -1,35 +1,105 @@
 # /app/dependencies.py
-from fastapi import Depends, HTTPException, status
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from jose import JWTError
 
-from . import crud, models, schemas
-from .core.config import settings
-from .database import get_db
+from . import backend, database, models, schemas
+from .core.admission import RateLimiter, client_rate_limiter, retry_after, user_rate_limiter
+from .core.security import decode_access_token
+from .database import DBSession, aclose_session, get_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+def _token_claims(request: Request, token: str) -> Optional[Dict[str, Any]]:
+    """``token``'s verified claims, None if invalid.
+
+    Decoded once per request and kept on ``request.state``: the session
+    dependencies and ``get_current_user`` all need the subject.
+    """
+    decoded = getattr(request.state, "token_claims", None)
+    if decoded is not None and decoded[0] == token:
+        return decoded[1]
+    try:
+        claims = decode_access_token(token)
+    except JWTError:
+        claims = None
+    request.state.token_claims = (token, claims)
+    return claims
+
+def _request_subject(request: Request) -> Optional[str]:
+    """The token's subject, for read-your-writes routing; None if absent or invalid."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    claims = _token_claims(request, token)
+    return None if claims is None else claims.get("sub")
+
+def _enforce_rate_limit(limiter: RateLimiter, key: str) -> None:
+    wait = limiter.check(key)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": retry_after(wait)},
+        )
+
+def limit_client_rate(request: Request) -> None:
+    """Per-IP token bucket for the routes callers use before they have a token."""
+    _enforce_rate_limit(client_rate_limiter, request.client.host if request.client else "unknown")
+
+def get_write_db(request: Request, db: DBSession = Depends(get_db)):
+    """Primary session for routes that write.
+
+    Marks the caller before the write happens, so none of their reads in
+    the read-your-writes window can be served by a lagging replica.
+    """
+    subject = _request_subject(request)
+    if subject is not None:
+        database.primary_stickiness.mark(subject)
+    return db
+
+async def get_read_db(request: Request, db: DBSession = Depends(get_db)):
+    """Replica session for read-only routes, or the primary one when there
+    are no replicas or the caller wrote recently."""
+    if not database.has_read_replicas():
+        yield db
+        return
+    subject = _request_subject(request)
+    if subject is not None and database.primary_stickiness.is_sticky(subject):
+        yield db
+        return
+    read_db = database.new_read_session()
+    try:
+        yield read_db
+    finally:
+        await aclose_session(read_db)
+
+async def get_current_user(
+    request: Request, db: DBSession = Depends(get_read_db), token: str = Depends(oauth2_scheme)
+):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
+    payload = _token_claims(request, token)
+    if payload is None:
+        raise credentials_exception
+    email: str = payload.get("sub")
+    if email is None:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
+    token_data = schemas.TokenData(email=email)
+    # Keyed on the verified subject and checked before the user lookup, so
+    # a flooding client is turned away without touching the database.
+    _enforce_rate_limit(user_rate_limiter, email)
+    user = await backend.store.aget_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
     return user
 
-def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
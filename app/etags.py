@@ -0,0 +1,71 @@
+# /app/etags.py
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Sequence
+
+# Task ETags are strong validators of the form "<id>-<µs since epoch>", the
+# µs being the task's last change (updated_at, or created_at if never
+# updated). They can be parsed back into the version an If-Match write must
+# still find in the row. List ETags are opaque hashes of the owner's task
+# count and newest change plus the page parameters.
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _micros(value: datetime) -> int:
+    return (_naive_utc(value) - _EPOCH) // timedelta(microseconds=1)
+
+
+def task_version(task: Any) -> datetime:
+    """The timestamp of the task's last change."""
+    return task.updated_at or task.created_at
+
+
+def task_etag(task: Any) -> str:
+    return f'"{task.id}-{_micros(task_version(task))}"'
+
+
+def list_etag(owner_id: int, count: int, newest: Sequence[Optional[datetime]], *params: Any) -> str:
+    stamps = ",".join(str(_micros(value)) if value is not None else "" for value in newest)
+    raw = f"{owner_id}|{count}|{stamps}|" + "|".join(repr(param) for param in params)
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def _split(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """True when the client's cached copy is current (weak comparison)."""
+    if header is None:
+        return False
+    tags = _split(header)
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def if_match_versions(header: Optional[str], task_id: int) -> Optional[List[datetime]]:
+    """The versions of ``task_id`` an If-Match write may overwrite.
+
+    None means unconditional (no header, or ``*``). Weak tags, malformed
+    tags and tags of other tasks never match, so they are dropped; an empty
+    list makes the write fail its precondition.
+    """
+    if header is None:
+        return None
+    tags = _split(header)
+    if "*" in tags:
+        return None
+    versions = []
+    for tag in tags:
+        if not (len(tag) > 2 and tag[0] == tag[-1] == '"'):
+            continue
+        tag_id, _, micros = tag[1:-1].partition("-")
+        if tag_id == str(task_id) and micros.isdigit():
+            versions.append(_EPOCH + timedelta(microseconds=int(micros)))
+    return versions
@@ -0,0 +1,164 @@
+# /app/events.py
+"""In-process fan-out of task writes to GET /tasks/stream subscribers.
+
+``crud`` publishes every committed task write to ``task_events``; each
+open stream holds a ``Subscription`` for its user. An event is rendered
+once, as an SSE frame, and the same bytes are queued for every subscriber
+of the owner; with nobody subscribed, publishing is one dict lookup.
+
+Writes run on threadpool threads (DATABASE_MODE=sync) or on the event
+loop (async), so frames are handed to a subscription's loop with
+``call_soon_threadsafe`` unless already on it. Subscriptions are only
+touched on their loop and need no lock.
+
+Each subscription buffers at most ``max_pending`` frames. A consumer that
+falls further behind (its socket is not draining) is closed rather than
+allowed to grow the buffer: it gets a final ``resync`` event and should
+reconnect and catch up through GET /tasks/changes. An idle subscription
+is a slotted object, an empty deque and, while waiting, one future and
+one timer handle.
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+
+from . import schemas
+from .core.config import settings
+from .serialization import row_to_json
+
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def sse_frame(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def resync_frame(reason: str) -> bytes:
+    return sse_frame("resync", json.dumps({"reason": reason}).encode())
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class Subscription:
+    __slots__ = ("owner_id", "loop", "max_pending", "closed", "_frames", "_waiter")
+
+    def __init__(self, owner_id: int, loop: asyncio.AbstractEventLoop, max_pending: int):
+        self.owner_id = owner_id
+        self.loop = loop
+        self.max_pending = max_pending
+        # Why the subscription ended ("overflow", "shutdown"); None while open.
+        self.closed: Optional[str] = None
+        self._frames: Deque[bytes] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    def push(self, frame: bytes) -> bool:
+        """Queue ``frame``; False if that overflowed and closed the subscription."""
+        if self.closed is not None:
+            return True
+        if len(self._frames) >= self.max_pending:
+            self._frames.clear()
+            self.close("overflow")
+            return False
+        self._frames.append(frame)
+        self._wake()
+        return True
+
+    def close(self, reason: str) -> None:
+        if self.closed is None:
+            self.closed = reason
+            self._wake()
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """The next frame; None once closed or after ``timeout`` seconds idle."""
+        if not self._frames and self.closed is None:
+            self._waiter = self.loop.create_future()
+            timer = self.loop.call_later(timeout, self._wake)
+            try:
+                await self._waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+        return self._frames.popleft() if self._frames else None
+
+
+class TaskEventHub:
+    def __init__(self, max_subscribers: int = 0, max_pending: int = 64):
+        self.max_subscribers = max_subscribers
+        self.max_pending = max_pending
+        self.subscriber_count = 0
+        self.published = 0
+        self.dropped = 0
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+
+    @property
+    def full(self) -> bool:
+        return bool(self.max_subscribers) and self.subscriber_count >= self.max_subscribers
+
+    def subscribe(self, owner_id: int) -> Subscription:
+        """Subscribe to ``owner_id``'s task events; call from the event loop."""
+        subscription = Subscription(owner_id, asyncio.get_running_loop(), self.max_pending)
+        self._subscribers.setdefault(owner_id, set()).add(subscription)
+        self.subscriber_count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.owner_id)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.owner_id]
+        self.subscriber_count -= 1
+
+    def has_subscribers(self, owner_id: int) -> bool:
+        return owner_id in self._subscribers
+
+    def publish(self, event: str, task: Any) -> None:
+        """Send ``event`` ("created", "updated", "deleted") about ``task`` to its owner's streams.
+
+        Safe to call from any thread; call it after the write commits.
+        """
+        if not self.has_subscribers(task.owner_id):
+            return
+        self.published += 1
+        self._dispatch(task.owner_id, sse_frame(event, row_to_json(schemas.Task, task)))
+
+    def close_all(self, reason: str = "shutdown") -> None:
+        for owner_id in list(self._subscribers):
+            self._dispatch(owner_id, None, reason)
+
+    def _dispatch(self, owner_id: int, frame: Optional[bytes], reason: str = "") -> None:
+        current = _running_loop()
+        loops = {subscription.loop for subscription in tuple(self._subscribers.get(owner_id, ()))}
+        for loop in loops:
+            if loop is current:
+                self._deliver(owner_id, loop, frame, reason)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(self._deliver, owner_id, loop, frame, reason)
+
+    def _deliver(self, owner_id: int, loop: asyncio.AbstractEventLoop, frame: Optional[bytes], reason: str) -> None:
+        # On ``loop``. Closed subscriptions stay registered until their
+        # stream ends and unsubscribes.
+        for subscription in tuple(self._subscribers.get(owner_id, ())):
+            if subscription.loop is not loop:
+                continue
+            if frame is None:
+                subscription.close(reason)
+            elif not subscription.push(frame):
+                self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscribers": self.subscriber_count, "published": self.published, "dropped": self.dropped}
+
+
+task_events = TaskEventHub(settings.TASK_STREAM_MAX_SUBSCRIBERS, settings.TASK_STREAM_MAX_PENDING)
@@ -0,0 +1,39 @@
+# /app/export.py
+import csv
+import io
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy import Row
+
+from . import schemas
+from .serialization import row_to_json
+
+# Each batch of rows from the export cursor becomes one chunk of the body.
+# NDJSON lines are the API's task JSON (schemas.Task, through orjson).
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def ndjson_chunk(rows: Sequence[Row]) -> bytes:
+    return b"".join(row_to_json(schemas.Task, row) + b"\n" for row in rows)
+
+
+def csv_header(columns: Sequence[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue()
+
+
+def csv_chunk(rows: Sequence[Row]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
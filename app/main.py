@@ -1,22 +1,161 @@
 # /app/main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
 
-from .database import engine
-from . import models
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from .core import admission, metrics, security, singleflight
+from .core.config import settings
+from .core.response_cache import task_list_cache
+from .database import async_engine, engine, get_storage_report
+from .events import task_events
 from .routers import tasks, users
+from .serialization import DefaultJSONResponse
+from . import startup
+
+metrics.instrument_engine(engine)
+if async_engine is not None:
+    metrics.instrument_engine(async_engine.sync_engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup runs here rather than at import, so importing the app
+    # (tests, tooling, a worker that is not serving yet) touches no database.
+    await startup.startup(app)
+    get_storage_report(refresh=True)
+    yield
+    task_events.close_all()
+    security.password_hasher.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
 
-models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Professional Task Manager API",
     description="A robust, enterprise-level API for managing users and tasks, built with FastAPI and best practices.",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=DefaultJSONResponse,
 )
 
+
+app.add_middleware(admission.AdmissionMiddleware)
+# Added last, so outermost: shed requests still show up in the metrics.
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+def _security_metrics():
+    cache = security.token_cache.stats()
+    yield "# HELP token_cache_hits_total Bearer tokens answered from the verified-claims cache."
+    yield "# TYPE token_cache_hits_total counter"
+    yield f"token_cache_hits_total {cache['hits']}"
+    yield "# HELP token_cache_misses_total Bearer tokens that needed full JWT verification."
+    yield "# TYPE token_cache_misses_total counter"
+    yield f"token_cache_misses_total {cache['misses']}"
+    yield "# HELP password_hasher_rejected_total Password hashing calls shed because the queue was full."
+    yield "# TYPE password_hasher_rejected_total counter"
+    yield f"password_hasher_rejected_total {security.password_hasher.rejected}"
+
+
+metrics.registry.add_collector(_security_metrics)
+
+
+def _cache_metrics():
+    if not task_list_cache.enabled:
+        return
+    cache = task_list_cache.stats()
+    yield "# HELP task_list_cache_hits_total Task listing pages served from the response cache."
+    yield "# TYPE task_list_cache_hits_total counter"
+    yield f"task_list_cache_hits_total {cache['hits']}"
+    yield "# HELP task_list_cache_misses_total Task listing pages rendered from the database."
+    yield "# TYPE task_list_cache_misses_total counter"
+    yield f"task_list_cache_misses_total {cache['misses']}"
+    yield "# HELP task_list_cache_evictions_total Cached pages evicted to stay under the size limit."
+    yield "# TYPE task_list_cache_evictions_total counter"
+    yield f"task_list_cache_evictions_total {cache['evictions']}"
+    yield "# HELP task_list_cache_bytes Size of the cached task listing pages."
+    yield "# TYPE task_list_cache_bytes gauge"
+    yield f"task_list_cache_bytes {cache['bytes']}"
+
+metrics.registry.add_collector(_cache_metrics)
+
+
+def _coalescing_metrics():
+    flights = (singleflight.task_read_flights, singleflight.task_list_flights)
+    yield "# HELP read_flights_total Task reads that ran a query, per route."
+    yield "# TYPE read_flights_total counter"
+    for flight in flights:
+        yield f'read_flights_total{{route="{flight.name}"}} {flight.executions}'
+    yield "# HELP read_coalesced_total Task reads that shared the result of an identical read in flight."
+    yield "# TYPE read_coalesced_total counter"
+    for flight in flights:
+        yield f'read_coalesced_total{{route="{flight.name}"}} {flight.coalesced}'
+
+metrics.registry.add_collector(_coalescing_metrics)
+
+
+def _stream_metrics():
+    stream = task_events.stats()
+    yield "# HELP task_stream_subscribers Open GET /tasks/stream connections."
+    yield "# TYPE task_stream_subscribers gauge"
+    yield f"task_stream_subscribers {stream['subscribers']}"
+    yield "# HELP task_stream_events_total Task writes published to at least one open stream."
+    yield "# TYPE task_stream_events_total counter"
+    yield f"task_stream_events_total {stream['published']}"
+    yield "# HELP task_stream_dropped_total Streams closed for falling too far behind."
+    yield "# TYPE task_stream_dropped_total counter"
+    yield f"task_stream_dropped_total {stream['dropped']}"
+
+metrics.registry.add_collector(_stream_metrics)
+
+
+def _admission_metrics():
+    yield "# HELP admission_in_flight Requests being served."
+    yield "# TYPE admission_in_flight gauge"
+    yield f"admission_in_flight {admission.admission.in_flight}"
+    yield "# HELP admission_rejected_total Requests shed with 503 by the in-flight limits."
+    yield "# TYPE admission_rejected_total counter"
+    for limit, count in admission.admission.rejected.items():
+        yield f'admission_rejected_total{{limit="{limit}"}} {count}'
+    yield "# HELP rate_limited_total Requests refused with 429 by a token bucket."
+    yield "# TYPE rate_limited_total counter"
+    yield f'rate_limited_total{{key="user"}} {admission.user_rate_limiter.rejected}'
+    yield f'rate_limited_total{{key="ip"}} {admission.client_rate_limiter.rejected}'
+
+metrics.registry.add_collector(_admission_metrics)
+
+
+def _startup_metrics():
+    if "import_to_ready_seconds" not in startup.startup_report:
+        return
+    yield "# HELP app_import_to_ready_seconds Time from importing the app to being ready to serve."
+    yield "# TYPE app_import_to_ready_seconds gauge"
+    yield f"app_import_to_ready_seconds {startup.startup_report['import_to_ready_seconds']}"
+
+metrics.registry.add_collector(_startup_metrics)
+
+
+@app.exception_handler(security.PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: security.PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service busy, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 app.include_router(users.router, prefix="/api/v1", tags=["users"])
 app.include_router(tasks.router, prefix="/api/v1", tags=["tasks"])
 
 @app.get("/api/v1/health", tags=["health"])
 def health_check():
     """Check the health of the API."""
-    return {"status": "healthy"}
+    return {"status": "healthy", "database": get_storage_report(), "startup": startup.startup_report}
+
+@app.get("/api/v1/metrics", tags=["health"], response_class=PlainTextResponse)
+async def read_metrics():
+    """Latency and database metrics in Prometheus text format."""
+    # Rendered on the event loop, the only thread that writes the registry.
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
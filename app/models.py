@@ -1,10 +1,19 @@
 # /app/models.py
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime
+from datetime import datetime, timezone
+
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, DateTime, column, event, table
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from .database import Base
 
+
+def utcnow() -> datetime:
+    # Naive UTC with microseconds, like the CURRENT_TIMESTAMP server default
+    # but precise enough to tell apart two writes in the same second (ETags).
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -13,18 +22,286 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
 
-    tasks = relationship("Task", back_populates="owner")
+    # Never loaded implicitly: a user can own any number of tasks. Load them
+    # with an explicit, bounded query (see crud.load_user_tasks).
+    tasks = relationship("Task", back_populates="owner", lazy="raise_on_sql")
 
 class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
-    description = Column(String, index=True, nullable=True)
+    # Searched through tasks_fts below; a B-tree index cannot serve word search.
+    description = Column(String, nullable=True)
     priority = Column(Integer, default=1)
     completed = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=utcnow)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Position in the change feed, set by the TASK_CHANGE_DDL triggers on
+    # every insert and update (RETURNING rows still carry the old value).
+    change_seq = Column(Integer, nullable=True)
+
+    owner = relationship("User", back_populates="tasks", lazy="raise_on_sql")
+
+    __table_args__ = (
+        # Keyset pagination: WHERE owner_id = ? AND id > ? ORDER BY id LIMIT ?
+        Index("ix_tasks_owner_id_id", "owner_id", "id"),
+        # List ETags: MAX(created_at) / MAX(updated_at) WHERE owner_id = ?
+        Index("ix_tasks_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_tasks_owner_id_updated_at", "owner_id", "updated_at"),
+        # Listing filters and sorts (crud.task_listing_statement). Index
+        # entries end with the rowid, so ties come back in id order.
+        # ?completed=, id order:
+        Index("ix_tasks_owner_id_completed", "owner_id", "completed"),
+        # ?sort=-priority,created_at (or its reverse) and priority ranges;
+        # ?sort=created_at and created_after/before use ix_tasks_owner_id_created_at.
+        Index("ix_tasks_owner_id_priority_created_at", "owner_id", priority.desc(), "created_at"),
+        # Change feed: WHERE owner_id = ? AND change_seq > ? ORDER BY change_seq
+        Index("ix_tasks_owner_id_change_seq", "owner_id", "change_seq"),
+    )
+
+
+class TaskCounter(Base):
+    """Number of an owner's tasks per (priority, completed) bucket.
+
+    Kept by the triggers in TASK_COUNTER_DDL, inside the transaction of
+    every write to tasks, so totals (GET /tasks/stats, X-Total-Count) are a
+    handful of rows per owner instead of a COUNT(*) over the owner's tasks.
+    Buckets are not deleted when they drop to zero.
+    """
+    __tablename__ = "task_counters"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    priority = Column(Integer, primary_key=True)
+    completed = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class TaskTombstone(Base):
+    """A deleted task, for the change feed (GET /tasks/changes).
+
+    Written by the delete trigger in TASK_CHANGE_DDL, one row per owner and
+    task id. SQLite reuses the highest task id once it is deleted, so the
+    same id can be deleted again under another owner; keyed by id alone,
+    that would overwrite the first owner's tombstone and hide the delete
+    from their feed.
+    """
+    __tablename__ = "task_tombstones"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    id = Column(Integer, primary_key=True)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_task_tombstones_owner_id_change_seq", "owner_id", "change_seq"),
+    )
+
+
+class TaskChangeSequence(Base):
+    """The last change_seq handed out; a single row (id 1)."""
+    __tablename__ = "task_change_sequence"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False)
+
+
+# Full-text search over title and description (SQLite FTS5). The index is
+# external-content (it keeps no copy of the text) and triggers keep it in
+# step with tasks. owner_id is indexed as a token too, so a search is
+# scoped by an 'owner_id : "<id>"' term that FTS5 intersects with the
+# query terms instead of filtering every match afterwards. The prefix
+# indexes answer the broad 2-4 character prefixes of search-as-you-type
+# without merging every matching term's postings.
+tasks_fts = table("tasks_fts", column("rowid"))
+
+TASK_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, owner_id, content='tasks', content_rowid='id', prefix='2 3 4')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description, owner_id) "
+    "VALUES (new.id, new.title, new.description, new.owner_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description, owner_id) "
+    "VALUES ('delete', old.id, old.title, old.description, old.owner_id); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description, owner_id ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description, owner_id) "
+    "VALUES ('delete', old.id, old.title, old.description, old.owner_id); "
+    "INSERT INTO tasks_fts(rowid, title, description, owner_id) "
+    "VALUES (new.id, new.title, new.description, new.owner_id); END",
+)
+
+
+def install_task_search(connection) -> None:
+    """Create the FTS5 index and its triggers if missing (SQLite only).
+
+    Idempotent; a newly created index is filled from the existing rows. Also
+    drops the description B-tree index older databases still carry.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    missing = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+    ).first() is None
+    for statement in TASK_SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+    if missing:
+        connection.exec_driver_sql("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_tasks_description")
+
+
+@event.listens_for(Task.__table__, "after_create")
+def _create_task_search(target, connection, **kw):
+    install_task_search(connection)
+
+
+@event.listens_for(Task.__table__, "after_drop")
+def _drop_task_search(target, connection, **kw):
+    # The triggers went away with the table; the virtual table does not.
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS tasks_fts")
+
+
+# Counter maintenance (models.TaskCounter). An UPDATE only moves a task
+# between buckets when priority, completed or owner_id actually changed.
+_COUNT_NEW = (
+    "INSERT INTO task_counters(owner_id, priority, completed, count) "
+    "VALUES (new.owner_id, new.priority, new.completed, 1) "
+    "ON CONFLICT(owner_id, priority, completed) DO UPDATE SET count = count + 1;"
+)
+_UNCOUNT_OLD = (
+    "UPDATE task_counters SET count = count - 1 "
+    "WHERE owner_id = old.owner_id AND priority = old.priority AND completed = old.completed;"
+)
+TASK_COUNTER_DDL = (
+    f"CREATE TRIGGER IF NOT EXISTS task_counters_ai AFTER INSERT ON tasks BEGIN {_COUNT_NEW} END",
+    f"CREATE TRIGGER IF NOT EXISTS task_counters_ad AFTER DELETE ON tasks BEGIN {_UNCOUNT_OLD} END",
+    "CREATE TRIGGER IF NOT EXISTS task_counters_au AFTER UPDATE OF priority, completed, owner_id ON tasks "
+    "WHEN old.priority IS NOT new.priority OR old.completed IS NOT new.completed "
+    f"OR old.owner_id IS NOT new.owner_id BEGIN {_UNCOUNT_OLD} {_COUNT_NEW} END",
+)
+
+# Buckets whose stored count differs from the tasks table, either way round.
+_COUNTED = "SELECT owner_id, priority, completed, COUNT(*) FROM tasks GROUP BY owner_id, priority, completed"
+_STORED = "SELECT owner_id, priority, completed, count FROM task_counters WHERE count != 0"
+_COUNTER_DRIFT_SQL = (
+    "SELECT COUNT(*) FROM ("
+    f"SELECT owner_id, priority, completed FROM ({_COUNTED} EXCEPT {_STORED}) "
+    f"UNION SELECT owner_id, priority, completed FROM ({_STORED} EXCEPT {_COUNTED}))"
+)
+
+
+def task_counter_drift(connection) -> int:
+    """How many (owner, priority, completed) buckets disagree with tasks."""
+    return connection.exec_driver_sql(_COUNTER_DRIFT_SQL).scalar()
+
+
+def rebuild_task_counters(connection) -> int:
+    """Recount task_counters from tasks; return how many buckets were wrong.
+
+    Run it in one transaction (``engine.begin()``): SQLite's write lock then
+    keeps task writes out between the recount and the swap.
+    """
+    drifted = task_counter_drift(connection)
+    connection.exec_driver_sql("DELETE FROM task_counters")
+    connection.exec_driver_sql(f"INSERT INTO task_counters(owner_id, priority, completed, count) {_COUNTED}")
+    return drifted
+
+
+def install_task_counters(connection) -> None:
+    """Create the counter triggers if missing (SQLite only).
+
+    Idempotent; when the triggers are new the counters are rebuilt, since
+    writes made without them were not counted.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    missing = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'task_counters_ai'"
+    ).first() is None
+    for statement in TASK_COUNTER_DDL:
+        connection.exec_driver_sql(statement)
+    if missing:
+        rebuild_task_counters(connection)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_task_counters(target, connection, **kw):
+    # On the metadata rather than a table: the triggers need both tables.
+    install_task_counters(connection)
+
+
+# Change feed (GET /tasks/changes). Every insert, update and delete of a
+# task takes the next value of task_change_sequence and stamps it on the row
+# or on its tombstone. SQLite runs one write transaction at a time, so
+# change_seq values become visible in the order they were taken, and a
+# reader that has seen N has seen every change up to N. The update trigger
+# skips the change_seq updates the triggers themselves make; the counter
+# and search triggers only fire on the columns they index.
+_NEXT_CHANGE = (
+    "INSERT INTO task_change_sequence(id, value) VALUES (1, 1) "
+    "ON CONFLICT(id) DO UPDATE SET value = value + 1;"
+)
+_LAST_CHANGE = "(SELECT value FROM task_change_sequence WHERE id = 1)"
+_STAMP_NEW = f"UPDATE tasks SET change_seq = {_LAST_CHANGE} WHERE id = new.id;"
+TASK_CHANGE_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_tasks_owner_id_change_seq ON tasks (owner_id, change_seq)",
+    f"CREATE TRIGGER IF NOT EXISTS task_changes_ai AFTER INSERT ON tasks BEGIN {_NEXT_CHANGE} {_STAMP_NEW} END",
+    "CREATE TRIGGER IF NOT EXISTS task_changes_au AFTER UPDATE ON tasks WHEN new.change_seq IS old.change_seq "
+    f"BEGIN {_NEXT_CHANGE} {_STAMP_NEW} END",
+    f"CREATE TRIGGER IF NOT EXISTS task_changes_ad AFTER DELETE ON tasks BEGIN {_NEXT_CHANGE} "
+    "INSERT INTO task_tombstones(id, owner_id, change_seq, deleted_at) "
+    f"VALUES (old.id, old.owner_id, {_LAST_CHANGE}, strftime('%Y-%m-%d %H:%M:%f', 'now')) "
+    "ON CONFLICT(owner_id, id) DO UPDATE SET change_seq = excluded.change_seq, "
+    "deleted_at = excluded.deleted_at; END",
+)
+
+
+def _rekey_task_tombstones(connection) -> None:
+    # Tombstone tables from before (owner_id, id) keys: rebuild them, and the
+    # delete trigger whose ON CONFLICT names the old key.
+    key = [row[1] for row in sorted(connection.exec_driver_sql("PRAGMA table_info(task_tombstones)"),
+                                    key=lambda row: row[5]) if row[5]]
+    if key != ["id"]:
+        return
+    connection.exec_driver_sql("DROP TRIGGER IF EXISTS task_changes_ad")
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_task_tombstones_owner_id_change_seq")
+    connection.exec_driver_sql("ALTER TABLE task_tombstones RENAME TO task_tombstones_old")
+    TaskTombstone.__table__.create(connection)
+    connection.exec_driver_sql(
+        "INSERT INTO task_tombstones(owner_id, id, change_seq, deleted_at) "
+        "SELECT owner_id, id, change_seq, deleted_at FROM task_tombstones_old"
+    )
+    connection.exec_driver_sql("DROP TABLE task_tombstones_old")
+
+
+def install_task_changes(connection) -> None:
+    """Add tasks.change_seq and the change feed triggers if missing (SQLite only).
+
+    Idempotent. Rows written before the triggers existed are numbered in id
+    order, so a first sync picks them up.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(tasks)")}
+    if "change_seq" not in columns:
+        connection.exec_driver_sql("ALTER TABLE tasks ADD COLUMN change_seq INTEGER")
+    _rekey_task_tombstones(connection)
+    for statement in TASK_CHANGE_DDL:
+        connection.exec_driver_sql(statement)
+    if connection.exec_driver_sql("SELECT 1 FROM tasks WHERE change_seq IS NULL LIMIT 1").first() is not None:
+        # change_seq only has to grow, not be dense: number the rows by id
+        # past the last value handed out, without firing the update trigger.
+        connection.exec_driver_sql(
+            "INSERT INTO task_change_sequence(id, value) VALUES (1, 0) ON CONFLICT(id) DO NOTHING"
+        )
+        connection.exec_driver_sql(f"UPDATE tasks SET change_seq = {_LAST_CHANGE} + id WHERE change_seq IS NULL")
+        connection.exec_driver_sql(
+            "UPDATE task_change_sequence SET value = (SELECT MAX(change_seq) FROM tasks) WHERE id = 1"
+        )
+
 
-    owner = relationship("User", back_populates="tasks")
+@event.listens_for(Base.metadata, "after_create")
+def _create_task_changes(target, connection, **kw):
+    install_task_changes(connection)
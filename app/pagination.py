@@ -0,0 +1,24 @@
+# /app/pagination.py
+import base64
+import json
+from typing import Any, Dict
+
+# Cursors are opaque to clients: urlsafe base64 of a compact JSON object
+# holding the seek key of the last row returned ({"id": 42}).
+
+
+def encode_cursor(key: Dict[str, Any]) -> str:
+    raw = json.dumps(key, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by ``encode_cursor``; raise ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key
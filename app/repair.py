@@ -0,0 +1,35 @@
+# /app/repair.py
+"""Check or rebuild the per-user task counters (models.TaskCounter).
+
+The counters are kept by triggers, so they only drift after writes made
+with the triggers missing or rows changed by hand. Example (from the
+repository root)::
+
+    python -m app.repair --check   # exit status 1 if any bucket is wrong
+    python -m app.repair           # recount every owner's tasks
+"""
+import argparse
+
+from . import models
+from .database import engine
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.repair", description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="only report drifted counters, change nothing")
+    args = parser.parse_args(argv)
+    with engine.begin() as connection:
+        if args.check:
+            drifted = models.task_counter_drift(connection)
+            print(f"{drifted} task counter bucket(s) out of date")
+            return 1 if drifted else 0
+        drifted = models.rebuild_task_counters(connection)
+        models.install_task_counters(connection)
+    # Pages cached by running servers keep their X-Total-Count until the
+    # owner's next write.
+    print(f"Rebuilt task counters; {drifted} bucket(s) were out of date")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,431 @@
+# /app/repository.py
+import functools
+import re
+import threading
+from bisect import bisect_right, insort
+from collections import OrderedDict, namedtuple
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from . import crud, etags, models, schemas
+from .core.security import get_password_hash
+
+# Mirrors the interface of app/crud.py (same function names, arguments and
+# return values, ``a``-prefixed async variants included) over in-process
+# dicts, so a MemoryRepository can stand in for the crud module wherever it
+# is called as ``backend.get_user(db, ...)``. ``db`` is accepted and ignored.
+#
+# Lookups go through indexes instead of scans: users by id and by email,
+# tasks by id and, per owner, a sorted list of task ids (id order is the
+# default listing order, so pages and cursors are bisect + slice). Stored
+# objects are never modified in place; a write swaps in a new copy, so an
+# object handed out earlier stays a consistent snapshot, like a row read
+# from the database. One lock guards the indexes.
+#
+# With ``notify=True`` writes also run crud's post-commit hooks (listing
+# cache and read-coalescing invalidation, stream events), as they must when
+# the repository serves the app (app/backend.py).
+#
+# The change feed keeps, per owner, each task id's latest change in an
+# OrderedDict moved to the end on every write: the dict is in change_seq
+# order, so the changes after a sequence number are read from its tail.
+
+TaskListVersion = namedtuple("TaskListVersion", "count created_at updated_at total")
+TaskChange = namedtuple(
+    "TaskChange",
+    "id title description priority completed owner_id created_at updated_at change_seq deleted_at",
+)
+
+_TASK_FIELDS = ("id", "title", "description", "priority", "completed", "created_at", "updated_at", "owner_id")
+_WORD = re.compile(r"\w+")
+
+
+def _copy_task(task: models.Task, **changes: Any) -> models.Task:
+    return models.Task(**{name: changes.get(name, getattr(task, name)) for name in _TASK_FIELDS})
+
+
+def _matches(task: models.Task, filters: schemas.TaskFilter) -> bool:
+    return (
+        (filters.completed is None or task.completed == filters.completed)
+        and (filters.priority_min is None or task.priority >= filters.priority_min)
+        and (filters.priority_max is None or task.priority <= filters.priority_max)
+        and (filters.created_after is None or task.created_at > filters.created_after)
+        and (filters.created_before is None or task.created_at < filters.created_before)
+    )
+
+
+def _is_after(task: models.Task, order: Sequence[Tuple[str, bool]], values: Sequence[Any]) -> bool:
+    for (name, descending), value in zip(order, values):
+        current = getattr(task, name)
+        if current != value:
+            return current < value if descending else current > value
+    return False
+
+
+@functools.lru_cache(maxsize=64)
+def _row_type(columns: Tuple[str, ...]):
+    # Stands in for the sqlalchemy Rows crud returns for ``columns``:
+    # attribute, index and ``_mapping`` access.
+    base = namedtuple("TaskRow", columns)
+    return type("TaskRow", (base,), {"__slots__": (), "_mapping": property(base._asdict)})
+
+
+def _end(start: int, limit: Optional[int]) -> Optional[int]:
+    # limit=None means no limit, as with crud (LIMIT is then left out).
+    return None if limit is None else start + limit
+
+
+def _async_variant(func):
+    # Nothing here blocks, so the async variants simply call through.
+    @functools.wraps(func)
+    async def wrapper(self, db, *args, **kwargs):
+        return func(self, db, *args, **kwargs)
+
+    wrapper.__name__ = wrapper.__qualname__ = f"a{func.__name__}"
+    return wrapper
+
+
+class MemoryRepository:
+    """In-memory, thread-safe implementation of the crud interface."""
+
+    def __init__(self, notify: bool = False):
+        self.notify = notify
+        self._lock = threading.RLock()
+        self._users: Dict[int, models.User] = {}
+        self._user_ids_by_email: Dict[str, int] = {}
+        self._tasks: Dict[int, models.Task] = {}
+        self._task_ids_by_owner: Dict[int, List[int]] = {}
+        self._changes_by_owner: Dict[int, "OrderedDict[int, TaskChange]"] = {}
+        self._last_user_id = 0
+        self._last_task_id = 0
+        self._last_change_seq = 0
+
+    def load(self, users: Iterable[Any] = (), tasks: Iterable[Any] = ()) -> None:
+        """Index existing rows (e.g. read with crud) under their own ids."""
+        with self._lock:
+            for user in users:
+                self._store_user(models.User(
+                    id=user.id, email=user.email, hashed_password=user.hashed_password, is_active=user.is_active
+                ))
+            for task in tasks:
+                self._store_task(_copy_task(task))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._user_ids_by_email.clear()
+            self._tasks.clear()
+            self._task_ids_by_owner.clear()
+            self._changes_by_owner.clear()
+            self._last_user_id = self._last_task_id = self._last_change_seq = 0
+
+    # Callers hold the lock.
+
+    def _store_user(self, user: models.User) -> None:
+        self._users[user.id] = user
+        self._user_ids_by_email[user.email] = user.id
+        self._last_user_id = max(self._last_user_id, user.id)
+
+    def _store_task(self, task: models.Task) -> None:
+        previous = self._tasks.get(task.id)
+        if previous is not None and previous.owner_id != task.owner_id:
+            self._unindex_task(previous)
+            self._record_deletion(previous)
+            previous = None
+        task.change_seq = self._next_change_seq()
+        self._tasks[task.id] = task
+        if previous is None:
+            insort(self._task_ids_by_owner.setdefault(task.owner_id, []), task.id)
+        self._last_task_id = max(self._last_task_id, task.id)
+        self._record_change(task.owner_id, TaskChange(
+            **{name: getattr(task, name) for name in _TASK_FIELDS}, change_seq=task.change_seq, deleted_at=None
+        ))
+
+    def _next_change_seq(self) -> int:
+        self._last_change_seq += 1
+        return self._last_change_seq
+
+    def _record_change(self, owner_id: int, change: TaskChange) -> None:
+        changes = self._changes_by_owner.setdefault(owner_id, OrderedDict())
+        changes.pop(change.id, None)
+        changes[change.id] = change
+
+    def _record_deletion(self, task: models.Task) -> None:
+        self._record_change(task.owner_id, TaskChange(
+            task.id, None, None, None, None, task.owner_id, None, None,
+            change_seq=self._next_change_seq(), deleted_at=models.utcnow(),
+        ))
+
+    def _unindex_task(self, task: models.Task) -> None:
+        ids = self._task_ids_by_owner[task.owner_id]
+        del ids[bisect_right(ids, task.id) - 1]
+
+    def _remove_task(self, task_id: int) -> models.Task:
+        task = self._tasks.pop(task_id)
+        self._unindex_task(task)
+        self._record_deletion(task)
+        return task
+
+    def _new_task(self, task: schemas.TaskCreate, user_id: int) -> models.Task:
+        self._last_task_id += 1
+        db_task = models.Task(
+            id=self._last_task_id, **task.model_dump(), completed=False,
+            created_at=models.utcnow(), updated_at=None, owner_id=user_id,
+        )
+        self._store_task(db_task)
+        return db_task
+
+    def _owned_task(self, task_id: int, user_id: int, versions: Optional[List[Any]]) -> Optional[models.Task]:
+        task = self._tasks.get(task_id)
+        if task is None or task.owner_id != user_id:
+            return None
+        if versions is not None and etags.task_version(task) not in versions:
+            return None
+        return task
+
+    def _changed(self, event: str, tasks: Sequence[models.Task]) -> None:
+        # Called after the lock is released, like crud's hooks after commit.
+        if self.notify and tasks:
+            crud._tasks_changed(*(task.owner_id for task in tasks))
+            crud._publish(event, *tasks)
+
+    def _owner_tasks(self, owner_id: int) -> List[models.Task]:
+        with self._lock:
+            return [self._tasks[task_id] for task_id in self._task_ids_by_owner.get(owner_id, ())]
+
+    # ------------------------------------------------------------------
+    # Usuários
+    # ------------------------------------------------------------------
+
+    def get_user(self, db, user_id: int):
+        return self._users.get(user_id)
+
+    def get_user_by_email(self, db, email: str):
+        with self._lock:
+            user_id = self._user_ids_by_email.get(email)
+            return None if user_id is None else self._users[user_id]
+
+    def get_users(self, db, skip: int = 0, limit: int = 100):
+        with self._lock:
+            return [self._users[user_id] for user_id in sorted(self._users)[skip:_end(skip, limit)]]
+
+    def create_user(self, db, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+        """Returns None when the email is already registered."""
+        if hashed_password is None:
+            hashed_password = get_password_hash(user.password)
+        with self._lock:
+            if user.email in self._user_ids_by_email:
+                return None
+            db_user = models.User(
+                id=self._last_user_id + 1, email=user.email, hashed_password=hashed_password, is_active=True
+            )
+            self._store_user(db_user)
+            return db_user
+
+    def load_user_tasks(self, db, db_user: models.User, limit: int):
+        tasks = self.get_tasks_by_owner(db, owner_id=db_user.id, limit=limit)
+        set_committed_value(db_user, "tasks", tasks)
+        return tasks
+
+    # ------------------------------------------------------------------
+    # Tarefas
+    # ------------------------------------------------------------------
+
+    task_listing_order = staticmethod(crud.task_listing_order)
+
+    def get_task(self, db, task_id: int):
+        return self._tasks.get(task_id)
+
+    def get_tasks(self, db, skip: int = 0, limit: int = 100):
+        with self._lock:
+            return [self._tasks[task_id] for task_id in sorted(self._tasks)[skip:_end(skip, limit)]]
+
+    def get_tasks_by_owner(
+        self,
+        db,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Sequence[Any]] = None,
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[schemas.TaskFilter] = None,
+        sort: Sequence[Tuple[str, bool]] = (),
+    ):
+        order = crud.task_listing_order(sort)
+        if filters is None and order == [("id", False)]:
+            with self._lock:
+                ids = self._task_ids_by_owner.get(owner_id, [])
+                start = skip if after is None else bisect_right(ids, after[0])
+                page = [self._tasks[task_id] for task_id in ids[start:_end(start, limit)]]
+        else:
+            tasks = self._owner_tasks(owner_id)
+            if filters is not None:
+                tasks = [task for task in tasks if _matches(task, filters)]
+            # Stable sorts, least significant key first.
+            for name, descending in reversed(order):
+                tasks.sort(key=lambda task: getattr(task, name), reverse=descending)
+            if after is not None:
+                page = [task for task in tasks if _is_after(task, order, after)][:limit]
+            else:
+                page = tasks[skip:_end(skip, limit)]
+        if columns:
+            row = _row_type(tuple(columns))
+            return [row(*(getattr(task, name) for name in columns)) for task in page]
+        return page
+
+    def search_tasks_by_owner(self, db, owner_id: int, q: str, skip: int = 0, limit: int = 20):
+        """Same matching and ranking as crud's FTS search, over lowercased words."""
+        terms = [word.lower() for word in _WORD.findall(q)[:crud.SEARCH_MAX_TERMS]]
+        if not terms:
+            return []
+
+        def matches(*texts: Optional[str]) -> bool:
+            words = {word.lower() for text in texts if text for word in _WORD.findall(text)}
+            return all(term in words for term in terms[:-1]) and any(word.startswith(terms[-1]) for word in words)
+
+        hits = [
+            (matches(task.title), task) for task in self._owner_tasks(owner_id)
+            if matches(task.title, task.description)
+        ]
+        hits.sort(key=lambda hit: (hit[0], hit[1].id), reverse=True)
+        return [task for _, task in hits[skip:skip + limit]]
+
+    def create_user_task(self, db, task: schemas.TaskCreate, user_id: int):
+        with self._lock:
+            db_task = self._new_task(task, user_id)
+        self._changed("created", [db_task])
+        return db_task
+
+    def get_task_list_version(self, db, owner_id: int, filters: Optional[schemas.TaskFilter] = None):
+        tasks = self._owner_tasks(owner_id)
+        return TaskListVersion(
+            len(tasks),
+            max((task.created_at for task in tasks), default=None),
+            max((task.updated_at for task in tasks if task.updated_at is not None), default=None),
+            self._count_matching(tasks, filters),
+        )
+
+    @staticmethod
+    def _count_matching(tasks: List[models.Task], filters: Optional[schemas.TaskFilter]) -> Optional[int]:
+        # None for created_* bounds, as crud's counters cannot answer those.
+        if filters is None:
+            return len(tasks)
+        if filters.created_after is not None or filters.created_before is not None:
+            return None
+        return sum(1 for task in tasks if _matches(task, filters))
+
+    def get_task_stats(self, db, owner_id: int) -> schemas.TaskStats:
+        tasks = self._owner_tasks(owner_id)
+        by_priority: Dict[int, int] = {}
+        for task in tasks:
+            by_priority[task.priority] = by_priority.get(task.priority, 0) + 1
+        completed = sum(1 for task in tasks if task.completed)
+        return schemas.TaskStats(
+            total=len(tasks), completed=completed, open=len(tasks) - completed,
+            by_priority=dict(sorted(by_priority.items())),
+        )
+
+    def update_user_task(
+        self, db, task_id: int, user_id: int, values: Dict[str, Any], versions: Optional[List[Any]] = None
+    ):
+        with self._lock:
+            task = self._owned_task(task_id, user_id, versions)
+            if task is None or not values:
+                return task
+            updated = _copy_task(task, **values, updated_at=models.utcnow())
+            self._store_task(updated)
+        self._changed("updated", [updated])
+        return updated
+
+    def delete_user_task(self, db, task_id: int, user_id: int, versions: Optional[List[Any]] = None):
+        with self._lock:
+            task = self._owned_task(task_id, user_id, versions)
+            if task is None:
+                return None
+            self._remove_task(task_id)
+        self._changed("deleted", [task])
+        return task
+
+    def get_user_task(self, db, task_id: int, user_id: int, versions: Optional[List[Any]] = None):
+        with self._lock:
+            return self._owned_task(task_id, user_id, versions)
+
+    def iter_task_batches_by_owner(self, db, owner_id: int, batch_size: int = 1000) -> Iterator[List[Any]]:
+        """The owner's tasks as rows of crud.TASK_EXPORT_COLUMNS, in id order."""
+        row = _row_type(tuple(column.key for column in crud.TASK_EXPORT_COLUMNS))
+        tasks = self._owner_tasks(owner_id)
+        for start in range(0, len(tasks), batch_size):
+            yield [row(*(getattr(task, name) for name in row._fields)) for task in tasks[start:start + batch_size]]
+
+    async def aiter_task_batches_by_owner(self, db, owner_id: int, batch_size: int = 1000) -> AsyncIterator[List[Any]]:
+        for batch in self.iter_task_batches_by_owner(db, owner_id, batch_size):
+            yield batch
+
+    def get_task_changes(self, db, owner_id: int, since: int = 0, limit: int = 100) -> List[TaskChange]:
+        with self._lock:
+            newer = []
+            for change in reversed(self._changes_by_owner.get(owner_id, {}).values()):
+                if change.change_seq <= since:
+                    break
+                newer.append(change)
+        return newer[::-1][:limit]
+
+    # ------------------------------------------------------------------
+    # Tarefas em lote
+    # ------------------------------------------------------------------
+
+    def get_task_owners(self, db, task_ids: List[int]) -> Dict[int, int]:
+        with self._lock:
+            return {task_id: self._tasks[task_id].owner_id for task_id in set(task_ids) if task_id in self._tasks}
+
+    def create_user_tasks(self, db, tasks: List[schemas.TaskCreate], user_id: int) -> List[models.Task]:
+        with self._lock:
+            db_tasks = [self._new_task(task, user_id) for task in tasks]
+        self._changed("created", db_tasks)
+        return db_tasks
+
+    def update_tasks(self, db, values: List[Dict[str, Any]], owner_id: Optional[int] = None) -> List[models.Task]:
+        """Apply ``values`` (dicts holding ``id`` plus the fields to set) by id."""
+        now = models.utcnow()
+        updated = {}
+        with self._lock:
+            for row in values:
+                task = updated.get(row["id"]) or self._tasks.get(row["id"])
+                if task is not None and owner_id in (None, task.owner_id):
+                    changes = {name: value for name, value in row.items() if name != "id"}
+                    updated[task.id] = _copy_task(task, **changes, updated_at=now)
+            for task in updated.values():
+                self._store_task(task)
+        self._changed("updated", list(updated.values()))
+        return list(updated.values())
+
+    def delete_tasks(self, db, task_ids: List[int], owner_id: Optional[int] = None) -> List[models.Task]:
+        with self._lock:
+            deleted = [
+                self._remove_task(task_id) for task_id in set(task_ids)
+                if task_id in self._tasks and owner_id in (None, self._tasks[task_id].owner_id)
+            ]
+        self._changed("deleted", deleted)
+        return deleted
+
+    aget_user = _async_variant(get_user)
+    aget_user_by_email = _async_variant(get_user_by_email)
+    aget_users = _async_variant(get_users)
+    acreate_user = _async_variant(create_user)
+    aload_user_tasks = _async_variant(load_user_tasks)
+    aget_task = _async_variant(get_task)
+    aget_tasks = _async_variant(get_tasks)
+    aget_tasks_by_owner = _async_variant(get_tasks_by_owner)
+    asearch_tasks_by_owner = _async_variant(search_tasks_by_owner)
+    acreate_user_task = _async_variant(create_user_task)
+    aget_task_list_version = _async_variant(get_task_list_version)
+    aget_task_stats = _async_variant(get_task_stats)
+    aget_task_changes = _async_variant(get_task_changes)
+    aupdate_user_task = _async_variant(update_user_task)
+    adelete_user_task = _async_variant(delete_user_task)
+    aget_user_task = _async_variant(get_user_task)
+    aget_task_owners = _async_variant(get_task_owners)
+    acreate_user_tasks = _async_variant(create_user_tasks)
+    aupdate_tasks = _async_variant(update_tasks)
+    adelete_tasks = _async_variant(delete_tasks)
@@ -1,73 +1,511 @@
 # /app/routers/tasks.py
-from typing import List
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
-from .. import crud, models, schemas
-from ..database import get_db
-from ..dependencies import get_current_active_user
+from .. import backend, crud, etags, export, models, schemas
+from ..core.config import settings
+from ..core.response_cache import task_list_cache
+from ..core.singleflight import task_list_flights, task_read_flights
+from ..database import DBSession, aclose_session, is_replica_session, new_session_like
+from ..dependencies import get_current_active_user, get_read_db, get_write_db
+from ..events import KEEPALIVE_FRAME, resync_frame, task_events
+from ..pagination import decode_cursor, encode_cursor
+from ..serialization import field_names, json_response, row_to_json, rows_to_json, sparse_model, to_json
 
 router = APIRouter()
 
+
+def _check_bulk_size(items: list):
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items per bulk request",
+        )
+
+
+def _bulk_ownership_error(task_id: int, owners: Dict[int, int], user_id: int) -> Optional[schemas.TaskBulkResult]:
+    if task_id not in owners:
+        return schemas.TaskBulkResult(id=task_id, status_code=404, detail="Task not found")
+    if owners[task_id] != user_id:
+        return schemas.TaskBulkResult(id=task_id, status_code=403, detail="Not enough permissions")
+    return None
+
+
+async def _missing_task_error(db: DBSession, task_id: int, user_id: int) -> HTTPException:
+    """Tell 404 from 403 from 412 after an owner-scoped write matched no row."""
+    owners = await backend.store.aget_task_owners(db, [task_id])
+    if task_id not in owners:
+        return HTTPException(status_code=404, detail="Task not found")
+    if owners[task_id] != user_id:
+        return HTTPException(status_code=403, detail="Not enough permissions")
+    # Owned and still there: only an If-Match version can have missed.
+    return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Task has been modified")
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """``?fields=id,title`` as schemas.Task field names in schema order; None for all."""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if not requested:
+        raise HTTPException(status_code=400, detail="fields must name at least one field")
+    unknown = requested.difference(field_names(schemas.Task))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in field_names(schemas.Task) if name in requested)
+
+
+def _parse_sort(sort: Optional[str]) -> Tuple[Tuple[str, bool], ...]:
+    """``?sort=-priority,created_at`` as (field, descending) pairs."""
+    if sort is None:
+        return ()
+    keys = []
+    for item in sort.split(","):
+        item = item.strip()
+        name = item.removeprefix("-")
+        if name not in crud.TASK_SORT_KEYS:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by {item or 'an empty key'}; "
+                                f"sortable fields: {', '.join(crud.TASK_SORT_KEYS)}")
+        if any(name == seen for seen, _ in keys):
+            raise HTTPException(status_code=400, detail=f"Duplicate sort key: {name}")
+        keys.append((name, item.startswith("-")))
+    return tuple(keys)
+
+
+# The cursor holds the last row's values of the listing order's keys.
+
+def _cursor_for(row: Any, order: Sequence[Tuple[str, bool]]) -> str:
+    key = {}
+    for name, _ in order:
+        value = getattr(row, name)
+        key[name] = value.isoformat() if isinstance(value, datetime) else value
+    return encode_cursor(key)
+
+
+def _cursor_values(cursor: str, order: Sequence[Tuple[str, bool]]) -> Tuple[Any, ...]:
+    try:
+        key = decode_cursor(cursor)
+        return tuple(
+            datetime.fromisoformat(key[name]) if name == "created_at" else int(key[name])
+            for name, _ in order
+        )
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_params(
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[Any, ...]] = None,
+    names: Optional[Tuple[str, ...]] = None,
+    sort: Tuple[Tuple[str, bool], ...] = (),
+    filters: Optional[schemas.TaskFilter] = None,
+) -> Tuple[Any, ...]:
+    """What identifies a listing page in its cache key and list ETag."""
+    filters = filters if filters is not None else schemas.TaskFilter()
+    return (skip if after is None else None, limit, after, names, sort, tuple(filters.model_dump().values()))
+
+
+# A sync token holds the change_seq of the last change it covers.
+
+def _sync_token_seq(token: str) -> int:
+    try:
+        seq = decode_cursor(token)["seq"]
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return seq
+
+
+# A cached listing page is its headers as a JSON line followed by the body.
+
+def _encode_page(etag: str, next_cursor: Optional[str], total: Optional[int], body: bytes) -> bytes:
+    return json.dumps([etag, next_cursor, total]).encode() + b"\n" + body
+
+
+def _decode_page(cached: bytes) -> Tuple[str, Optional[str], Optional[int], bytes]:
+    headers, _, body = cached.partition(b"\n")
+    etag, next_cursor, total = json.loads(headers)
+    return etag, next_cursor, total, body
+
+
+def _bulk_success(db_task: models.Task, status_code: int = 200) -> schemas.TaskBulkResult:
+    return schemas.TaskBulkResult(
+        id=db_task.id, status_code=status_code, task=schemas.Task.model_validate(db_task, from_attributes=True)
+    )
+
+
+def _bulk_written(task_id: int, written: Dict[int, models.Task]) -> schemas.TaskBulkResult:
+    # The owner-scoped write skips tasks deleted since the ownership check.
+    if task_id not in written:
+        return schemas.TaskBulkResult(id=task_id, status_code=404, detail="Task not found")
+    return _bulk_success(written[task_id])
+
+
 @router.post("/tasks/", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
-def create_task(
+async def create_task(
     task: schemas.TaskCreate,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_write_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    return crud.create_user_task(db=db, task=task, user_id=current_user.id)
+    db_task = await backend.store.acreate_user_task(db=db, task=task, user_id=current_user.id)
+    return json_response(row_to_json(schemas.Task, db_task), status_code=201, headers={"ETag": etags.task_etag(db_task)})
+
+
+# The bulk routes must be registered before /tasks/{task_id}.
+
+@router.post("/tasks/bulk", response_model=List[schemas.TaskBulkResult], status_code=status.HTTP_201_CREATED)
+async def create_tasks_bulk(
+    tasks: List[schemas.TaskCreate],
+    db: DBSession = Depends(get_write_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    _check_bulk_size(tasks)
+    db_tasks = await backend.store.acreate_user_tasks(db, tasks=tasks, user_id=current_user.id)
+    results = [_bulk_success(db_task, status_code=201) for db_task in db_tasks]
+    return json_response(to_json(List[schemas.TaskBulkResult], results), status_code=201)
+
+
+@router.put("/tasks/bulk", response_model=List[schemas.TaskBulkResult])
+async def update_tasks_bulk(
+    tasks_in: List[schemas.TaskBulkUpdate],
+    db: DBSession = Depends(get_write_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    _check_bulk_size(tasks_in)
+    owners = await backend.store.aget_task_owners(db, [task_in.id for task_in in tasks_in])
+    errors = [_bulk_ownership_error(task_in.id, owners, current_user.id) for task_in in tasks_in]
+    values = [task_in.model_dump(exclude_unset=True) for task_in, error in zip(tasks_in, errors) if error is None]
+    updated = {
+        db_task.id: db_task for db_task in await backend.store.aupdate_tasks(db, values, owner_id=current_user.id)
+    }
+    results = [error or _bulk_written(task_in.id, updated) for task_in, error in zip(tasks_in, errors)]
+    return json_response(to_json(List[schemas.TaskBulkResult], results))
+
+
+@router.delete("/tasks/bulk", response_model=List[schemas.TaskBulkResult])
+async def delete_tasks_bulk(
+    task_ids: List[int] = Body(...),
+    db: DBSession = Depends(get_write_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    _check_bulk_size(task_ids)
+    owners = await backend.store.aget_task_owners(db, task_ids)
+    errors = [_bulk_ownership_error(task_id, owners, current_user.id) for task_id in task_ids]
+    to_delete = [task_id for task_id, error in zip(task_ids, errors) if error is None]
+    deleted = {
+        db_task.id: db_task for db_task in await backend.store.adelete_tasks(db, to_delete, owner_id=current_user.id)
+    }
+    results = [error or _bulk_written(task_id, deleted) for task_id, error in zip(task_ids, errors)]
+    return json_response(to_json(List[schemas.TaskBulkResult], results))
+
+
+@router.get("/tasks/export", response_class=StreamingResponse)
+async def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: DBSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Stream every task of the current user as NDJSON or CSV.
+
+    Rows are read in batches from a server-side cursor and written out as
+    they arrive, so memory use does not depend on the number of tasks.
+    """
+    owner_id = current_user.id
+    # The body is produced after the endpoint returns, so it gets its own session.
+    export_db = new_session_like(db)
+
+    async def body():
+        try:
+            if format == "csv":
+                yield export.csv_header([column.key for column in crud.TASK_EXPORT_COLUMNS])
+            async for batch in backend.store.aiter_task_batches_by_owner(
+                export_db, owner_id=owner_id, batch_size=settings.EXPORT_BATCH_SIZE
+            ):
+                yield export.csv_chunk(batch) if format == "csv" else export.ndjson_chunk(batch)
+        finally:
+            await aclose_session(export_db)
+
+    return StreamingResponse(
+        body(),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
+
+
+@router.get("/tasks/search", response_model=List[schemas.Task])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: DBSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Full-text search over the current user's task titles and descriptions.
+
+    Results are ranked by relevance (title matches weigh more); the last
+    word also matches as a prefix, so ``q=meet`` finds "meeting".
+    """
+    tasks = await backend.store.asearch_tasks_by_owner(
+        db, owner_id=current_user.id, q=q, skip=skip, limit=limit
+    )
+    return json_response(rows_to_json(schemas.Task, tasks))
+
+
+@router.get("/tasks/stream", response_class=StreamingResponse)
+async def stream_tasks(
+    db: DBSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Server-sent events for the current user's task writes, as they commit.
+
+    Events are ``created``, ``updated`` and ``deleted``, each carrying the
+    task as JSON; a comment line is sent as keep-alive. A stream that falls
+    too far behind gets a ``resync`` event and is closed. Open the stream
+    first, then catch up with GET /tasks/changes, so no write is missed.
+    """
+    if task_events.full:
+        raise HTTPException(status_code=503, detail="Too many open streams", headers={"Retry-After": "5"})
+    owner_id = current_user.id
+    # An idle stream must not pin a pool connection for as long as it is open.
+    await aclose_session(db)
+
+    async def body():
+        # Subscribed here, not in the endpoint: the generator's finally only
+        # runs once the response has started.
+        subscription = task_events.subscribe(owner_id)
+        try:
+            yield KEEPALIVE_FRAME
+            while True:
+                frame = await subscription.next(settings.TASK_STREAM_KEEPALIVE_SECONDS)
+                if frame is not None:
+                    yield frame
+                elif subscription.closed is not None:
+                    yield resync_frame(subscription.closed)
+                    return
+                else:
+                    yield KEEPALIVE_FRAME
+        finally:
+            task_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/tasks/stats", response_model=schemas.TaskStats)
+async def read_task_stats(
+    db: DBSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """The current user's task totals: overall, completed/open and per priority.
+
+    Read from the per-user counters the task writes maintain, so the cost
+    does not grow with the number of tasks.
+    """
+    stats = await backend.store.aget_task_stats(db, owner_id=current_user.id)
+    return json_response(to_json(schemas.TaskStats, stats))
+
+
+@router.get("/tasks/changes", response_model=schemas.TaskChanges)
+async def read_task_changes(
+    since: Optional[str] = Query(None, description="sync_token of the previous response; omit to sync everything"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: DBSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Tasks created, updated or deleted since ``since``, oldest first.
+
+    Start without ``since`` and keep passing the returned ``sync_token``;
+    ``has_more`` says another page is already waiting. Deleted tasks come
+    back as tombstones (id and deletion time). Served from (owner_id,
+    change_seq) indexes, so the cost follows the number of changes, not of
+    tasks.
+    """
+    seq = 0 if since is None else _sync_token_seq(since)
+    rows = await backend.store.aget_task_changes(
+        db, owner_id=current_user.id, since=seq, limit=limit + 1
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = {
+        "upserted": [row for row in rows if row.deleted_at is None],
+        "deleted": [row for row in rows if row.deleted_at is not None],
+        "sync_token": encode_cursor({"seq": rows[-1].change_seq if rows else seq}),
+        "has_more": has_more,
+    }
+    return json_response(to_json(schemas.TaskChanges, changes))
 
 
 @router.get("/tasks/", response_model=List[schemas.Task])
-def read_tasks(
+async def read_tasks(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated Task fields to return, e.g. id,title,completed"),
+    sort: Optional[str] = Query(None, description="Comma-separated sort keys (priority, created_at, id); "
+                                "prefix with - for descending, e.g. -priority,created_at"),
+    filters: schemas.TaskFilter = Depends(),
+    if_none_match: Optional[str] = Header(None),
+    db: DBSession = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    tasks = crud.get_tasks_by_owner(db, owner_id=current_user.id, skip=skip, limit=limit)
-    return tasks
+    """List the current user's tasks, by id unless ``sort`` says otherwise.
+
+    The filters combine with AND; ``created_after``/``created_before`` are
+    exclusive bounds. Ties in ``sort`` are broken by id. Every combination
+    is answered from an index on (owner_id, ...), never a table scan.
+    ``fields`` returns only the named Task fields and selects only those
+    columns (plus the sort keys, for the cursor).
+
+    Pass the ``X-Next-Cursor`` header of a page as ``after`` to get the next
+    one, with the same filters and sort; ``skip`` is kept as a legacy offset
+    and ignored when ``after`` is set.
+    The ``ETag`` changes whenever any of the user's tasks does; send it back
+    in ``If-None-Match`` to get a bodyless 304 while nothing changed.
+    Rendered pages are cached per owner until the owner's next task write,
+    and identical requests missing the cache at the same time share one query.
+    ``X-Total-Count`` is the number of tasks matching the filters, from the
+    owner's counters; it is left out when ``created_after``/``created_before``
+    is set, since the counters do not track creation time.
+    """
+    names = _parse_fields(fields)
+    sort_keys = _parse_sort(sort)
+    order = crud.task_listing_order(sort_keys)
+    after_values = None if after is None else _cursor_values(after, order)
+    page = page_params(skip, limit, after_values, names, sort_keys, filters)
+    # The key (and so the owner's version) is read before anything else: a
+    # write committed after this point can only be cached under a stale key.
+    cache_key = task_list_cache.key(current_user.id, *page)
+    cached = task_list_cache.get(cache_key)
+    if cached is not None:
+        etag, next_cursor, total, body = _decode_page(cached)
+    else:
+        # Likewise the ETag version before the page: a write in between can
+        # only make the ETag older than the body, costing one extra 200 later.
+        version = await backend.store.aget_task_list_version(
+            db, owner_id=current_user.id, filters=filters
+        )
+        etag = etags.list_etag(current_user.id, version.count, (version.created_at, version.updated_at), *page)
+        total = version.total
+        if etags.if_none_match(if_none_match, etag):
+            return _not_modified(etag)
+        columns = None
+        if names is not None:
+            keys = tuple(name for name, _ in order)
+            columns = keys + tuple(name for name in names if name not in keys)
+
+        async def render_page():
+            tasks = await backend.store.aget_tasks_by_owner(
+                db, owner_id=current_user.id, skip=skip, limit=limit, after=after_values,
+                columns=columns, filters=filters, sort=sort_keys,
+            )
+            next_cursor = _cursor_for(tasks[-1], order) if tasks and len(tasks) == limit else None
+            body = rows_to_json(schemas.Task if names is None else sparse_model(schemas.Task, names), tasks)
+            # A lagging replica could hand back a page older than the version.
+            if not is_replica_session(db):
+                task_list_cache.set(cache_key, _encode_page(etag, next_cursor, total, body))
+            return next_cursor, body
+
+        # Identical requests missing the cache at once share one query.
+        flight_key = task_list_flights.key(current_user.id, *page, is_replica_session(db))
+        next_cursor, body = await task_list_flights.run(flight_key, render_page)
+    if etags.if_none_match(if_none_match, etag):
+        return _not_modified(etag)
+    headers = {"ETag": etag}
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return json_response(body, headers=headers)
 
 
 @router.get("/tasks/{task_id}", response_model=schemas.Task)
-def read_task(
+async def read_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: DBSession = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    db_task = crud.get_task(db, task_id=task_id)
-    if db_task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if db_task.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    return db_task
+    """One of the current user's tasks.
+
+    Identical requests arriving while one is being answered wait for it and
+    share its response body instead of each querying the database.
+    """
+    async def render_task():
+        db_task = await backend.store.aget_task(db, task_id=task_id)
+        if db_task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if db_task.owner_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+        return etags.task_etag(db_task), row_to_json(schemas.Task, db_task)
+
+    flight_key = task_read_flights.key(current_user.id, task_id, is_replica_session(db))
+    etag, body = await task_read_flights.run(flight_key, render_task)
+    if etags.if_none_match(if_none_match, etag):
+        return _not_modified(etag)
+    return json_response(body, headers={"ETag": etag})
 
 
 @router.put("/tasks/{task_id}", response_model=schemas.Task)
-def update_task(
+async def update_task(
     task_id: int,
     task_in: schemas.TaskUpdate,
-    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None),
+    db: DBSession = Depends(get_write_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    db_task = await backend.store.aupdate_user_task(
+        db,
+        task_id=task_id,
+        user_id=current_user.id,
+        values=task_in.model_dump(exclude_unset=True),
+        versions=etags.if_match_versions(if_match, task_id),
+    )
+    if db_task is None:
+        raise await _missing_task_error(db, task_id, current_user.id)
+    return json_response(row_to_json(schemas.Task, db_task), headers={"ETag": etags.task_etag(db_task)})
+
+
+@router.patch("/tasks/{task_id}", response_model=schemas.Task)
+async def patch_task(
+    task_id: int,
+    task_in: schemas.TaskPatch,
+    if_match: Optional[str] = Header(None),
+    db: DBSession = Depends(get_write_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    db_task = crud.get_task(db, task_id=task_id)
+    db_task = await backend.store.aupdate_user_task(
+        db,
+        task_id=task_id,
+        user_id=current_user.id,
+        values=task_in.model_dump(exclude_unset=True),
+        versions=etags.if_match_versions(if_match, task_id),
+    )
     if db_task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if db_task.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    return crud.update_task(db=db, db_task=db_task, task_in=task_in)
+        raise await _missing_task_error(db, task_id, current_user.id)
+    return json_response(row_to_json(schemas.Task, db_task), headers={"ETag": etags.task_etag(db_task)})
 
 
 @router.delete("/tasks/{task_id}", response_model=schemas.Task)
-def delete_task(
+async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None),
+    db: DBSession = Depends(get_write_db),
     current_user: models.User = Depends(get_current_active_user),
 ):
-    db_task = crud.get_task(db, task_id=task_id)
+    db_task = await backend.store.adelete_user_task(
+        db, task_id=task_id, user_id=current_user.id, versions=etags.if_match_versions(if_match, task_id)
+    )
     if db_task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if db_task.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-    return crud.delete_task(db=db, db_task=db_task)
+        raise await _missing_task_error(db, task_id, current_user.id)
+    return json_response(row_to_json(schemas.Task, db_task))
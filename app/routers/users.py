@@ -1,26 +1,41 @@
 # /app/routers/users.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
-from .. import crud, models, schemas
+from .. import backend, models, schemas
+from .. import database
 from ..core import security
-from ..database import get_db
-from ..dependencies import get_current_active_user
+from ..database import DBSession, get_db
+from ..dependencies import get_current_active_user, get_read_db, get_write_db, limit_client_rate
+from ..serialization import json_response, row_to_json, to_json
 
 router = APIRouter()
 
-@router.post("/users/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
-    if db_user:
+# Upper bound for /users/me/?include_tasks=N
+INCLUDE_TASKS_MAX = 1000
+
+# Both bcrypt-bound entry points are rate limited per client address.
+@router.post(
+    "/users/", response_model=schemas.User, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_client_rate)],
+)
+async def create_user(user: schemas.UserCreate, db: DBSession = Depends(get_write_db)):
+    # bcrypt must never run on the event loop (nor inside AsyncSession.run_sync).
+    hashed_password = await security.aget_password_hash(user.password)
+    db_user = await backend.store.acreate_user(db=db, user=user, hashed_password=hashed_password)
+    if db_user is None:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    # The new account's first authenticated reads must not hit a lagging replica.
+    database.primary_stickiness.mark(db_user.email)
+    return json_response(row_to_json(schemas.User, db_user), status_code=201)
 
-@router.post("/token", response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+# Reads the primary: the account may have been created moments ago.
+@router.post("/token", response_model=schemas.Token, dependencies=[Depends(limit_client_rate)])
+async def login_for_access_token(db: DBSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await backend.store.aget_user_by_email(db, email=form_data.username)
+    if not user or not await security.averify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -29,6 +44,14 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     access_token = security.create_access_token(subject=user.email)
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.get("/users/me/", response_model=schemas.User)
-def read_users_me(current_user: models.User = Depends(get_current_active_user)):
-    return current_user
+@router.get("/users/me/", response_model=Union[schemas.UserWithTasks, schemas.User])
+async def read_users_me(
+    include_tasks: Optional[int] = Query(None, ge=0, le=INCLUDE_TASKS_MAX),
+    db: DBSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """Return the current user; ``include_tasks=N`` embeds their first N tasks."""
+    if include_tasks is None:
+        return json_response(row_to_json(schemas.User, current_user))
+    await backend.store.aload_user_tasks(db, current_user, limit=include_tasks)
+    return json_response(to_json(schemas.UserWithTasks, current_user))
@@ -1,7 +1,7 @@
 # /app/schemas.py
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
 
 # ============================================================================
 # SCHEMAS - TAREFAS
@@ -18,15 +18,81 @@ class TaskCreate(TaskBase):
 class TaskUpdate(TaskBase):
     pass
 
+class TaskPatch(BaseModel):
+    """Partial update: only the fields present in the request are changed."""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    priority: Optional[int] = None
+    completed: Optional[bool] = None
+
+    @field_validator("title", "priority", "completed")
+    @classmethod
+    def not_null(cls, value):
+        # Omitted is fine (defaults are not validated); explicit null is not.
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
 class Task(TaskBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     owner_id: int
     completed: bool
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+class TaskFilter(BaseModel):
+    """Query filters of GET /tasks/; all optional, combined with AND."""
+    completed: Optional[bool] = None
+    priority_min: Optional[int] = None
+    priority_max: Optional[int] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+    @field_validator("created_after", "created_before")
+    @classmethod
+    def naive_utc(cls, value):
+        # Timestamps are stored as naive UTC.
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class TaskStats(BaseModel):
+    """GET /tasks/stats: the current user's task totals."""
+    total: int
+    completed: int
+    open: int
+    # Number of tasks per priority (JSON object keys are strings).
+    by_priority: Dict[int, int]
+
+class TaskDeletion(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    deleted_at: datetime
+
+class TaskChanges(BaseModel):
+    """GET /tasks/changes: the changes after a sync token, oldest first.
+
+    Apply ``deleted`` before ``upserted``: an id can be in both only when a
+    deleted task's id was reused by a newer one.
+    """
+    upserted: List[Task]
+    deleted: List[TaskDeletion]
+    # Send back as ``since`` for the next changes.
+    sync_token: str
+    has_more: bool
+
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+class TaskBulkResult(BaseModel):
+    """Outcome of one item of a bulk request; ``status_code`` is per item."""
+    id: Optional[int] = None
+    status_code: int
+    detail: Optional[str] = None
+    task: Optional[Task] = None
 
 # ============================================================================
 # SCHEMAS - USUÁRIOS
@@ -39,12 +105,13 @@ class UserCreate(UserBase):
     password: str
 
 class User(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     is_active: bool
-    tasks: List[Task] = []
 
-    class Config:
-        orm_mode = True
+class UserWithTasks(User):
+    tasks: List[Task]
 
 # ============================================================================
 # SCHEMAS - TOKEN
@@ -0,0 +1,67 @@
+# /app/serialization.py
+import functools
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter, create_model
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+# Default response class for routes that return plain dicts: orjson when
+# available, the stdlib encoder otherwise.
+DefaultJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+# FastAPI answers a ``response_model`` route by validating the return value
+# against the model, dumping it to JSON-able Python objects and handing
+# those to the JSON encoder. The helpers below produce the body bytes
+# directly; routes keep ``response_model`` for the OpenAPI docs only.
+
+
+@functools.lru_cache(maxsize=None)
+def type_adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def to_json(tp: Any, value: Any) -> bytes:
+    """Validate ``value`` (ORM objects, models or dicts) as ``tp`` and dump it."""
+    adapter = type_adapter(tp)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+@functools.lru_cache(maxsize=None)
+def field_names(model: Type[BaseModel]) -> Tuple[str, ...]:
+    return tuple(model.model_fields)
+
+
+@functools.lru_cache(maxsize=256)
+def sparse_model(model: Type[BaseModel], names: Tuple[str, ...]) -> Type[BaseModel]:
+    """``model`` trimmed to ``names`` (a subset of its fields), e.g. for ?fields=."""
+    fields = {name: (model.model_fields[name].annotation, model.model_fields[name]) for name in names}
+    return create_model(f"{model.__name__}_{'_'.join(names)}", __config__=model.model_config, **fields)
+
+
+def rows_to_json(model: Type[BaseModel], rows: Iterable[Any]) -> bytes:
+    """Dump rows just loaded from the database as a JSON list of ``model``.
+
+    The rows already hold the model's scalar fields as columns, so this skips
+    pydantic validation (most of the cost of ``to_json`` on ORM objects) and
+    writes the field values with orjson. The output matches
+    ``to_json(List[model], rows)``; only flat models qualify.
+    """
+    if orjson is None:
+        return to_json(List[model], rows)
+    names = field_names(model)
+    return orjson.dumps([{name: getattr(row, name) for name in names} for row in rows], option=orjson.OPT_UTC_Z)
+
+
+def row_to_json(model: Type[BaseModel], row: Any) -> bytes:
+    if orjson is None:
+        return to_json(model, row)
+    return orjson.dumps({name: getattr(row, name) for name in field_names(model)}, option=orjson.OPT_UTC_Z)
+
+
+def json_response(body: bytes, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,158 @@
+# /app/startup.py
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from jose import jwt
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from . import IMPORT_STARTED, models
+from .core import security
+from .core.config import settings
+from .database import async_engine, engine, read_engines
+from .serialization import field_names, type_adapter
+
+logger = logging.getLogger(__name__)
+
+# What the lifespan hook does with the schema before serving:
+#   "create": create missing tables, indexes and triggers (create_all plus
+#             the FTS and counter installs) and stamp SCHEMA_VERSION;
+#   "check":  only verify the database is at SCHEMA_VERSION, failing
+#             startup otherwise. One query, for scaled-out workers that
+#             start against a database someone already migrated;
+#   "skip":   trust the database.
+SCHEMA_MODES = ("create", "check", "skip")
+
+# Bump when a change to models needs SCHEMA_MODE=create to run once.
+SCHEMA_VERSION = 3
+
+
+class SchemaMismatch(RuntimeError):
+    pass
+
+
+def create_schema(connection) -> None:
+    models.Base.metadata.create_all(bind=connection)
+    # create_all skips existing tables, so older databases get the search
+    # index, the counter triggers and tasks.change_seq here.
+    models.install_task_search(connection)
+    models.install_task_counters(connection)
+    models.install_task_changes(connection)
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def check_schema(connection) -> None:
+    """Raise SchemaMismatch unless the database holds the current schema.
+
+    SQLite stores the version in ``PRAGMA user_version``; elsewhere the
+    tables are only checked for existence.
+    """
+    if connection.dialect.name == "sqlite":
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+        if version != SCHEMA_VERSION:
+            raise SchemaMismatch(
+                f"database schema is at version {version}, expected {SCHEMA_VERSION}; "
+                "start once with SCHEMA_MODE=create"
+            )
+        return
+    inspector = inspect(connection)
+    missing = [name for name in models.Base.metadata.tables if not inspector.has_table(name)]
+    if missing:
+        raise SchemaMismatch(f"missing tables: {', '.join(missing)}; start once with SCHEMA_MODE=create")
+
+
+def prepare_schema(mode: str = settings.SCHEMA_MODE) -> None:
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"SCHEMA_MODE must be one of {SCHEMA_MODES}, got {mode!r}")
+    if mode == "create":
+        with engine.begin() as connection:
+            create_schema(connection)
+    elif mode == "check":
+        with engine.connect() as connection:
+            check_schema(connection)
+
+
+# ============================================================================
+# WARM-UP
+# ============================================================================
+# Work the first requests would otherwise pay for, done before the worker
+# reports ready: opening pool connections (and applying the SQLite pragmas
+# to them), building each response model's validator and serializer, and
+# loading the JWT and bcrypt backends.
+
+def _warm_engine(sync_engine: Engine, count: int) -> None:
+    # Held at the same time, so the pool ends up with ``count`` connections.
+    connections = [sync_engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.exec_driver_sql("SELECT 1")
+        connection.close()
+
+
+async def _warm_async_engine(engine_: Any, count: int) -> None:
+    async def touch():
+        async with engine_.connect() as connection:
+            await connection.exec_driver_sql("SELECT 1")
+
+    await asyncio.gather(*(touch() for _ in range(count)))
+
+
+def _response_models(app: FastAPI) -> List[Any]:
+    return list(dict.fromkeys(
+        route.response_model for route in app.routes
+        if isinstance(route, APIRoute) and route.response_model is not None
+    ))
+
+
+def warm_serializers(app: FastAPI) -> int:
+    response_models = _response_models(app)
+    for response_model in response_models:
+        type_adapter(response_model)
+        item = getattr(response_model, "__args__", (response_model,))[0]
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            field_names(item)
+    return len(response_models)
+
+
+def warm_crypto() -> None:
+    # Straight to jose: a warm-up token has no business in the token cache.
+    jwt.decode(security.create_access_token("warm-up"), settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    security.pwd_context.handler("bcrypt").get_backend()
+
+
+async def warm_up(app: FastAPI, connections: int = settings.STARTUP_WARM_CONNECTIONS) -> None:
+    if connections > 0:
+        _warm_engine(engine, connections)
+        for engine_ in ([async_engine] if async_engine is not None else []) + read_engines:
+            if isinstance(engine_, Engine):
+                _warm_engine(engine_, connections)
+            else:
+                await _warm_async_engine(engine_, connections)
+    warm_serializers(app)
+    warm_crypto()
+
+
+# Filled in by ``startup``; shown in /api/v1/health and /api/v1/metrics.
+startup_report: Dict[str, Any] = {}
+
+
+async def startup(app: FastAPI) -> Dict[str, Any]:
+    started = time.perf_counter()
+    prepare_schema()
+    schema_done = time.perf_counter()
+    if settings.STARTUP_WARMUP:
+        await warm_up(app)
+    ready = time.perf_counter()
+    startup_report.update({
+        "schema_mode": settings.SCHEMA_MODE,
+        "schema_seconds": round(schema_done - started, 6),
+        "warmup_seconds": round(ready - schema_done, 6) if settings.STARTUP_WARMUP else None,
+        "import_to_ready_seconds": round(ready - IMPORT_STARTED, 6),
+    })
+    logger.info("Ready %.1f ms after import (schema %s)", (ready - IMPORT_STARTED) * 1000, settings.SCHEMA_MODE)
+    return startup_report
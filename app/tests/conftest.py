@@ -0,0 +1,13 @@
+# /app/tests/conftest.py
+import pytest
+
+from app.core.admission import client_rate_limiter, user_rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def _reset_rate_limits():
+    # Every TestClient request comes from the same address and the suite
+    # signs in far more often than any client should.
+    client_rate_limiter.store.clear()
+    user_rate_limiter.store.clear()
+    yield
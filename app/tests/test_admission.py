@@ -0,0 +1,81 @@
+# /app/tests/test_admission.py
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.admission import (
+    AdmissionControl, AdmissionMiddleware, MemoryRateLimitStore, RateLimiter, RateLimitStore,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_bursts_then_refills():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=2.0, burst=3, clock=clock)
+    assert [limiter.check("alice") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("alice") == 0.5
+    # Other keys have their own bucket.
+    assert limiter.check("bob") == 0.0
+    clock.now = 0.5
+    assert limiter.check("alice") == 0.0
+    assert limiter.rejected == 1
+    assert RateLimiter(rate=0, burst=1).check("anyone") == 0.0
+
+def test_memory_store_is_bounded():
+    store = MemoryRateLimitStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.take(key, rate=1.0, burst=1, now=0.0)
+    # "a" was evicted, so it starts again from a full bucket.
+    assert store.take("a", rate=1.0, burst=1, now=0.0) == 0.0
+    assert store.take("c", rate=1.0, burst=1, now=0.0) == 1.0
+
+def test_incomplete_store_fails_on_construction():
+    class NoClear(RateLimitStore):
+        def take(self, key, rate, burst, now):
+            return 0.0
+
+    with pytest.raises(TypeError):
+        NoClear()
+
+def test_admission_sheds_beyond_in_flight_limits():
+    control = AdmissionControl(max_in_flight=3, route_limits={"/slow": 1})
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope["path"] == "/slow":
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=AdmissionMiddleware(app, control=control))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.get("/slow"))
+            await asyncio.sleep(0.01)
+            # The route's only slot is taken; other paths still get in.
+            shed = await client.get("/slow")
+            other = await client.get("/fast")
+            release.set()
+            return await first, shed, other
+
+    first, shed, other = asyncio.run(scenario())
+    assert (first.status_code, shed.status_code, other.status_code) == (200, 503, 200)
+    assert shed.headers["Retry-After"] == "1"
+    assert control.rejected == {"global": 0, "route": 1}
+    assert control.in_flight == 0
+
+    control = AdmissionControl(max_in_flight=1, exempt_paths=["/stream"])
+    assert control.admit("/a") and not control.admit("/b")
+    assert control.admit("/stream") and control.in_flight == 1
+    control.release("/stream")
+    control.release("/a")
+    assert control.admit("/b")
+    assert control.rejected == {"global": 1, "route": 0}
@@ -0,0 +1,83 @@
+# /app/tests/test_async.py
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core.response_cache import task_list_cache
+from app.main import app
+from app.database import Base, get_async_database_url, get_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_async.db"
+
+# The schema is managed through a sync engine; requests go through aiosqlite.
+engine = create_engine(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(get_async_database_url(SQLALCHEMY_DATABASE_URL))
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+_previous_override = None
+
+def setup_function():
+    global _previous_override
+    _previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    task_list_cache.clear()
+    Base.metadata.create_all(bind=engine)
+
+def teardown_function():
+    Base.metadata.drop_all(bind=engine)
+    if _previous_override is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = _previous_override
+
+def get_auth_header():
+    client.post("/api/v1/users/", json={"email": "asyncuser@example.com", "password": "asyncpassword"})
+    login_response = client.post("/api/v1/token", data={"username": "asyncuser@example.com", "password": "asyncpassword"})
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_get_async_database_url():
+    assert get_async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert get_async_database_url("sqlite+aiosqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+
+def test_task_lifecycle_with_async_session():
+    headers = get_auth_header()
+    post_response = client.post("/api/v1/tasks/", headers=headers, json={"title": "Async Task", "priority": 2})
+    assert post_response.status_code == 201, post_response.text
+    task_id = post_response.json()["id"]
+
+    response = client.get("/api/v1/tasks/", headers=headers)
+    assert response.status_code == 200
+    assert [t["id"] for t in response.json()] == [task_id]
+
+    response = client.put(f"/api/v1/tasks/{task_id}", headers=headers, json={"title": "Async Updated"})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Async Updated"
+
+    response = client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert response.status_code == 200
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=headers).status_code == 404
+
+def test_read_users_me_with_async_session():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/", headers=headers, json={"title": "Mine"})
+    response = client.get("/api/v1/users/me/", headers=headers, params={"include_tasks": 10})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["email"] == "asyncuser@example.com"
+    assert [t["title"] for t in data["tasks"]] == ["Mine"]
+
+def test_export_tasks_with_async_session():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/bulk", headers=headers, json=[{"title": f"Streamed {i}"} for i in range(3)])
+    response = client.get("/api/v1/tasks/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.text.splitlines()) == 3
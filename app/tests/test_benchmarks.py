@@ -0,0 +1,57 @@
+# /app/tests/test_benchmarks.py
+import asyncio
+import json
+
+from app import schemas
+from app.serialization import rows_to_json
+from benchmarks.report import compare_reports, format_comparison, percentile, summarize
+from benchmarks.serialization import make_tasks, response_model_renderer, run
+
+
+def make_report(p95_ms, throughput_rps, errors=0):
+    return {"results": [{
+        "route": "GET /api/v1/tasks/", "concurrency": 10, "requests": 100, "errors": errors,
+        "throughput_rps": throughput_rps, "p50_ms": 1.0, "p95_ms": p95_ms, "p99_ms": p95_ms,
+    }]}
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 99) == 99
+    assert percentile([], 95) == 0.0
+
+def test_summarize_reports_milliseconds_and_throughput():
+    row = summarize("GET /api/v1/health", 2, [0.001, 0.002, 0.003, 0.004], errors=1, elapsed=0.5)
+    assert row["requests"] == 4
+    assert row["errors"] == 1
+    assert row["throughput_rps"] == 8.0
+    assert row["p50_ms"] == 2.0
+    assert row["p99_ms"] == 4.0
+
+def test_compare_reports_passes_within_threshold():
+    assert compare_reports(make_report(10.0, 1000.0), make_report(11.0, 950.0), max_regression=0.2) == []
+
+def test_compare_reports_flags_regressions():
+    failures = compare_reports(make_report(10.0, 1000.0), make_report(13.0, 700.0), max_regression=0.2)
+    assert len(failures) == 2
+
+def test_compare_reports_absolute_thresholds():
+    failures = compare_reports({}, make_report(50.0, 100.0, errors=10), max_p95_ms=20.0, max_error_rate=0.05)
+    assert len(failures) == 2
+
+def test_format_comparison_shows_change_per_route():
+    text = format_comparison(make_report(10.0, 1000.0), make_report(5.0, 1500.0))
+    assert "+50.0%" in text
+    assert "-50.0%" in text
+
+def test_serialization_paths_render_the_same_json():
+    tasks = make_tasks(3)
+    tasks[0].updated_at = None
+    loop = asyncio.new_event_loop()
+    try:
+        expected = json.loads(response_model_renderer(loop)(tasks))
+    finally:
+        loop.close()
+    assert json.loads(rows_to_json(schemas.Task, tasks)) == expected
+    assert [row["page_size"] for row in run([1, 5], repeat=2)] == [1, 5]
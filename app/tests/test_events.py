@@ -0,0 +1,156 @@
+# /app/tests/test_events.py
+import asyncio
+import json
+import threading
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.core import metrics
+from app.core.admission import admission
+from app.database import Base, get_db
+from app.events import TaskEventHub, task_events
+from app.main import app
+
+engine = create_engine("sqlite:///./test_events.db", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+def setup_function():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+
+def teardown_function():
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def _task(task_id: int, owner_id: int) -> models.Task:
+    return models.Task(id=task_id, title=f"T{task_id}", description=None, priority=1, completed=False,
+                       created_at=models.utcnow(), updated_at=None, owner_id=owner_id)
+
+
+def test_hub_fans_out_to_the_owner_only():
+    hub = TaskEventHub()
+
+    async def scenario():
+        mine, also_mine, theirs = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+        # Published from a worker thread, as sync-mode crud writes are.
+        thread = threading.Thread(target=hub.publish, args=("created", _task(7, 1)))
+        thread.start()
+        thread.join()
+        frames = [await mine.next(1), await also_mine.next(1), await theirs.next(0.01)]
+        for subscription in (mine, also_mine, theirs):
+            hub.unsubscribe(subscription)
+        return frames
+
+    mine, also_mine, theirs = asyncio.run(scenario())
+    assert mine is also_mine
+    assert mine.startswith(b"event: created\ndata: ") and json.loads(mine.split(b"data: ")[1])["id"] == 7
+    assert theirs is None
+    assert hub.stats() == {"subscribers": 0, "published": 1, "dropped": 0}
+    # Nobody listening: nothing is rendered.
+    hub.publish("updated", _task(7, 1))
+    assert hub.published == 1
+
+def test_slow_subscribers_are_closed():
+    hub = TaskEventHub(max_subscribers=1, max_pending=2)
+
+    async def scenario():
+        subscription = hub.subscribe(1)
+        assert hub.full
+        for task_id in range(3):
+            hub.publish("created", _task(task_id, 1))
+        frame = await subscription.next(1)
+        hub.unsubscribe(subscription)
+        return subscription.closed, frame
+
+    assert asyncio.run(scenario()) == ("overflow", None)
+    assert hub.dropped == 1 and not hub.full
+
+
+def _stream_scope(token: str) -> dict:
+    # Streams are driven over raw ASGI: the test clients buffer whole responses.
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/v1/tasks/stream", "raw_path": b"/api/v1/tasks/stream",
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 5000), "server": ("test", 80),
+        "headers": [(b"host", b"test"), (b"authorization", f"Bearer {token}".encode())],
+    }
+
+def _sign_up(client: TestClient, email: str) -> str:
+    client.post("/api/v1/users/", json={"email": email, "password": "password"})
+    return client.post("/api/v1/token", data={"username": email, "password": "password"}).json()["access_token"]
+
+
+def test_stream_pushes_committed_writes():
+    client = TestClient(app)
+    token = _sign_up(client, "stream@example.com")
+
+    def create_task():
+        with TestingSessionLocal() as db:
+            user = crud.get_user_by_email(db, "stream@example.com")
+            return crud.create_user_task(db, schemas.TaskCreate(title="Pushed"), user.id).id
+
+    async def scenario():
+        messages, disconnected = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        served = asyncio.create_task(app(_stream_scope(token), receive, messages.put))
+        start = await asyncio.wait_for(messages.get(), 5)
+        keepalive = await asyncio.wait_for(messages.get(), 5)
+        # Streams hold no in-flight slot.
+        in_flight = admission.in_flight
+        task_id = await asyncio.to_thread(create_task)
+        event = await asyncio.wait_for(messages.get(), 5)
+        disconnected.set()
+        await asyncio.wait_for(served, 5)
+        return start, keepalive["body"], event["body"], task_id, in_flight
+
+    start, keepalive, event, task_id, in_flight = asyncio.run(scenario())
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+    assert keepalive == b": keepalive\n\n"
+    assert event.startswith(b"event: created\n")
+    assert json.loads(event.split(b"data: ")[1]) | {"created_at": None} == {
+        "id": task_id, "title": "Pushed", "description": None, "priority": 1, "completed": False,
+        "owner_id": 1, "created_at": None, "updated_at": None,
+    }
+    assert in_flight == 0
+    assert task_events.stats()["subscribers"] == 0
+    assert client.get("/api/v1/tasks/stream").status_code == 401
+
+def test_stream_duration_is_not_its_lifetime():
+    token = _sign_up(TestClient(app), "metered@example.com")
+    metrics.registry.reset()
+
+    async def scenario():
+        messages, disconnected = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        served = asyncio.create_task(app(_stream_scope(token), receive, messages.put))
+        await asyncio.wait_for(messages.get(), 5)
+        # The client stays connected well past any real request time.
+        await asyncio.sleep(0.5)
+        disconnected.set()
+        await asyncio.wait_for(served, 5)
+
+    asyncio.run(scenario())
+    histogram = metrics.registry.latency[("GET", "/api/v1/tasks/stream", "200")]
+    assert histogram.count == 1
+    assert histogram.sum < 0.5
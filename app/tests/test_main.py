@@ -1,10 +1,64 @@
 # /app/tests/test_main.py
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app import startup
 from app.main import app
+from app.database import apply_sqlite_profile, check_sqlite_profile, engine, get_sqlite_pragmas
+from app.serialization import type_adapter
 
 client = TestClient(app)
 
 def test_health_check():
     response = client.get("/api/v1/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "healthy"}
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert data["database"]["backend"] == "sqlite"
+    assert data["database"]["profile"] == "wal"
+    assert data["database"]["pragmas"]["journal_mode"] == "wal"
+    assert data["database"]["mismatches"] == {}
+
+def test_sqlite_profiles_apply_pragmas(tmp_path):
+    pragmas = get_sqlite_pragmas("performance")
+    profile_engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    apply_sqlite_profile(profile_engine, pragmas)
+    report = check_sqlite_profile(profile_engine, pragmas)
+    assert report["mismatches"] == {}
+    assert report["pragmas"]["journal_mode"] == "wal"
+    assert report["pragmas"]["temp_store"] == 2
+    assert report["pragmas"]["busy_timeout"] == 5000
+
+def test_sqlite_profile_mismatch_is_reported():
+    pragmas = get_sqlite_pragmas("wal")
+    memory_engine = create_engine("sqlite://")
+    apply_sqlite_profile(memory_engine, pragmas)
+    report = check_sqlite_profile(memory_engine, pragmas)
+    assert report["mismatches"]["journal_mode"] == {"requested": "wal", "effective": "memory"}
+
+def test_unknown_sqlite_profile():
+    with pytest.raises(ValueError):
+        get_sqlite_pragmas("turbo")
+
+def test_startup_prepares_schema_and_warms_up():
+    with TestClient(app) as started:
+        # The pool already holds the warm-up connections.
+        assert engine.pool.checkedin() >= 2
+        report = started.get("/api/v1/health").json()["startup"]
+        assert report["schema_mode"] == "create"
+        assert 0 < report["import_to_ready_seconds"]
+        assert "app_import_to_ready_seconds" in started.get("/api/v1/metrics").text
+    assert type_adapter.cache_info().currsize >= startup.warm_serializers(app)
+
+def test_schema_check_mode(tmp_path):
+    schema_engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    with schema_engine.begin() as connection:
+        with pytest.raises(startup.SchemaMismatch):
+            startup.check_schema(connection)
+        startup.create_schema(connection)
+        startup.check_schema(connection)
+        assert connection.exec_driver_sql("PRAGMA user_version").scalar() == startup.SCHEMA_VERSION
+
+def test_unknown_schema_mode():
+    with pytest.raises(ValueError):
+        startup.prepare_schema("lazy")
@@ -0,0 +1,91 @@
+# /app/tests/test_metrics.py
+import re
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core import metrics
+from app.core.response_cache import task_list_cache
+from app.main import app
+from app.database import Base, get_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_metrics.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+metrics.instrument_engine(engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+_previous_override = None
+
+def setup_function():
+    global _previous_override
+    _previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    task_list_cache.clear()
+    Base.metadata.create_all(bind=engine)
+    metrics.registry.reset()
+
+def teardown_function():
+    Base.metadata.drop_all(bind=engine)
+    if _previous_override is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = _previous_override
+
+def get_auth_header():
+    client.post("/api/v1/users/", json={"email": "metrics@example.com", "password": "metricspassword"})
+    login_response = client.post("/api/v1/token", data={"username": "metrics@example.com", "password": "metricspassword"})
+    token = login_response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def metric_value(text, name, **labels):
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(label_text)}\}} (\S+)$", text, re.MULTILINE)
+    assert match, f"{name}{{{label_text}}} not found"
+    return float(match.group(1))
+
+def test_metrics_labels_by_route_template_and_status():
+    headers = get_auth_header()
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Measured"}).json()["id"]
+    client.get(f"/api/v1/tasks/{task_id}", headers=headers)
+    client.get("/api/v1/tasks/999999", headers=headers)
+
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    route = "/api/v1/tasks/{task_id}"
+    assert metric_value(text, "http_request_duration_seconds_count", method="GET", route=route, status="200") == 1
+    assert metric_value(text, "http_request_duration_seconds_count", method="GET", route=route, status="404") == 1
+    assert f"/api/v1/tasks/{task_id}\"" not in text
+
+def test_metrics_count_database_queries_per_route():
+    headers = get_auth_header()
+    client.get("/api/v1/tasks/", headers=headers)
+    client.get("/api/v1/tasks/", headers=headers)
+
+    text = client.get("/api/v1/metrics").text
+    # get_current_user's lookup, the ETag version and the page, then the
+    # second request is served from the listing cache after the lookup.
+    assert metric_value(text, "http_db_queries_total", method="GET", route="/api/v1/tasks/") == 4
+    assert metric_value(text, "http_db_duration_seconds_count", method="GET", route="/api/v1/tasks/") == 2
+
+def test_metrics_unmatched_paths_share_one_label():
+    client.get("/no/such/path")
+    client.get("/another/missing/path")
+    text = client.get("/api/v1/metrics").text
+    assert metric_value(
+        text, "http_request_duration_seconds_count", method="GET", route=metrics.UNMATCHED_ROUTE, status="404"
+    ) == 2
@@ -0,0 +1,117 @@
+# /app/tests/test_replicas.py
+import shutil
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app import database, dependencies, models
+from app.core import metrics, security
+from app.core.response_cache import task_list_cache
+from app.main import app
+from app.database import Base, PrimaryStickiness, get_db
+
+# The primary is a SQLite file; the replicas are plain copies of it taken
+# after seeding, so rows inserted into one file show which one served a read.
+PRIMARY_PATH = "./test_replica_primary.db"
+REPLICA_PATHS = ["./test_replica_1.db", "./test_replica_2.db"]
+
+engine = create_engine(f"sqlite:///{PRIMARY_PATH}", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+_previous_override = None
+_previous_stickiness = None
+EMAIL = "replica@example.com"
+
+def setup_function():
+    global _previous_override, _previous_stickiness
+    _previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    task_list_cache.clear()
+    _previous_stickiness = database.primary_stickiness
+    database.primary_stickiness = PrimaryStickiness(window=60)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User).values(email=EMAIL, hashed_password="x"))
+    engine.dispose()
+    for path in REPLICA_PATHS:
+        shutil.copyfile(PRIMARY_PATH, path)
+    database.configure_read_replicas([f"sqlite:///{path}" for path in REPLICA_PATHS])
+
+def teardown_function():
+    database.configure_read_replicas([])
+    database.primary_stickiness = _previous_stickiness
+    Base.metadata.drop_all(bind=engine)
+    if _previous_override is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = _previous_override
+
+def auth_header():
+    return {"Authorization": f"Bearer {security.create_access_token(subject=EMAIL)}"}
+
+def add_task_to_file(path, title):
+    replica_engine = create_engine(f"sqlite:///{path}")
+    with replica_engine.begin() as conn:
+        conn.execute(insert(models.Task).values(title=title, owner_id=1))
+    replica_engine.dispose()
+
+def titles(response):
+    assert response.status_code == 200, response.text
+    return sorted(t["title"] for t in response.json())
+
+def test_reads_are_spread_over_replicas():
+    add_task_to_file(REPLICA_PATHS[0], "Only on replica 1")
+    add_task_to_file(REPLICA_PATHS[1], "Only on replica 2")
+    seen = {tuple(titles(client.get("/api/v1/tasks/", headers=auth_header()))) for _ in range(4)}
+    assert seen == {("Only on replica 1",), ("Only on replica 2",)}
+
+def test_reads_stick_to_primary_after_a_write():
+    headers = auth_header()
+    response = client.post("/api/v1/tasks/", headers=headers, json={"title": "Just written"})
+    assert response.status_code == 201, response.text
+    # The replicas never see this row; only the primary can answer.
+    for _ in range(3):
+        assert titles(client.get("/api/v1/tasks/", headers=headers)) == ["Just written"]
+
+def test_token_is_decoded_once_per_request(monkeypatch):
+    monkeypatch.setattr(security.settings, "TOKEN_CACHE_ENABLED", False)
+    decoded = []
+    decode = dependencies.decode_access_token
+    monkeypatch.setattr(dependencies, "decode_access_token", lambda token: decoded.append(token) or decode(token))
+    headers = auth_header()
+    assert client.post("/api/v1/tasks/", headers=headers, json={"title": "Written"}).status_code == 201
+    assert titles(client.get("/api/v1/tasks/", headers=headers)) == ["Written"]
+    assert len(decoded) == 2
+
+def test_replica_queries_are_metered():
+    # Only the replicas are instrumented here: the primary is this module's engine.
+    metrics.registry.reset()
+    assert titles(client.get("/api/v1/tasks/", headers=auth_header())) == []
+    db_stats = metrics.registry.db[("GET", "/api/v1/tasks/")]
+    assert db_stats.queries >= 2
+    assert db_stats.db_seconds > 0
+
+def test_stickiness_expires():
+    clock_now = [100.0]
+    stickiness = PrimaryStickiness(window=5, clock=lambda: clock_now[0])
+    stickiness.mark(EMAIL)
+    assert stickiness.is_sticky(EMAIL)
+    clock_now[0] = 105.0
+    assert not stickiness.is_sticky(EMAIL)
+
+def test_without_replicas_reads_use_primary():
+    database.configure_read_replicas([])
+    add_task_to_file(PRIMARY_PATH, "On primary")
+    assert titles(client.get("/api/v1/tasks/", headers=auth_header())) == ["On primary"]
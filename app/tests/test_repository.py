@@ -0,0 +1,229 @@
+# /app/tests/test_repository.py
+import threading
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, etags, schemas
+from app.database import Base
+from app.repository import MemoryRepository
+
+engine = create_engine("sqlite:///./test_repository.db", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def setup_function():
+    Base.metadata.create_all(bind=engine)
+
+def teardown_function():
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_listing_matches_crud():
+    with TestingSessionLocal() as db:
+        user = crud.create_user(db, schemas.UserCreate(email="r@example.com", password="pw"), hashed_password="x")
+        tasks = crud.create_user_tasks(
+            db, [schemas.TaskCreate(title=f"T{i}", priority=i % 3 + 1) for i in range(9)], user.id
+        )
+        crud.update_tasks(db, [{"id": task.id, "completed": True} for task in tasks[::2]])
+        db_tasks = crud.get_tasks_by_owner(db, user.id)
+        repository = MemoryRepository()
+        repository.load([user], db_tasks)
+
+        middle = db_tasks[4].created_at
+        cases = [
+            ({}, ()),
+            ({"completed": True}, ()),
+            ({"priority_min": 2, "priority_max": 2}, ()),
+            ({"created_after": middle - timedelta(microseconds=1)}, (("created_at", True),)),
+            ({}, (("priority", True), ("created_at", False))),
+            ({"completed": False}, (("priority", False),)),
+            ({}, (("id", True),)),
+        ]
+        for filters, sort in cases:
+            filters = schemas.TaskFilter(**filters)
+            order = crud.task_listing_order(sort)
+            # Page through both with keyset cursors.
+            for backend in (crud, repository):
+                pages, after = [], None
+                while True:
+                    page = backend.get_tasks_by_owner(db, user.id, limit=2, after=after, filters=filters, sort=sort)
+                    pages.append([task.id for task in page])
+                    if len(page) < 2:
+                        break
+                    after = tuple(getattr(page[-1], name) for name, _ in order)
+                if backend is crud:
+                    expected = pages
+            assert pages == expected, (filters, sort)
+            assert (
+                [task.id for task in repository.get_tasks_by_owner(db, user.id, skip=1, limit=3, filters=filters, sort=sort)]
+                == [task.id for task in crud.get_tasks_by_owner(db, user.id, skip=1, limit=3, filters=filters, sort=sort)]
+            )
+            assert (
+                tuple(repository.get_task_list_version(db, user.id, filters))
+                == tuple(crud.get_task_list_version(db, user.id, filters))
+            ), filters
+        # A created_at bound leaves the total uncounted, as crud does.
+        assert repository.get_task_list_version(db, user.id, schemas.TaskFilter(created_after=middle)).total is None
+        columns = ("id", "title", "priority")
+        for backend in (crud, repository):
+            rows = backend.get_tasks_by_owner(db, user.id, limit=4, columns=columns, sort=(("priority", True),))
+            if backend is crud:
+                expected = [tuple(row) for row in rows]
+        assert [tuple(row) for row in rows] == expected
+        assert [dict(row._mapping) for row in rows] == [dict(zip(columns, row)) for row in expected]
+        assert repository.get_task_stats(db, user.id) == crud.get_task_stats(db, user.id)
+
+
+def test_repository_implements_crud_interface():
+    # Every public crud function the routes may call, except the statement
+    # builders only crud uses itself.
+    names = [
+        name for name, value in vars(crud).items()
+        if callable(value) and getattr(value, "__module__", None) == crud.__name__
+        and not isinstance(value, type) and not name.startswith("_") and not name.endswith("_statement")
+    ]
+    assert "aiter_task_batches_by_owner" in names and "load_user_tasks" in names
+    repository = MemoryRepository()
+    assert [name for name in names if not callable(getattr(repository, name, None))] == []
+
+
+def test_writes_follow_crud_semantics():
+    repository = MemoryRepository()
+    alice = repository.create_user(None, schemas.UserCreate(email="a@example.com", password="pw"), hashed_password="x")
+    bob = repository.create_user(None, schemas.UserCreate(email="b@example.com", password="pw"), hashed_password="x")
+    assert repository.create_user(None, schemas.UserCreate(email="a@example.com", password="pw"), "x") is None
+    assert repository.get_user_by_email(None, "b@example.com").id == bob.id
+
+    task = repository.create_user_task(None, schemas.TaskCreate(title="Quarterly meeting"), alice.id)
+    other = repository.create_user_task(None, schemas.TaskCreate(title="Notes", description="meeting"), alice.id)
+    assert repository.update_user_task(None, task.id, bob.id, {"title": "x"}) is None
+    stale = [datetime(2000, 1, 1)]
+    assert repository.update_user_task(None, task.id, alice.id, {"title": "x"}, versions=stale) is None
+    updated = repository.update_user_task(
+        None, task.id, alice.id, {"priority": 4}, versions=[etags.task_version(task)]
+    )
+    # The object handed out before the write is left as it was.
+    assert (task.priority, updated.priority) == (1, 4)
+    assert updated.updated_at is not None
+
+    assert [hit.id for hit in repository.search_tasks_by_owner(None, alice.id, "meet")] == [task.id, other.id]
+    assert repository.search_tasks_by_owner(None, bob.id, "meet") == []
+
+    bulk = repository.create_user_tasks(None, [schemas.TaskCreate(title=f"B{i}") for i in range(3)], bob.id)
+    assert repository.get_task_owners(None, [task.id, bulk[0].id, 999]) == {task.id: alice.id, bulk[0].id: bob.id}
+    assert [row.completed for row in repository.update_tasks(None, [{"id": bulk[0].id, "completed": True}])] == [True]
+    assert repository.update_tasks(None, [{"id": bulk[0].id, "priority": 2}], owner_id=alice.id) == []
+    assert repository.delete_tasks(None, [bulk[1].id], owner_id=alice.id) == []
+    assert {row.id for row in repository.delete_tasks(None, [bulk[1].id, 999], owner_id=bob.id)} == {bulk[1].id}
+    assert repository.delete_user_task(None, other.id, alice.id).id == other.id
+    assert [row.id for row in repository.get_tasks_by_owner(None, bob.id)] == [bulk[0].id, bulk[2].id]
+    assert repository.get_task_stats(None, alice.id).by_priority == {4: 1}
+
+
+def test_change_feed_matches_crud():
+    with TestingSessionLocal() as db:
+        for backend in (crud, MemoryRepository()):
+            user = backend.create_user(db, schemas.UserCreate(email="feed@example.com", password="pw"), "x")
+            tasks = backend.create_user_tasks(db, [schemas.TaskCreate(title=f"T{i}") for i in range(4)], user.id)
+            since = backend.get_task_changes(db, user.id)[-1].change_seq
+            backend.update_user_task(db, tasks[2].id, user.id, {"completed": True})
+            backend.delete_tasks(db, [tasks[0].id])
+            backend.update_tasks(db, [{"id": tasks[1].id, "priority": 3}])
+            changes = [
+                (change.id, change.deleted_at is not None, change.completed)
+                for change in backend.get_task_changes(db, user.id, since=since, limit=10)
+            ]
+            assert backend.get_task_changes(db, user.id, since=since, limit=1)[0].id == tasks[2].id
+            if backend is crud:
+                expected = changes
+        assert changes == expected == [(3, False, True), (1, True, None), (2, False, False)]
+
+
+def test_concurrent_writes_keep_indexes_consistent():
+    repository = MemoryRepository()
+    users = [
+        repository.create_user(None, schemas.UserCreate(email=f"u{i}@example.com", password="pw"), "x")
+        for i in range(4)
+    ]
+
+    def work(n):
+        user = users[n % len(users)]
+        for i in range(50):
+            task = repository.create_user_task(None, schemas.TaskCreate(title=f"{n}-{i}"), user.id)
+            if i % 5 == 0:
+                repository.delete_user_task(None, task.id, user.id)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    listed = [repository.get_tasks_by_owner(None, user.id, limit=None) for user in users]
+    assert [len(tasks) for tasks in listed] == [80] * 4
+    ids = [task.id for tasks in listed for task in tasks]
+    assert len(set(ids)) == 320
+    assert all(tasks == sorted(tasks, key=lambda task: task.id) for tasks in listed)
+
+
+def test_legacy_app_runs_on_the_repository():
+    import main
+
+    client = TestClient(main.app)
+    main.repository.clear()
+    main.profiles.clear()
+    client.post("/auth/register", json={"email": "legacy@example.com", "password": "password123", "full_name": "Ana"})
+    token = client.post("/auth/login", params={"email": "legacy@example.com", "password": "password123"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    task = client.post("/tasks", headers=headers, json={"title": "Legacy", "priority": "high"}).json()
+    assert client.patch(f"/tasks/{task['id']}/complete", headers=headers).json()["completed"] is True
+    listed = client.get("/tasks", headers=headers).json()
+    assert [(row["title"], row["priority"], row["completed"]) for row in listed] == [("Legacy", "high", True)]
+
+
+def test_legacy_app_reports_tasks_deleted_during_an_update(monkeypatch):
+    import main
+
+    client = TestClient(main.app)
+    main.repository.clear()
+    main.profiles.clear()
+    client.post("/auth/register", json={"email": "raced@example.com", "password": "password123", "full_name": "Rui"})
+    token = client.post("/auth/login", params={"email": "raced@example.com", "password": "password123"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    task_ids = [client.post("/tasks", headers=headers, json={"title": f"Task {i}"}).json()["id"] for i in range(2)]
+    check_ownership = main.owned_task
+
+    def deleted_after_check(task_id, user_id):
+        task = check_ownership(task_id, user_id)
+        main.repository.delete_user_task(None, task_id, user_id)
+        return task
+
+    monkeypatch.setattr(main, "owned_task", deleted_after_check)
+    assert client.patch(f"/tasks/{task_ids[0]}/complete", headers=headers).status_code == 404
+    assert client.put(f"/tasks/{task_ids[1]}", headers=headers, json={"title": "Too late"}).status_code == 404
+
+
+def test_api_runs_on_the_repository():
+    from app import backend
+    from app.main import app
+
+    client = TestClient(app)
+    previous = backend.use(MemoryRepository(notify=True))
+    try:
+        client.post("/api/v1/users/", json={"email": "memory@example.com", "password": "password123"})
+        token = client.post(
+            "/api/v1/token", data={"username": "memory@example.com", "password": "password123"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        client.post("/api/v1/tasks/bulk", headers=headers, json=[{"title": f"M{i}", "priority": i + 1} for i in range(3)])
+        me = client.get("/api/v1/users/me/", headers=headers, params={"include_tasks": 2}).json()
+        assert [task["title"] for task in me["tasks"]] == ["M0", "M1"]
+        listed = client.get("/api/v1/tasks/", headers=headers, params={"fields": "id,title", "sort": "-priority"})
+        assert [row["title"] for row in listed.json()] == ["M2", "M1", "M0"]
+        exported = client.get("/api/v1/tasks/export", headers=headers, params={"format": "csv"})
+        assert exported.status_code == 200, exported.text
+        assert len(exported.text.splitlines()) == 4
+    finally:
+        backend.use(previous)
@@ -0,0 +1,63 @@
+# /app/tests/test_response_cache.py
+import pytest
+
+from app.core.response_cache import CacheBackend, MemoryLRUCache, VersionedCache
+
+
+def test_memory_lru_is_bounded_by_bytes():
+    backend = MemoryLRUCache(max_bytes=10)
+    backend.set("a", b"1234")
+    backend.set("b", b"1234")
+    backend.get("a")
+    backend.set("c", b"1234")
+    # "b" was the least recently used entry.
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1234"
+    assert backend.stats() == {"entries": 2, "bytes": 8, "evictions": 1}
+    backend.set("huge", b"x" * 11)
+    assert backend.get("huge") is None
+
+def test_invalidate_bumps_only_that_namespace():
+    cache = VersionedCache("tasks", MemoryLRUCache())
+    cache.set(cache.key(1, 0, 100), b"owner 1")
+    cache.set(cache.key(2, 0, 100), b"owner 2")
+    cache.invalidate(1)
+    assert cache.get(cache.key(1, 0, 100)) is None
+    assert cache.get(cache.key(2, 0, 100)) == b"owner 2"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_disabled_cache_never_hits():
+    cache = VersionedCache("tasks")
+    key = cache.key(1, 0, 100)
+    cache.set(key, b"page")
+    assert cache.get(key) is None
+
+def test_memory_lru_entries_expire_after_ttl():
+    now = [100.0]
+    backend = MemoryLRUCache(ttl=5, clock=lambda: now[0])
+    backend.set("page", b"1234")
+    now[0] = 104.9
+    assert backend.get("page") == b"1234"
+    # Another worker's write cannot bump this process's version; the ttl
+    # is what ends the page.
+    now[0] = 105.0
+    assert backend.get("page") is None
+    assert backend.stats() == {"entries": 0, "bytes": 0, "evictions": 0}
+
+def test_incomplete_backend_fails_on_construction():
+    class NoBump(CacheBackend):
+        def get(self, key):
+            return None
+
+        def set(self, key, value):
+            pass
+
+        def version(self, namespace):
+            return 0
+
+        def clear(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoBump()
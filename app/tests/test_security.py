@@ -0,0 +1,102 @@
+# /app/tests/test_security.py
+import asyncio
+import threading
+from datetime import timedelta
+
+import pytest
+from jose import JWTError
+
+from app.core import security
+from app.core.config import settings
+from app.core.token_cache import TokenCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_cache_hit_and_miss():
+    cache = TokenCache(maxsize=2, clock=FakeClock())
+    assert cache.get("a") is None
+    cache.set("a", {"sub": "a@example.com", "exp": 2000})
+    assert cache.get("a") == {"sub": "a@example.com", "exp": 2000}
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+def test_token_cache_entry_expires_with_token():
+    clock = FakeClock()
+    cache = TokenCache(clock=clock)
+    cache.set("a", {"sub": "a@example.com", "exp": 1010})
+    clock.now = 1010
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+def test_token_cache_skips_tokens_without_exp():
+    cache = TokenCache(clock=FakeClock())
+    cache.set("a", {"sub": "a@example.com"})
+    assert cache.get("a") is None
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(maxsize=2, clock=FakeClock())
+    cache.set("a", {"exp": 2000})
+    cache.set("b", {"exp": 2000})
+    cache.get("a")
+    cache.set("c", {"exp": 2000})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+def test_decode_access_token_uses_cache():
+    security.token_cache.clear()
+    token = security.create_access_token(subject="cached@example.com")
+    assert security.decode_access_token(token)["sub"] == "cached@example.com"
+    assert security.decode_access_token(token)["sub"] == "cached@example.com"
+    assert security.token_cache.hits == 1
+    assert security.token_cache.misses == 1
+
+def test_decode_access_token_cache_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "TOKEN_CACHE_ENABLED", False)
+    security.token_cache.clear()
+    token = security.create_access_token(subject="nocache@example.com")
+    security.decode_access_token(token)
+    security.decode_access_token(token)
+    assert security.token_cache.stats() == {"size": 0, "hits": 0, "misses": 0}
+
+def test_decode_access_token_rejects_expired_token():
+    token = security.create_access_token(subject="old@example.com", expires_delta=timedelta(minutes=-1))
+    with pytest.raises(JWTError):
+        security.decode_access_token(token)
+
+def test_password_hasher_round_trip():
+    async def hash_and_verify():
+        hashed = await security.aget_password_hash("secret")
+        return await security.averify_password("secret", hashed)
+
+    assert asyncio.run(hash_and_verify()) is True
+
+def test_password_hasher_rejects_when_queue_full():
+    hasher = security.PasswordHasher(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def saturate():
+        holding = asyncio.ensure_future(hasher.run(release.wait, 5))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(security.PasswordHasherBusy):
+                await hasher.run(security.get_password_hash, "secret")
+        finally:
+            release.set()
+            await holding
+
+    asyncio.run(saturate())
+    hasher.shutdown()
+    assert hasher.rejected == 1
+
+def test_password_hasher_zero_max_pending_is_unlimited():
+    hasher = security.PasswordHasher(max_workers=1, max_pending=0)
+    assert asyncio.run(hasher.run(sum, [1, 2])) == 3
+    hasher.shutdown()
+    assert hasher.rejected == 0
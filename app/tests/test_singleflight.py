@@ -0,0 +1,138 @@
+# /app/tests/test_singleflight.py
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.core.singleflight import SingleFlight, task_read_flights
+from app.database import Base, get_db
+from app.main import app
+
+engine = create_engine("sqlite:///./test_singleflight.db", connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def scenario():
+        key = flights.key(1, "page")
+        shared = await asyncio.gather(*(flights.run(key, lambda: compute("a")) for _ in range(5)))
+        other = await flights.run(flights.key(2, "page"), lambda: compute("b"))
+        return shared, other
+
+    shared, other = asyncio.run(scenario())
+    assert (shared, other, calls) == (["a"] * 5, "b", ["a", "b"])
+    assert flights.stats() == {"executions": 2, "coalesced": 4, "in_flight": 0}
+
+def test_errors_are_shared_and_invalidate_starts_a_new_flight():
+    flights = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise LookupError("gone")
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.run(flights.key(1), fail) for _ in range(3)), return_exceptions=True)
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.01)
+            return "old"
+
+        old = asyncio.create_task(flights.run(flights.key(1), slow))
+        await started.wait()
+        # A write committed meanwhile: later reads must not get the old result.
+        flights.invalidate(1)
+        fresh = await flights.run(flights.key(1), lambda: asyncio.sleep(0, "new"))
+        return results, await old, fresh
+
+    results, old, fresh = asyncio.run(scenario())
+    assert [type(result) for result in results] == [LookupError] * 3
+    assert (old, fresh) == ("old", "new")
+    assert flights.coalesced == 2
+
+def test_followers_take_over_when_the_leader_is_cancelled():
+    flights = SingleFlight("test")
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(0.01)
+            return "page"
+
+        leader = asyncio.create_task(flights.run(flights.key(1), compute))
+        await started.wait()
+        follower = asyncio.create_task(flights.run(flights.key(1), compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "page"
+    assert flights.executions == 2
+
+def test_disabled_flights_run_every_call():
+    flights = SingleFlight("test", enabled=False)
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run(flights.key(1), lambda: asyncio.sleep(0.01, "x")) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == ["x"] * 3
+    assert flights.stats()["executions"] == 0
+
+
+def test_concurrent_task_reads_hit_the_database_once(monkeypatch):
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    try:
+        client = TestClient(app)
+        client.post("/api/v1/users/", json={"email": "flight@example.com", "password": "password"})
+        token = client.post("/api/v1/token", data={"username": "flight@example.com", "password": "password"}).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Shared"}).json()["id"]
+
+        fetched = []
+        aget_task = crud.aget_task
+
+        async def slow_get_task(db, task_id):
+            fetched.append(task_id)
+            await asyncio.sleep(0.05)
+            return await aget_task(db, task_id=task_id)
+
+        monkeypatch.setattr(crud, "aget_task", slow_get_task)
+        coalesced = task_read_flights.coalesced
+
+        async def burst():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await asyncio.gather(*(http.get(f"/api/v1/tasks/{task_id}", headers=headers) for _ in range(5)))
+
+        responses = asyncio.run(burst())
+        assert [response.status_code for response in responses] == [200] * 5
+        assert len({response.content for response in responses}) == 1
+        assert fetched == [task_id]
+        assert task_read_flights.coalesced - coalesced == 4
+        assert 'read_coalesced_total{route="task"}' in client.get("/api/v1/metrics").text
+    finally:
+        Base.metadata.drop_all(bind=engine)
+        app.dependency_overrides.pop(get_db, None)
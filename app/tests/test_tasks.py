@@ -1,16 +1,24 @@
 # /app/tests/test_tasks.py
+import csv
+import json
+
+import pytest
+
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from app.core.response_cache import task_list_cache
 from app.main import app
+from app import crud, models
 from app.database import Base, get_db
+from app.tests.utils import assert_num_queries, capture_queries, count_queries, explain_query_plan
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_tasks.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def override_get_db():
@@ -20,15 +28,23 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
-
 client = TestClient(app)
 
+_previous_override = None
+
 def setup_function():
+    global _previous_override
+    _previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    task_list_cache.clear()
     Base.metadata.create_all(bind=engine)
 
 def teardown_function():
     Base.metadata.drop_all(bind=engine)
+    if _previous_override is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = _previous_override
 
 def get_auth_header():
     client.post("/api/v1/users/", json={"email": "taskuser@example.com", "password": "taskpassword"})
@@ -94,3 +110,581 @@ def test_delete_task():
 
     get_response = client.get(f"/api/v1/tasks/{task_id}", headers=headers)
     assert get_response.status_code == 404
+
+def test_read_tasks_cursor_pagination():
+    headers = get_auth_header()
+    created = [
+        client.post("/api/v1/tasks/", headers=headers, json={"title": f"Page Task {i}"}).json()["id"]
+        for i in range(5)
+    ]
+
+    seen = []
+    response = client.get("/api/v1/tasks/", headers=headers, params={"limit": 2})
+    while True:
+        assert response.status_code == 200
+        seen.extend(t["id"] for t in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        response = client.get("/api/v1/tasks/", headers=headers, params={"limit": 2, "after": cursor})
+
+    assert [i for i in seen if i in created] == created
+    assert len(seen) == len(set(seen))
+
+def test_read_tasks_invalid_cursor():
+    headers = get_auth_header()
+    response = client.get("/api/v1/tasks/", headers=headers, params={"after": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_bulk_create_update_delete():
+    headers = get_auth_header()
+    response = client.post(
+        "/api/v1/tasks/bulk",
+        headers=headers,
+        json=[{"title": f"Bulk {i}", "priority": i} for i in range(3)],
+    )
+    assert response.status_code == 201, response.text
+    results = response.json()
+    assert [r["status_code"] for r in results] == [201, 201, 201]
+    assert [r["task"]["title"] for r in results] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+    ids = [r["id"] for r in results]
+
+    response = client.put(
+        "/api/v1/tasks/bulk",
+        headers=headers,
+        json=[{"id": ids[0], "title": "Bulk 0 updated"}, {"id": 999999, "title": "Missing"}],
+    )
+    assert response.status_code == 200, response.text
+    first, missing = response.json()
+    assert first["status_code"] == 200
+    assert first["task"]["title"] == "Bulk 0 updated"
+    assert first["task"]["priority"] == 0
+    assert missing == {"id": 999999, "status_code": 404, "detail": "Task not found", "task": None}
+
+    response = client.request("DELETE", "/api/v1/tasks/bulk", headers=headers, json=[ids[1], ids[2]])
+    assert response.status_code == 200, response.text
+    assert [r["status_code"] for r in response.json()] == [200, 200]
+    assert client.get(f"/api/v1/tasks/{ids[1]}", headers=headers).status_code == 404
+    assert client.get(f"/api/v1/tasks/{ids[0]}", headers=headers).status_code == 200
+
+def test_bulk_update_other_users_task_is_forbidden():
+    headers = get_auth_header()
+    client.post("/api/v1/users/", json={"email": "other@example.com", "password": "otherpassword"})
+    other_token = client.post(
+        "/api/v1/token", data={"username": "other@example.com", "password": "otherpassword"}
+    ).json()["access_token"]
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Mine"}).json()["id"]
+
+    response = client.request(
+        "DELETE", "/api/v1/tasks/bulk", headers={"Authorization": f"Bearer {other_token}"}, json=[task_id]
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["status_code"] == 403
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=headers).status_code == 200
+
+def test_bulk_writes_report_tasks_deleted_after_the_ownership_check(monkeypatch):
+    headers = get_auth_header()
+    ids = [r["id"] for r in client.post(
+        "/api/v1/tasks/bulk", headers=headers, json=[{"title": f"Raced {i}"} for i in range(4)]
+    ).json()]
+    check_owners = crud.aget_task_owners
+
+    async def racing_delete(db, task_ids):
+        # An overlapping request deletes the first task right after the check.
+        owners = await check_owners(db, task_ids)
+        with engine.begin() as connection:
+            connection.exec_driver_sql("DELETE FROM tasks WHERE id = ?", (task_ids[0],))
+        return owners
+
+    monkeypatch.setattr(crud, "aget_task_owners", racing_delete)
+    response = client.put("/api/v1/tasks/bulk", headers=headers,
+                          json=[{"id": task_id, "title": "Done"} for task_id in ids[:2]])
+    assert response.status_code == 200, response.text
+    assert [r["status_code"] for r in response.json()] == [404, 200]
+    response = client.request("DELETE", "/api/v1/tasks/bulk", headers=headers, json=ids[2:])
+    assert response.status_code == 200, response.text
+    assert [r["status_code"] for r in response.json()] == [404, 200]
+    assert response.json()[0] == {"id": ids[2], "status_code": 404, "detail": "Task not found", "task": None}
+
+def test_export_tasks_ndjson():
+    headers = get_auth_header()
+    for i in range(3):
+        client.post("/api/v1/tasks/", headers=headers, json={"title": f"Export {i}"})
+
+    response = client.get("/api/v1/tasks/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["title"] for r in rows if r["title"].startswith("Export")] == ["Export 0", "Export 1", "Export 2"]
+    # Each line is the task exactly as the API renders it.
+    listed = client.get("/api/v1/tasks/", headers=headers).content
+    assert b"[" + b",".join(response.content.splitlines()) + b"]" == listed
+
+def test_export_tasks_csv():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/", headers=headers, json={"title": "CSV, quoted", "priority": 3})
+
+    response = client.get("/api/v1/tasks/export", headers=headers, params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert {"CSV, quoted": "3"}.items() <= {r["title"]: r["priority"] for r in rows}.items()
+
+def test_export_tasks_rejects_unknown_format():
+    headers = get_auth_header()
+    response = client.get("/api/v1/tasks/export", headers=headers, params={"format": "xml"})
+    assert response.status_code == 422
+
+def test_read_tasks_query_count_does_not_grow_with_page_size():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/bulk", headers=headers, json=[{"title": f"Task {i}"} for i in range(20)])
+
+    # The user lookup in get_current_user, the ETag version and the page.
+    with assert_num_queries(engine, 3):
+        response = client.get("/api/v1/tasks/", headers=headers, params={"limit": 20})
+    assert len(response.json()) == 20
+
+def test_patch_task_partial_update():
+    headers = get_auth_header()
+    task_id = client.post(
+        "/api/v1/tasks/", headers=headers, json={"title": "Patch Me", "description": "Keep me", "priority": 2}
+    ).json()["id"]
+
+    response = client.patch(f"/api/v1/tasks/{task_id}", headers=headers, json={"completed": True})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["completed"] is True
+    assert data["title"] == "Patch Me"
+    assert data["description"] == "Keep me"
+    assert data["priority"] == 2
+
+def test_patch_task_rejects_null_title():
+    headers = get_auth_header()
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Patch Me"}).json()["id"]
+    response = client.patch(f"/api/v1/tasks/{task_id}", headers=headers, json={"title": None})
+    assert response.status_code == 422
+
+def test_task_writes_are_single_statements():
+    headers = get_auth_header()
+    # Each request also runs get_current_user's lookup.
+    with assert_num_queries(engine, 2):
+        task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "One Statement"}).json()["id"]
+    with assert_num_queries(engine, 2):
+        client.put(f"/api/v1/tasks/{task_id}", headers=headers, json={"title": "Still One"})
+    with assert_num_queries(engine, 2):
+        client.patch(f"/api/v1/tasks/{task_id}", headers=headers, json={"priority": 5})
+    with assert_num_queries(engine, 2):
+        response = client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert response.json()["priority"] == 5
+
+def test_update_and_delete_other_users_task():
+    headers = get_auth_header()
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Not Yours"}).json()["id"]
+    client.post("/api/v1/users/", json={"email": "intruder@example.com", "password": "intruderpassword"})
+    token = client.post(
+        "/api/v1/token", data={"username": "intruder@example.com", "password": "intruderpassword"}
+    ).json()["access_token"]
+    intruder = {"Authorization": f"Bearer {token}"}
+
+    assert client.put(f"/api/v1/tasks/{task_id}", headers=intruder, json={"title": "Mine"}).status_code == 403
+    assert client.patch(f"/api/v1/tasks/{task_id}", headers=intruder, json={"title": "Mine"}).status_code == 403
+    assert client.delete(f"/api/v1/tasks/{task_id}", headers=intruder).status_code == 403
+    assert client.delete("/api/v1/tasks/999999", headers=intruder).status_code == 404
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=headers).json()["title"] == "Not Yours"
+
+def test_read_task_etag_not_modified():
+    headers = get_auth_header()
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Cached"}).json()["id"]
+    response = client.get(f"/api/v1/tasks/{task_id}", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag.startswith(f'"{task_id}-')
+
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    client.patch(f"/api/v1/tasks/{task_id}", headers=headers, json={"completed": True})
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_read_tasks_etag_tracks_changes():
+    headers = get_auth_header()
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Listed"}).json()["id"]
+    etag = client.get("/api/v1/tasks/", headers=headers).headers["ETag"]
+
+    # Without a cached page the 304 check is the version query only.
+    task_list_cache.clear()
+    with assert_num_queries(engine, 2):
+        response = client.get("/api/v1/tasks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert client.get("/api/v1/tasks/", headers=headers, params={"limit": 5}).headers["ETag"] != etag
+
+    seen = {etag}
+    for change in (
+        lambda: client.put(f"/api/v1/tasks/{task_id}", headers=headers, json={"title": "Renamed"}),
+        lambda: client.put(f"/api/v1/tasks/{task_id}", headers=headers, json={"title": "Renamed Again"}),
+        lambda: client.post("/api/v1/tasks/", headers=headers, json={"title": "Another"}),
+        lambda: client.delete(f"/api/v1/tasks/{task_id}", headers=headers),
+    ):
+        change()
+        response = client.get("/api/v1/tasks/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert etag not in seen
+        seen.add(etag)
+
+def test_if_match_optimistic_concurrency():
+    headers = get_auth_header()
+    created = client.post("/api/v1/tasks/", headers=headers, json={"title": "Contended"})
+    etag = created.headers["ETag"]
+
+    first = client.put(
+        f"/api/v1/tasks/{created.json()['id']}", headers={**headers, "If-Match": etag}, json={"title": "First"}
+    )
+    assert first.status_code == 200, first.text
+    # A second writer holding the same (now stale) version loses.
+    second = client.patch(
+        f"/api/v1/tasks/{created.json()['id']}", headers={**headers, "If-Match": etag}, json={"title": "Second"}
+    )
+    assert second.status_code == 412
+    stale_delete = client.delete(f"/api/v1/tasks/{created.json()['id']}", headers={**headers, "If-Match": etag})
+    assert stale_delete.status_code == 412
+    assert client.delete(
+        f"/api/v1/tasks/{created.json()['id']}", headers={**headers, "If-Match": 'W/' + first.headers["ETag"]}
+    ).status_code == 412
+
+    response = client.delete(
+        f"/api/v1/tasks/{created.json()['id']}", headers={**headers, "If-Match": first.headers["ETag"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["title"] == "First"
+    assert client.delete(f"/api/v1/tasks/{created.json()['id']}", headers={**headers, "If-Match": "*"}).status_code == 404
+
+def test_if_match_accepts_second_resolution_timestamps():
+    headers = get_auth_header()
+    task_ids = [client.post("/api/v1/tasks/", headers=headers, json={"title": f"Legacy {i}"}).json()["id"]
+                for i in range(3)]
+    # As stored by the func.now() server default: no fractional seconds.
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE tasks SET created_at = '2026-10-17 03:59:55', updated_at = NULL")
+    task_list_cache.clear()
+
+    def current_etag(task_id):
+        return client.get(f"/api/v1/tasks/{task_id}", headers=headers).headers["ETag"]
+
+    legacy_etag = current_etag(task_ids[0])
+    put = client.put(f"/api/v1/tasks/{task_ids[0]}", headers={**headers, "If-Match": legacy_etag},
+                     json={"title": "Put"})
+    assert put.status_code == 200, put.text
+    patch = client.patch(f"/api/v1/tasks/{task_ids[1]}", headers={**headers, "If-Match": current_etag(task_ids[1])},
+                         json={"completed": True})
+    assert patch.status_code == 200, patch.text
+    etag = current_etag(task_ids[2])
+    assert client.delete(f"/api/v1/tasks/{task_ids[2]}", headers={**headers, "If-Match": etag}).status_code == 200
+    # Once written, the legacy version is stale like any other.
+    assert client.delete(f"/api/v1/tasks/{task_ids[0]}", headers={**headers, "If-Match": legacy_etag}).status_code == 412
+
+def test_read_tasks_served_from_cache_until_a_write():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/bulk", headers=headers, json=[{"title": f"Task {i}"} for i in range(3)])
+    first = client.get("/api/v1/tasks/", headers=headers, params={"limit": 2})
+
+    # Only get_current_user's lookup: the page, ETag and cursor come from the cache.
+    with assert_num_queries(engine, 1):
+        cached = client.get("/api/v1/tasks/", headers=headers, params={"limit": 2})
+    assert cached.content == first.content
+    assert cached.headers["ETag"] == first.headers["ETag"]
+    assert cached.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert task_list_cache.stats()["hits"] == 1
+
+    task_id = first.json()[0]["id"]
+    client.patch(f"/api/v1/tasks/{task_id}", headers=headers, json={"title": "Changed"})
+    response = client.get("/api/v1/tasks/", headers=headers, params={"limit": 2})
+    assert response.json()[0]["title"] == "Changed"
+    client.request("DELETE", "/api/v1/tasks/bulk", headers=headers, json=[task_id])
+    response = client.get("/api/v1/tasks/", headers=headers, params={"limit": 2})
+    assert task_id not in [task["id"] for task in response.json()]
+
+def test_read_tasks_sparse_fieldset():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/bulk", headers=headers,
+                json=[{"title": f"Task {i}", "description": "long " * 50} for i in range(3)])
+
+    with count_queries(engine) as statements:
+        response = client.get("/api/v1/tasks/", headers=headers, params={"fields": "title, completed", "limit": 2})
+    assert response.status_code == 200, response.text
+    assert response.json() == [{"title": "Task 0", "completed": False}, {"title": "Task 1", "completed": False}]
+    # Only the requested columns (and id, for the cursor) are selected.
+    assert "tasks.description" not in statements[-1]
+    assert "X-Next-Cursor" in response.headers
+
+    full = client.get("/api/v1/tasks/", headers=headers, params={"limit": 2})
+    assert full.headers["ETag"] != response.headers["ETag"]
+    assert "description" in full.json()[0]
+
+def test_read_tasks_rejects_unknown_fields():
+    headers = get_auth_header()
+    response = client.get("/api/v1/tasks/", headers=headers, params={"fields": "title,hashed_password"})
+    assert response.status_code == 400
+    assert "hashed_password" in response.json()["detail"]
+    assert client.get("/api/v1/tasks/", headers=headers, params={"fields": " , "}).status_code == 400
+
+def test_search_tasks_ranks_prefix_matches_and_scopes_by_owner():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/bulk", headers=headers, json=[
+        {"title": "Buy groceries", "description": "Prepare the quarterly meeting notes"},
+        {"title": "Quarterly meeting", "description": "Room 4"},
+        {"title": "Walk the dog"},
+    ])
+    client.post("/api/v1/users/", json={"email": "searcher@example.com", "password": "searchpassword"})
+    token = client.post(
+        "/api/v1/token", data={"username": "searcher@example.com", "password": "searchpassword"}
+    ).json()["access_token"]
+    client.post("/api/v1/tasks/", headers={"Authorization": f"Bearer {token}"}, json={"title": "Quarterly meeting"})
+
+    response = client.get("/api/v1/tasks/search", headers=headers, params={"q": "quarterly meet"})
+    assert response.status_code == 200, response.text
+    # The title match ranks first; the other user's task is not returned.
+    assert [task["title"] for task in response.json()] == ["Quarterly meeting", "Buy groceries"]
+    assert client.get("/api/v1/tasks/search", headers=headers, params={"q": "\"owner_id\" OR *"}).json() == []
+
+def test_search_index_follows_updates_and_deletes():
+    headers = get_auth_header()
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Draft proposal"}).json()["id"]
+    client.patch(f"/api/v1/tasks/{task_id}", headers=headers, json={"title": "Final proposal"})
+
+    def search(q):
+        return [task["id"] for task in client.get("/api/v1/tasks/search", headers=headers, params={"q": q}).json()]
+
+    assert search("draft") == []
+    assert search("final") == [task_id]
+    client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert search("proposal") == []
+
+def test_install_task_search_indexes_existing_rows():
+    headers = get_auth_header()
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Indexed later"}).json()["id"]
+    # A database created before search existed: no FTS table, no triggers.
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE tasks_fts")
+        for suffix in ("ai", "ad", "au"):
+            connection.exec_driver_sql(f"DROP TRIGGER tasks_fts_{suffix}")
+    with engine.begin() as connection:
+        models.install_task_search(connection)
+        models.install_task_search(connection)
+    response = client.get("/api/v1/tasks/search", headers=headers, params={"q": "indexed"})
+    assert [task["id"] for task in response.json()] == [task_id]
+
+
+def test_task_stats_follow_writes():
+    headers = get_auth_header()
+    for priority in (1, 2, 2, 3):
+        client.post("/api/v1/tasks/", headers=headers, json={"title": f"P{priority}", "priority": priority})
+    client.patch("/api/v1/tasks/1", headers=headers, json={"completed": True})
+    client.patch("/api/v1/tasks/2", headers=headers, json={"priority": 3, "completed": True})
+    client.delete("/api/v1/tasks/4", headers=headers)
+    client.post("/api/v1/tasks/bulk", headers=headers, json=[{"title": "B", "priority": 5}] * 2)
+    response = client.get("/api/v1/tasks/stats", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json() == {"total": 5, "completed": 2, "open": 3, "by_priority": {"1": 1, "2": 1, "3": 1, "5": 2}}
+
+    # The stats and the listing's total are counter lookups, not COUNT(*).
+    with count_queries(engine) as statements:
+        listing = client.get("/api/v1/tasks/?completed=false&limit=1", headers=headers)
+    assert listing.headers["X-Total-Count"] == "3"
+    assert not any("count(*)" in statement.lower() for statement in statements)
+    assert client.get("/api/v1/tasks/?priority_min=2", headers=headers).headers["X-Total-Count"] == "4"
+    # Creation time is not counted, so that total is not known.
+    assert "X-Total-Count" not in client.get("/api/v1/tasks/?created_after=2000-01-01T00:00:00", headers=headers).headers
+
+
+def test_rebuild_task_counters_repairs_drift():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/", headers=headers, json={"title": "Counted", "priority": 2})
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE task_counters SET count = 7")
+        connection.exec_driver_sql("INSERT INTO task_counters VALUES (1, 4, 0, 2)")
+        assert models.task_counter_drift(connection) == 2
+        assert models.rebuild_task_counters(connection) == 2
+        assert models.task_counter_drift(connection) == 0
+    assert client.get("/api/v1/tasks/stats", headers=headers).json()["by_priority"] == {"2": 1}
+
+def test_read_tasks_filters_and_sort():
+    headers = get_auth_header()
+    for i in range(6):
+        client.post("/api/v1/tasks/", headers=headers, json={"title": f"T{i}", "priority": i % 3 + 1})
+    client.patch("/api/v1/tasks/2", headers=headers, json={"completed": True})
+    client.patch("/api/v1/tasks/5", headers=headers, json={"completed": True})
+
+    def ids(query):
+        response = client.get(f"/api/v1/tasks/?{query}", headers=headers)
+        assert response.status_code == 200, response.text
+        return [task["id"] for task in response.json()]
+
+    assert ids("completed=true") == [2, 5]
+    assert ids("completed=false&priority_min=2") == [3, 6]
+    assert ids("priority_min=2&priority_max=2") == [2, 5]
+    assert ids("sort=-priority,created_at") == [3, 6, 2, 5, 1, 4]
+    assert ids("sort=-id") == [6, 5, 4, 3, 2, 1]
+    created = client.get("/api/v1/tasks/4", headers=headers).json()["created_at"]
+    assert ids(f"created_before={created}&sort=-created_at") == [3, 2, 1]
+
+    # The cursor carries the sort keys, so pages follow the same order.
+    pages, query = [], "sort=-priority,created_at&limit=4"
+    while query is not None:
+        response = client.get(f"/api/v1/tasks/?{query}", headers=headers)
+        pages.append([task["id"] for task in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        query = None if cursor is None else f"sort=-priority,created_at&limit=4&after={cursor}"
+    assert pages == [[3, 6, 2, 5], [1, 4]]
+    # A cursor from another order lacks its keys.
+    response = client.get("/api/v1/tasks/?limit=1", headers=headers)
+    after = response.headers["X-Next-Cursor"]
+    assert client.get(f"/api/v1/tasks/?sort=priority&after={after}", headers=headers).status_code == 400
+
+
+def test_read_tasks_rejects_unknown_sort():
+    headers = get_auth_header()
+    assert client.get("/api/v1/tasks/?sort=title", headers=headers).status_code == 400
+    assert client.get("/api/v1/tasks/?sort=priority,-priority", headers=headers).status_code == 400
+
+
+# (query, whether an index also yields the rows in the requested order)
+@pytest.mark.parametrize("query, index_ordered", [
+    ("", True),
+    ("completed=true", False),
+    ("priority_min=2&priority_max=4", False),
+    ("created_after=2024-01-01T00:00:00&created_before=2030-01-01T00:00:00", False),
+    ("sort=-priority,created_at", True),
+    ("sort=priority,-created_at", True),
+    ("sort=created_at", True),
+    ("sort=-created_at", True),
+    ("sort=priority", False),
+    ("sort=-id", True),
+    ("completed=false&sort=-priority,created_at", True),
+    ("priority_min=3&sort=-priority,created_at", True),
+    ("created_after=2024-01-01T00:00:00&sort=-created_at", True),
+    ("completed=true&priority_min=2", False),
+    ("completed=true&sort=created_at", True),
+    ("priority_min=2&sort=created_at", False),
+])
+def test_read_tasks_query_plans_use_an_index(query, index_ordered):
+    headers = get_auth_header()
+    for i in range(6):
+        client.post("/api/v1/tasks/", headers=headers, json={"title": f"T{i}", "priority": i % 3 + 1})
+        client.patch(f"/api/v1/tasks/{i + 1}", headers=headers, json={"completed": i % 2 == 0})
+    url = f"/api/v1/tasks/?limit=1&{query}"
+    cursor = client.get(url, headers=headers).headers["X-Next-Cursor"]
+    task_list_cache.clear()
+    for page in (url, f"{url}&after={cursor}"):
+        with capture_queries(engine) as queries:
+            assert client.get(page, headers=headers).status_code == 200
+        [(statement, parameters)] = [query for query in queries if "ORDER BY" in query[0]]
+        plan = explain_query_plan(engine, statement, parameters)
+        assert all(step.startswith("SEARCH tasks USING") and "INDEX" in step
+                   for step in plan if "tasks" in step), plan
+        assert not any(step.startswith("SCAN") for step in plan), plan
+        if index_ordered:
+            assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_task_change_feed():
+    headers = get_auth_header()
+    ids = [client.post("/api/v1/tasks/", headers=headers, json={"title": f"T{i}"}).json()["id"] for i in range(3)]
+    first = client.get("/api/v1/tasks/changes", headers=headers).json()
+    assert [task["id"] for task in first["upserted"]] == ids
+    assert (first["deleted"], first["has_more"]) == ([], False)
+
+    client.patch(f"/api/v1/tasks/{ids[0]}", headers=headers, json={"completed": True})
+    client.delete(f"/api/v1/tasks/{ids[1]}", headers=headers)
+    client.request("DELETE", "/api/v1/tasks/bulk", headers=headers, json=[ids[2]])
+    url = f"/api/v1/tasks/changes?since={first['sync_token']}"
+    page = client.get(f"{url}&limit=2", headers=headers).json()
+    assert [(task["id"], task["completed"]) for task in page["upserted"]] == [(ids[0], True)]
+    assert [deletion["id"] for deletion in page["deleted"]] == [ids[1]]
+    assert page["has_more"] is True
+    rest = client.get(f"/api/v1/tasks/changes?since={page['sync_token']}", headers=headers).json()
+    assert ([deletion["id"] for deletion in rest["deleted"]], rest["has_more"]) == ([ids[2]], False)
+    # Nothing new: the token stays put.
+    idle = client.get(f"/api/v1/tasks/changes?since={rest['sync_token']}", headers=headers).json()
+    assert (idle["upserted"], idle["deleted"], idle["sync_token"]) == ([], [], rest["sync_token"])
+    assert client.get("/api/v1/tasks/changes?since=bogus", headers=headers).status_code == 400
+
+    with capture_queries(engine) as queries:
+        client.get(url, headers=headers)
+    [(statement, parameters)] = [query for query in queries if "UNION ALL" in query[0]]
+    plan = explain_query_plan(engine, statement, parameters)
+    assert "SEARCH tasks USING INDEX ix_tasks_owner_id_change_seq (owner_id=? AND change_seq>?)" in plan
+    assert not any(step.startswith("SCAN") or "TEMP B-TREE" in step for step in plan), plan
+
+def test_task_change_feed_keeps_deletes_of_reused_ids():
+    headers = get_auth_header()
+    ids = [client.post("/api/v1/tasks/", headers=headers, json={"title": f"T{i}"}).json()["id"] for i in range(2)]
+    token = client.get("/api/v1/tasks/changes", headers=headers).json()["sync_token"]
+    client.delete(f"/api/v1/tasks/{ids[1]}", headers=headers)
+    # SQLite hands the deleted (highest) id to the next task, here another owner's.
+    client.post("/api/v1/users/", json={"email": "other@example.com", "password": "otherpassword"})
+    other = client.post("/api/v1/token", data={"username": "other@example.com", "password": "otherpassword"}).json()
+    other_headers = {"Authorization": f"Bearer {other['access_token']}"}
+    reused = client.post("/api/v1/tasks/", headers=other_headers, json={"title": "Reused"}).json()["id"]
+    assert reused == ids[1]
+    client.delete(f"/api/v1/tasks/{reused}", headers=other_headers)
+
+    mine = client.get(f"/api/v1/tasks/changes?since={token}", headers=headers).json()
+    assert [deletion["id"] for deletion in mine["deleted"]] == [ids[1]]
+    theirs = client.get("/api/v1/tasks/changes", headers=other_headers).json()
+    assert [deletion["id"] for deletion in theirs["deleted"]] == [reused]
+
+def test_install_task_changes_rekeys_tombstones():
+    headers = get_auth_header()
+    task_id = client.post("/api/v1/tasks/", headers=headers, json={"title": "Gone"}).json()["id"]
+    client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+    # Tombstones keyed by task id alone, as first shipped.
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TRIGGER task_changes_ad")
+        connection.exec_driver_sql("DROP INDEX ix_task_tombstones_owner_id_change_seq")
+        connection.exec_driver_sql("ALTER TABLE task_tombstones RENAME TO current_tombstones")
+        connection.exec_driver_sql(
+            "CREATE TABLE task_tombstones (id INTEGER PRIMARY KEY, owner_id INTEGER NOT NULL, "
+            "change_seq INTEGER NOT NULL, deleted_at DATETIME NOT NULL)"
+        )
+        connection.exec_driver_sql("INSERT INTO task_tombstones SELECT id, owner_id, change_seq, deleted_at "
+                                   "FROM current_tombstones")
+        connection.exec_driver_sql("DROP TABLE current_tombstones")
+        connection.exec_driver_sql(
+            "CREATE TRIGGER task_changes_ad AFTER DELETE ON tasks BEGIN "
+            "INSERT INTO task_tombstones(id, owner_id, change_seq, deleted_at) VALUES (old.id, old.owner_id, 0, 0) "
+            "ON CONFLICT(id) DO UPDATE SET owner_id = excluded.owner_id; END"
+        )
+    with engine.begin() as connection:
+        models.install_task_changes(connection)
+        models.install_task_changes(connection)
+    other = client.post("/api/v1/tasks/", headers=headers, json={"title": "Also gone"}).json()["id"]
+    client.delete(f"/api/v1/tasks/{other}", headers=headers)
+    feed = client.get("/api/v1/tasks/changes", headers=headers).json()
+    assert sorted(deletion["id"] for deletion in feed["deleted"]) == sorted({task_id, other})
+    with engine.connect() as connection:
+        key = connection.exec_driver_sql(
+            "SELECT name FROM pragma_table_info('task_tombstones') WHERE pk > 0 ORDER BY pk"
+        ).scalars().all()
+    assert key == ["owner_id", "id"]
+
+def test_install_task_changes_numbers_existing_rows():
+    headers = get_auth_header()
+    ids = [client.post("/api/v1/tasks/", headers=headers, json={"title": f"T{i}"}).json()["id"] for i in range(2)]
+    # A database from before the change feed: no column, no triggers.
+    with engine.begin() as connection:
+        for suffix in ("ai", "au", "ad"):
+            connection.exec_driver_sql(f"DROP TRIGGER task_changes_{suffix}")
+        connection.exec_driver_sql("DROP INDEX ix_tasks_owner_id_change_seq")
+        connection.exec_driver_sql("ALTER TABLE tasks DROP COLUMN change_seq")
+    with engine.begin() as connection:
+        models.install_task_changes(connection)
+        models.install_task_changes(connection)
+    first = client.get("/api/v1/tasks/changes", headers=headers).json()
+    assert [task["id"] for task in first["upserted"]] == ids
+    client.patch(f"/api/v1/tasks/{ids[0]}", headers=headers, json={"title": "Renamed"})
+    later = client.get(f"/api/v1/tasks/changes?since={first['sync_token']}", headers=headers).json()
+    assert [task["title"] for task in later["upserted"]] == ["Renamed"]
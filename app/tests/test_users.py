@@ -1,17 +1,22 @@
 # /app/tests/test_users.py
+import asyncio
+import threading
+
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
 from app.database import Base, get_db
 from app.models import User
+from app.core.admission import client_rate_limiter, user_rate_limiter
+from app.tests.utils import assert_num_queries
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_users.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base.metadata.create_all(bind=engine)
 
@@ -22,15 +27,22 @@ def override_get_db():
     finally:
         db.close()
 
-app.dependency_overrides[get_db] = override_get_db
-
 client = TestClient(app)
 
+_previous_override = None
+
 def setup_function():
+    global _previous_override
+    _previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
 
 def teardown_function():
     Base.metadata.drop_all(bind=engine)
+    if _previous_override is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = _previous_override
 
 def test_create_user():
     response = client.post(
@@ -74,3 +86,89 @@ def test_read_users_me():
     assert response.status_code == 200, response.text
     data = response.json()
     assert data["email"] == "me@example.com"
+
+def test_login_returns_503_when_password_hasher_busy(monkeypatch):
+    from app.core import security
+
+    client.post(
+        "/api/v1/users/",
+        json={"email": "busy@example.com", "password": "busypassword"},
+    )
+    hasher = security.PasswordHasher(max_workers=1, max_pending=1)
+    monkeypatch.setattr(security, "password_hasher", hasher)
+    # Hold the hasher's only slot with a call that blocks until released.
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    holder = threading.Thread(target=asyncio.run, args=(hasher.run(hold),))
+    holder.start()
+    try:
+        assert started.wait(5)
+        response = client.post(
+            "/api/v1/token",
+            data={"username": "busy@example.com", "password": "busypassword"},
+        )
+    finally:
+        release.set()
+        holder.join()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert hasher.rejected == 1
+
+def get_auth_header(email="tasks@example.com"):
+    client.post("/api/v1/users/", json={"email": email, "password": "taskspassword"})
+    login_response = client.post("/api/v1/token", data={"username": email, "password": "taskspassword"})
+    return {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+def test_read_users_me_does_not_load_tasks_by_default():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/bulk", headers=headers, json=[{"title": f"Task {i}"} for i in range(5)])
+
+    with assert_num_queries(engine, 1):
+        response = client.get("/api/v1/users/me/", headers=headers)
+    assert response.status_code == 200, response.text
+    assert "tasks" not in response.json()
+
+def test_read_users_me_include_tasks_is_bounded():
+    headers = get_auth_header()
+    client.post("/api/v1/tasks/bulk", headers=headers, json=[{"title": f"Task {i}"} for i in range(5)])
+
+    with assert_num_queries(engine, 2):
+        response = client.get("/api/v1/users/me/", headers=headers, params={"include_tasks": 3})
+    assert response.status_code == 200, response.text
+    assert [t["title"] for t in response.json()["tasks"]] == ["Task 0", "Task 1", "Task 2"]
+
+def test_create_user_query_count():
+    with assert_num_queries(engine, 1):
+        response = client.post("/api/v1/users/", json={"email": "count@example.com", "password": "countpassword"})
+    assert response.status_code == 201, response.text
+    assert "tasks" not in response.json()
+
+def test_create_user_duplicate_email():
+    client.post("/api/v1/users/", json={"email": "dup@example.com", "password": "duppassword"})
+    response = client.post("/api/v1/users/", json={"email": "dup@example.com", "password": "otherpassword"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+def test_login_is_rate_limited_per_client(monkeypatch):
+    # Slow enough that hashing the password does not refill the bucket.
+    monkeypatch.setattr(client_rate_limiter, "rate", 0.01)
+    monkeypatch.setattr(client_rate_limiter, "burst", 2)
+    client.post("/api/v1/users/", json={"email": "limited@example.com", "password": "password"})
+    form = {"username": "limited@example.com", "password": "password"}
+    assert client.post("/api/v1/token", data=form).status_code == 200
+    response = client.post("/api/v1/token", data=form)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+def test_authenticated_routes_are_rate_limited_per_user(monkeypatch):
+    client.post("/api/v1/users/", json={"email": "busy@example.com", "password": "password"})
+    token = client.post("/api/v1/token", data={"username": "busy@example.com", "password": "password"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    monkeypatch.setattr(user_rate_limiter, "rate", 0.01)
+    monkeypatch.setattr(user_rate_limiter, "burst", 2)
+    assert [client.get("/api/v1/users/me/", headers=headers).status_code for _ in range(3)] == [200, 200, 429]
+    assert user_rate_limiter.rejected >= 1
@@ -0,0 +1,51 @@
+# /app/tests/utils.py
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect the SQL statements ``engine`` executes inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def assert_num_queries(engine, expected):
+    """Fail if the block does not run exactly ``expected`` statements on ``engine``."""
+    with count_queries(engine) as statements:
+        yield statements
+    assert len(statements) == expected, (
+        f"expected {expected} queries, got {len(statements)}:\n" + "\n".join(statements)
+    )
+
+
+@contextmanager
+def capture_queries(engine):
+    """Like ``count_queries`` but collect ``(statement, parameters)`` pairs."""
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain_query_plan(engine, statement, parameters=()):
+    """SQLite's EXPLAIN QUERY PLAN for ``statement``: one detail line per step."""
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
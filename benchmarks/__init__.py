@@ -0,0 +1,4 @@
+"""In-process load/benchmark suite for the Task Manager API.
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
@@ -0,0 +1,106 @@
+# /benchmarks/__main__.py
+"""Seed a SQLite database and load-test every API route in-process.
+
+Examples (from the repository root)::
+
+    python -m benchmarks --users 50 --tasks 20000 --output sync.json
+    python -m benchmarks --database-mode async --baseline sync.json --max-regression 0.2
+    python -m benchmarks --sqlite-profile default --output default.json
+    python -m benchmarks --sqlite-profile performance --baseline default.json
+    python -m benchmarks --backend memory --baseline sync.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="users to seed (default: 20)")
+    parser.add_argument("--tasks", type=int, default=5000, help="tasks to seed in total (default: 5000)")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 10, 50],
+                        help="comma-separated concurrency levels (default: 1,10,50)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route and level (default: 200)")
+    parser.add_argument("--auth-requests", type=int, default=20,
+                        help="requests per level for the bcrypt-bound routes (default: 20)")
+    parser.add_argument("--bulk-size", type=int, default=50, help="items per bulk request (default: 50)")
+    parser.add_argument("--routes", nargs="*", help="only run routes whose name contains one of these")
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db",
+                        help="database to seed and serve from; it is recreated (default: sqlite:///./benchmark.db)")
+    parser.add_argument("--database-mode", choices=("sync", "async"), help="overrides DATABASE_MODE")
+    parser.add_argument("--sqlite-profile", help="overrides SQLITE_PROFILE (default, wal, performance)")
+    parser.add_argument("--backend", choices=("sql", "memory"), default="sql",
+                        help="serve from the database (sql) or an in-memory repository loaded with the "
+                        "seeded rows (memory); default: sql")
+    parser.add_argument("--with-limits", action="store_true",
+                        help="keep the admission and rate limits on (off by default: they would cap the load)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="fail if p95 or throughput is worse than the baseline by this fraction (e.g. 0.2)")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if any route's p95 exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="fail if any route's error fraction exceeds this")
+    args = parser.parse_args(argv)
+    if args.users < 1 or args.tasks < args.users:
+        parser.error("need at least one user and at least one task per user")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Settings are read when the app is imported, so configure it first.
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.database_mode:
+        os.environ["DATABASE_MODE"] = args.database_mode
+    if args.sqlite_profile:
+        os.environ["SQLITE_PROFILE"] = args.sqlite_profile
+    if not args.with_limits:
+        for name in ("ADMISSION_MAX_IN_FLIGHT", "RATE_LIMIT_USER_PER_SECOND", "RATE_LIMIT_IP_PER_SECOND"):
+            os.environ[name] = "0"
+        os.environ["ADMISSION_ROUTE_LIMITS"] = "{}"
+
+    from .report import compare_reports, format_comparison, format_table, load_report, save_report
+    from .runner import run_benchmark
+
+    def progress(row):
+        print(f"  {row['route']:<40} c={row['concurrency']:<4} {row['throughput_rps']:>9.1f} req/s "
+              f"p95={row['p95_ms']:.2f} ms", file=sys.stderr)
+
+    report = asyncio.run(run_benchmark(
+        users=args.users,
+        tasks=args.tasks,
+        concurrency_levels=args.concurrency,
+        requests=args.requests,
+        auth_requests=args.auth_requests,
+        bulk_size=args.bulk_size,
+        routes=args.routes,
+        progress=progress,
+        backend_name=args.backend,
+    ))
+    print(format_table(report["results"]))
+    if args.output:
+        save_report(report, args.output)
+
+    baseline = load_report(args.baseline) if args.baseline else {}
+    if baseline:
+        print()
+        print(format_comparison(baseline, report))
+    failures = compare_reports(
+        baseline,
+        report,
+        max_regression=args.max_regression,
+        max_p95_ms=args.max_p95_ms,
+        max_error_rate=args.max_error_rate,
+    )
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# /benchmarks/report.py
+import json
+import math
+import platform
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (0 < pct <= 100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(route: str, concurrency: int, latencies: Sequence[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Build one result row; ``latencies`` (one per request, failed ones
+    included) and ``elapsed`` are in seconds."""
+    count = len(latencies)
+    return {
+        "route": route,
+        "concurrency": concurrency,
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def build_report(results: List[Dict[str, Any]], meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "meta": {
+            **meta,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+
+
+def save_report(report: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+        fh.write("\n")
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    header = f"{'route':<40} {'conc':>5} {'reqs':>6} {'err':>4} {'rps':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    lines = [header, "-" * len(header)]
+    for row in results:
+        lines.append(
+            f"{row['route']:<40} {row['concurrency']:>5} {row['requests']:>6} {row['errors']:>4} "
+            f"{row['throughput_rps']:>10.1f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def _describe(report: Dict[str, Any]) -> str:
+    meta = report.get("meta", {})
+    profile = meta.get("storage", {}).get("profile", "?")
+    return f"{meta.get('database_mode', '?')}/{profile}"
+
+
+def format_comparison(baseline: Dict[str, Any], current: Dict[str, Any]) -> str:
+    """Side-by-side throughput and p95 per (route, concurrency), with the change in %."""
+    previous = {(row["route"], row["concurrency"]): row for row in baseline.get("results", [])}
+    header = (
+        f"{'route':<40} {'conc':>5} {'rps before':>11} {'rps after':>10} {'change':>8} "
+        f"{'p95 before':>11} {'p95 after':>10} {'change':>8}"
+    )
+    lines = [f"baseline {_describe(baseline)} -> current {_describe(current)}", header, "-" * len(header)]
+    for row in current["results"]:
+        before = previous.get((row["route"], row["concurrency"]))
+        if before is None:
+            continue
+        lines.append(
+            f"{row['route']:<40} {row['concurrency']:>5} "
+            f"{before['throughput_rps']:>11.1f} {row['throughput_rps']:>10.1f} "
+            f"{_change(before['throughput_rps'], row['throughput_rps']):>8} "
+            f"{before['p95_ms']:>11.2f} {row['p95_ms']:>10.2f} {_change(before['p95_ms'], row['p95_ms']):>8}"
+        )
+    return "\n".join(lines)
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    max_regression: Optional[float] = None,
+    max_p95_ms: Optional[float] = None,
+    max_error_rate: Optional[float] = None,
+) -> List[str]:
+    """Return a list of threshold violations (empty when the run passes).
+
+    ``max_regression`` is a fraction: 0.2 fails a (route, concurrency) pair
+    whose p95 grew, or whose throughput fell, by more than 20% against the
+    baseline. ``max_p95_ms`` is an absolute ceiling for every row and
+    ``max_error_rate`` the allowed fraction of failed requests. Pass an empty
+    ``baseline`` to check only the absolute thresholds.
+    """
+    failures = []
+    previous = {(row["route"], row["concurrency"]): row for row in baseline.get("results", [])}
+    for row in current["results"]:
+        label = f"{row['route']} @ c={row['concurrency']}"
+        if max_error_rate is not None and row["requests"] and row["errors"] / row["requests"] > max_error_rate:
+            failures.append(f"{label}: {row['errors']}/{row['requests']} failed requests")
+        if max_p95_ms is not None and row["p95_ms"] > max_p95_ms:
+            failures.append(f"{label}: p95 {row['p95_ms']:.2f} ms > {max_p95_ms:.2f} ms")
+        before = previous.get((row["route"], row["concurrency"]))
+        if before is None or max_regression is None:
+            continue
+        if before["p95_ms"] > 0 and row["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            failures.append(f"{label}: p95 {before['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms")
+        if before["throughput_rps"] > 0 and row["throughput_rps"] < before["throughput_rps"] * (1 - max_regression):
+            failures.append(
+                f"{label}: throughput {before['throughput_rps']:.1f} -> {row['throughput_rps']:.1f} req/s"
+            )
+    return failures
@@ -0,0 +1,105 @@
+# /benchmarks/runner.py
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from app import backend, crud
+from app.core.config import settings
+from app.database import SessionLocal, get_storage_report
+from app.main import app
+from app.repository import MemoryRepository
+
+from .report import build_report, summarize
+from .scenarios import SCENARIOS, Context, Scenario
+from .seed import seed_database
+
+# What the routes read and write through (app.backend.store): "sql" is
+# app.crud on the seeded database, "memory" a MemoryRepository loaded with
+# the same rows, which leaves the database out of the measurement.
+BACKENDS = ("sql", "memory")
+
+
+def memory_backend() -> MemoryRepository:
+    repository = MemoryRepository(notify=True)
+    with SessionLocal() as db:
+        repository.load(crud.get_users(db, limit=None), crud.get_tasks(db, limit=None))
+    return repository
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, ctx: Context, concurrency: int, requests: int
+) -> Dict[str, Any]:
+    if scenario.setup is not None:
+        scenario.setup(ctx, requests)
+    latencies: List[float] = []
+    errors = 0
+    numbers = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        # Workers share one iterator, so each request number is sent once.
+        for i in numbers:
+            request = scenario.build(ctx, i)
+            start = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code not in scenario.expected:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return summarize(scenario.name, concurrency, latencies, errors, elapsed)
+
+
+async def run_benchmark(
+    users: int,
+    tasks: int,
+    concurrency_levels: Sequence[int],
+    requests: int,
+    auth_requests: int,
+    bulk_size: int = 50,
+    routes: Optional[Sequence[str]] = None,
+    progress=None,
+    backend_name: str = "sql",
+) -> Dict[str, Any]:
+    """Seed the configured database, then drive every selected route through
+    the ASGI app at each concurrency level. Returns a report dict."""
+    if backend_name not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend_name!r}")
+    seeded = seed_database(users, tasks)
+    ctx = Context(users=seeded, bulk_size=bulk_size)
+    scenarios = [s for s in SCENARIOS if not routes or any(r in s.name for r in routes)]
+    results = []
+
+    transport = httpx.ASGITransport(app=app)
+    previous = backend.use(memory_backend()) if backend_name == "memory" else None
+    try:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                for scenario in scenarios:
+                    for concurrency in concurrency_levels:
+                        count = auth_requests if scenario.auth_bound else requests
+                        row = await run_scenario(client, scenario, ctx, concurrency, count)
+                        results.append(row)
+                        if progress is not None:
+                            progress(row)
+    finally:
+        if previous is not None:
+            backend.use(previous)
+
+    meta = {
+        "users": users,
+        "tasks": tasks,
+        "requests": requests,
+        "auth_requests": auth_requests,
+        "bulk_size": bulk_size,
+        "concurrency": list(concurrency_levels),
+        "database_url": settings.DATABASE_URL,
+        "database_mode": settings.DATABASE_MODE,
+        "backend": backend_name,
+        "storage": get_storage_report(refresh=True),
+    }
+    return build_report(results, meta)
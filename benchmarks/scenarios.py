@@ -0,0 +1,218 @@
+# /benchmarks/scenarios.py
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+from app import backend, crud, etags, models, schemas
+from app.core.response_cache import task_list_cache
+from app.database import SessionLocal, engine
+from app.pagination import encode_cursor
+from app.routers.tasks import page_params
+
+from .seed import PASSWORD, SeedUser
+
+API = "/api/v1"
+
+
+@dataclass
+class Context:
+    users: List[SeedUser]
+    bulk_size: int = 50
+    # Per-scenario lists of throwaway task ids (or other prepared values),
+    # indexed by request number.
+    disposable: Dict[str, List[Any]] = field(default_factory=dict)
+
+    def user(self, i: int) -> SeedUser:
+        return self.users[i % len(self.users)]
+
+    def auth(self, i: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.user(i).token}"}
+
+    def owned_task(self, i: int) -> int:
+        task_ids = self.user(i).task_ids
+        return task_ids[(i // len(self.users)) % len(task_ids)]
+
+
+Request = Dict[str, Any]
+
+
+@dataclass
+class Scenario:
+    """One route under load: ``build`` turns a request number into httpx kwargs."""
+
+    name: str
+    build: Callable[[Context, int], Request]
+    expected: Tuple[int, ...] = (200,)
+    # Runs untimed before each concurrency level with the number of requests.
+    setup: Optional[Callable[[Context, int], None]] = None
+    # bcrypt-bound routes run a smaller request count (--auth-requests).
+    auth_bound: bool = False
+
+
+def _insert_disposable_tasks(ctx: Context, key: str, requests: int, per_request: int) -> None:
+    if backend.store is not crud:
+        # The in-memory repository (--backend memory) is not behind the database.
+        ctx.disposable[key] = [
+            [task.id for task in backend.store.create_user_tasks(
+                None, [schemas.TaskCreate(title=f"Disposable {key} {i}")] * per_request, ctx.user(i).id
+            )]
+            for i in range(requests)
+        ]
+        return
+    rows = []
+    for i in range(requests):
+        rows.extend({"title": f"Disposable {key} {i}", "owner_id": ctx.user(i).id} for _ in range(per_request))
+    with engine.begin() as conn:
+        ids = conn.execute(insert(models.Task).returning(models.Task.id), rows).scalars().all()
+    # Written behind crud's back, so drop the owners' cached listings here.
+    for user in ctx.users:
+        task_list_cache.invalidate(user.id)
+    ids = sorted(ids)
+    ctx.disposable[key] = [ids[i * per_request:(i + 1) * per_request] for i in range(requests)]
+
+
+def _setup_delete(ctx: Context, requests: int) -> None:
+    _insert_disposable_tasks(ctx, "delete", requests, 1)
+
+
+def _setup_bulk_delete(ctx: Context, requests: int) -> None:
+    _insert_disposable_tasks(ctx, "bulk_delete", requests, ctx.bulk_size)
+
+
+def _setup_list_not_modified(ctx: Context, requests: int) -> None:
+    # The ETag a client polling the first page would hold right now.
+    with SessionLocal() as db:
+        by_user = {}
+        for user in ctx.users:
+            version = backend.store.get_task_list_version(db, owner_id=user.id)
+            by_user[user.id] = etags.list_etag(
+                user.id, version.count, (version.created_at, version.updated_at), *page_params(limit=100)
+            )
+    ctx.disposable["list_etag"] = [by_user[ctx.user(i).id] for i in range(requests)]
+
+
+def _setup_changes(ctx: Context, requests: int) -> None:
+    # A client that synced shortly before: only the last writes are new to it.
+    with SessionLocal() as db:
+        if backend.store is crud:
+            last = db.scalar(select(models.TaskChangeSequence.value)) or 0
+        else:
+            last = max((task.change_seq for task in backend.store.get_tasks(db, limit=None)), default=0)
+    ctx.disposable["changes_token"] = [encode_cursor({"seq": max(last - 100, 0)})] * requests
+
+
+def _list_page(ctx: Context, i: int) -> Request:
+    depth = len(ctx.user(i).task_ids)
+    return {"method": "GET", "url": f"{API}/tasks/", "headers": ctx.auth(i),
+            "params": {"skip": (i * 100) % max(depth, 1), "limit": 100}}
+
+
+def _list_cursor(ctx: Context, i: int) -> Request:
+    return {"method": "GET", "url": f"{API}/tasks/", "headers": ctx.auth(i),
+            "params": {"after": encode_cursor({"id": ctx.owned_task(i) - 1}), "limit": 100}}
+
+
+def _bulk_update(ctx: Context, i: int) -> Request:
+    task_ids = ctx.user(i).task_ids[:ctx.bulk_size]
+    return {"method": "PUT", "url": f"{API}/tasks/bulk", "headers": ctx.auth(i),
+            "json": [{"id": task_id, "title": f"Bulk updated {i}", "priority": i % 5 + 1} for task_id in task_ids]}
+
+
+SCENARIOS = [
+    Scenario("GET /api/v1/health", lambda ctx, i: {"method": "GET", "url": f"{API}/health"}),
+    Scenario("GET /api/v1/metrics", lambda ctx, i: {"method": "GET", "url": f"{API}/metrics"}),
+    Scenario(
+        "POST /api/v1/token",
+        lambda ctx, i: {"method": "POST", "url": f"{API}/token",
+                        "data": {"username": ctx.user(i).email, "password": PASSWORD}},
+        auth_bound=True,
+    ),
+    Scenario(
+        "POST /api/v1/users/",
+        lambda ctx, i: {"method": "POST", "url": f"{API}/users/",
+                        "json": {"email": f"bench-new-{uuid.uuid4().hex}@example.com", "password": PASSWORD}},
+        expected=(201,),
+        auth_bound=True,
+    ),
+    Scenario("GET /api/v1/users/me/", lambda ctx, i: {"method": "GET", "url": f"{API}/users/me/", "headers": ctx.auth(i)}),
+    Scenario(
+        "GET /api/v1/users/me/?include_tasks=",
+        lambda ctx, i: {"method": "GET", "url": f"{API}/users/me/", "headers": ctx.auth(i),
+                        "params": {"include_tasks": 50}},
+    ),
+    Scenario("GET /api/v1/tasks/", _list_page),
+    Scenario("GET /api/v1/tasks/?after=", _list_cursor),
+    Scenario(
+        "GET /api/v1/tasks/?fields=",
+        lambda ctx, i: {**_list_page(ctx, i), "params": {**_list_page(ctx, i)["params"], "fields": "id,title,completed"}},
+    ),
+    Scenario(
+        "GET /api/v1/tasks/?sort=",
+        lambda ctx, i: {**_list_page(ctx, i), "params": {**_list_page(ctx, i)["params"], "completed": "false",
+                                                          "sort": "-priority,created_at"}},
+    ),
+    Scenario(
+        "GET /api/v1/tasks/ (If-None-Match)",
+        lambda ctx, i: {"method": "GET", "url": f"{API}/tasks/", "params": {"limit": 100},
+                        "headers": {**ctx.auth(i), "If-None-Match": ctx.disposable["list_etag"][i]}},
+        expected=(304,),
+        setup=_setup_list_not_modified,
+    ),
+    Scenario(
+        "GET /api/v1/tasks/search",
+        lambda ctx, i: {"method": "GET", "url": f"{API}/tasks/search", "headers": ctx.auth(i),
+                        "params": {"q": ("task", "bench", "load test", f"number {i}")[i % 4]}},
+    ),
+    Scenario(
+        "GET /api/v1/tasks/changes?since=",
+        lambda ctx, i: {"method": "GET", "url": f"{API}/tasks/changes", "headers": ctx.auth(i),
+                        "params": {"since": ctx.disposable["changes_token"][i]}},
+        setup=_setup_changes,
+    ),
+    Scenario("GET /api/v1/tasks/stats", lambda ctx, i: {"method": "GET", "url": f"{API}/tasks/stats", "headers": ctx.auth(i)}),
+    Scenario(
+        "GET /api/v1/tasks/{task_id}",
+        lambda ctx, i: {"method": "GET", "url": f"{API}/tasks/{ctx.owned_task(i)}", "headers": ctx.auth(i)},
+    ),
+    Scenario(
+        "POST /api/v1/tasks/",
+        lambda ctx, i: {"method": "POST", "url": f"{API}/tasks/", "headers": ctx.auth(i),
+                        "json": {"title": f"Created {i}", "description": "Created under load", "priority": 2}},
+        expected=(201,),
+    ),
+    Scenario(
+        "PUT /api/v1/tasks/{task_id}",
+        lambda ctx, i: {"method": "PUT", "url": f"{API}/tasks/{ctx.owned_task(i)}", "headers": ctx.auth(i),
+                        "json": {"title": f"Updated {i}", "priority": i % 5 + 1}},
+    ),
+    Scenario(
+        "PATCH /api/v1/tasks/{task_id}",
+        lambda ctx, i: {"method": "PATCH", "url": f"{API}/tasks/{ctx.owned_task(i)}", "headers": ctx.auth(i),
+                        "json": {"completed": i % 2 == 0}},
+    ),
+    Scenario(
+        "DELETE /api/v1/tasks/{task_id}",
+        lambda ctx, i: {"method": "DELETE", "url": f"{API}/tasks/{ctx.disposable['delete'][i][0]}",
+                        "headers": ctx.auth(i)},
+        setup=_setup_delete,
+    ),
+    Scenario(
+        "POST /api/v1/tasks/bulk",
+        lambda ctx, i: {"method": "POST", "url": f"{API}/tasks/bulk", "headers": ctx.auth(i),
+                        "json": [{"title": f"Bulk {i}.{n}"} for n in range(ctx.bulk_size)]},
+        expected=(201,),
+    ),
+    Scenario("PUT /api/v1/tasks/bulk", _bulk_update),
+    Scenario(
+        "DELETE /api/v1/tasks/bulk",
+        lambda ctx, i: {"method": "DELETE", "url": f"{API}/tasks/bulk", "headers": ctx.auth(i),
+                        "json": ctx.disposable["bulk_delete"][i]},
+        setup=_setup_bulk_delete,
+    ),
+    Scenario(
+        "GET /api/v1/tasks/export",
+        lambda ctx, i: {"method": "GET", "url": f"{API}/tasks/export", "headers": ctx.auth(i)},
+    ),
+]
@@ -0,0 +1,66 @@
+# /benchmarks/seed.py
+from dataclasses import dataclass, field
+from typing import List
+
+from sqlalchemy import insert, select
+
+from app import models
+from app.core import security
+from app.database import Base, engine
+
+PASSWORD = "benchmark-password"
+CHUNK_SIZE = 10_000
+
+
+@dataclass
+class SeedUser:
+    id: int
+    email: str
+    token: str
+    task_ids: List[int] = field(default_factory=list)
+
+
+def user_email(index: int) -> str:
+    return f"bench-user-{index}@example.com"
+
+
+def seed_database(users: int, tasks: int) -> List[SeedUser]:
+    """Recreate the schema and insert ``users`` users owning ``tasks`` tasks in total.
+
+    Tasks are dealt round-robin, so every user owns about tasks / users of
+    them. All users share one bcrypt hash, computed once.
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    hashed_password = security.get_password_hash(PASSWORD)
+
+    with engine.begin() as conn:
+        conn.execute(
+            insert(models.User),
+            [{"email": user_email(i), "hashed_password": hashed_password, "is_active": True} for i in range(users)],
+        )
+        user_ids = conn.execute(select(models.User.id).order_by(models.User.id)).scalars().all()
+        for start in range(0, tasks, CHUNK_SIZE):
+            conn.execute(
+                insert(models.Task),
+                [
+                    {
+                        "title": f"Benchmark task {n}",
+                        "description": f"Seeded task number {n} for load testing",
+                        "priority": n % 5 + 1,
+                        "completed": n % 3 == 0,
+                        "owner_id": user_ids[n % users],
+                    }
+                    for n in range(start, min(start + CHUNK_SIZE, tasks))
+                ],
+            )
+        seeded = [
+            SeedUser(id=user_id, email=user_email(i), token=security.create_access_token(subject=user_email(i)))
+            for i, user_id in enumerate(user_ids)
+        ]
+        by_id = {user.id: user for user in seeded}
+        for task_id, owner_id in conn.execute(
+            select(models.Task.id, models.Task.owner_id).order_by(models.Task.id)
+        ):
+            by_id[owner_id].task_ids.append(task_id)
+    return seeded
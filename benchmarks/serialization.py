@@ -0,0 +1,96 @@
+# /benchmarks/serialization.py
+"""Compare the cost of rendering task pages: response_model vs the fast paths.
+
+``response_model`` is FastAPI's validate + dump + json.dumps, ``TypeAdapter``
+is app.serialization.to_json and ``rows_to_json`` the unvalidated orjson
+path the task routes use; ``speedup`` is response_model / rows_to_json.
+
+Example (from the repository root)::
+
+    python -m benchmarks.serialization --page-sizes 1,20,100 --repeat 500
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Sequence
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import models, schemas
+from app.serialization import rows_to_json, to_json
+
+
+def make_tasks(count: int) -> List[models.Task]:
+    """Detached ORM rows shaped like a real page (200-char descriptions)."""
+    now = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    return [
+        models.Task(id=i, title=f"Task {i}", description="x" * 200, priority=i % 5 + 1,
+                    completed=i % 2 == 0, created_at=now, updated_at=now, owner_id=1)
+        for i in range(1, count + 1)
+    ]
+
+
+def response_model_renderer(loop: asyncio.AbstractEventLoop) -> Callable[[List[models.Task]], bytes]:
+    """What FastAPI does for ``response_model=List[schemas.Task]`` and JSONResponse."""
+    field = create_response_field(name="Response_read_tasks", type_=List[schemas.Task])
+
+    def render(tasks: List[models.Task]) -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=tasks))
+        return JSONResponse(content).body
+
+    return render
+
+
+def _time_per_call(func: Callable[[], Any], repeat: int) -> float:
+    func()  # warm-up: builds and caches the validators
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(page_sizes: Sequence[int], repeat: int) -> List[Dict[str, Any]]:
+    rows = []
+    for size in page_sizes:
+        tasks = make_tasks(size)
+        loop = asyncio.new_event_loop()
+        try:
+            response_model = response_model_renderer(loop)
+            before = _time_per_call(lambda: response_model(tasks), repeat)
+        finally:
+            loop.close()
+        validated = _time_per_call(lambda: to_json(List[schemas.Task], tasks), repeat)
+        after = _time_per_call(lambda: rows_to_json(schemas.Task, tasks), repeat)
+        rows.append({
+            "page_size": size,
+            "response_model_us": round(before * 1e6, 1),
+            "type_adapter_us": round(validated * 1e6, 1),
+            "rows_to_json_us": round(after * 1e6, 1),
+            "speedup": round(before / after, 2) if after > 0 else 0.0,
+        })
+    return rows
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    header = f"{'page size':>9} {'response_model us':>18} {'TypeAdapter us':>15} {'rows_to_json us':>16} {'speedup':>8}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(f"{row['page_size']:>9} {row['response_model_us']:>18.1f} {row['type_adapter_us']:>15.1f} "
+                     f"{row['rows_to_json_us']:>16.1f} {row['speedup']:>7.2f}x")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description=__doc__.splitlines()[0])
+    parser.add_argument("--page-sizes", default="1,20,100", help="comma-separated page sizes (default: 1,20,100)")
+    parser.add_argument("--repeat", type=int, default=300, help="renders per page size and path (default: 300)")
+    args = parser.parse_args(argv)
+    print(format_rows(run([int(v) for v in args.page_sizes.split(",") if v], args.repeat)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
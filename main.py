@@ -4,15 +4,18 @@ Exemplo profissional de API robusta com autenticação, validação e documenta
 """
 
 from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthCredentials
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime, timedelta
-import jwt
+from jose import ExpiredSignatureError, JWTError, jwt
 import hashlib
 from typing import Optional
 import os
 
+from app import schemas
+from app.repository import MemoryRepository
+
 # Configuração
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
@@ -124,10 +127,14 @@ class Task(TaskCreate):
 # BANCO DE DADOS EM MEMÓRIA (para exemplo)
 # ============================================================================
 
-users_db = {}
-tasks_db = {}
-user_counter = 0
-task_counter = 0
+# Usuários e tarefas ficam no repositório em memória (mesma interface de
+# app/crud.py), indexado por email e por dono; só o que o app.models não tem
+# (nome completo, data de cadastro, prioridade em texto) fica aqui.
+repository = MemoryRepository()
+profiles = {}
+
+PRIORITIES = {"low": 1, "medium": 2, "high": 3}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
 
 
 # ============================================================================
@@ -152,7 +159,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def verify_token(credentials: HTTPAuthCredentials) -> dict:
+def verify_token(credentials: HTTPAuthorizationCredentials) -> dict:
     """Verificar e decodificar token JWT"""
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
@@ -160,18 +167,53 @@ def verify_token(credentials: HTTPAuthCredentials) -> dict:
         if email is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
         return payload
-    except jwt.ExpiredSignatureError:
+    except ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token expirado"
         )
-    except jwt.InvalidTokenError:
+    except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido"
         )
 
 
+def current_user_id(credentials: HTTPAuthorizationCredentials) -> int:
+    """ID do usuário do token (busca pelo índice de email)"""
+    user = repository.get_user_by_email(None, verify_token(credentials)["sub"])
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return user.id
+
+
+def user_out(user) -> dict:
+    return {"id": user.id, "email": user.email, **profiles[user.id]}
+
+
+def task_out(task) -> dict:
+    return {
+        "id": task.id,
+        "user_id": task.owner_id,
+        "title": task.title,
+        "description": task.description,
+        "priority": PRIORITY_NAMES[task.priority],
+        "completed": task.completed,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at or task.created_at,
+    }
+
+
+def owned_task(task_id: int, user_id: int):
+    """Tarefa do usuário; 404 se não existe, 403 se é de outro usuário"""
+    task = repository.get_task(None, task_id)
+    if task is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if task.owner_id != user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    return task
+
+
 # ============================================================================
 # ENDPOINTS - AUTENTICAÇÃO
 # ============================================================================
@@ -185,27 +227,21 @@ async def register(user_data: UserCreate):
     - **password**: Senha com mínimo 8 caracteres
     - **full_name**: Nome completo do usuário
     """
-    global user_counter
-    
-    # Verificar se email já existe
-    if any(u["email"] == user_data.email for u in users_db.values()):
+    # None quando o email já existe (verificado pelo índice, sem varredura)
+    user = repository.create_user(
+        None,
+        schemas.UserCreate(email=user_data.email, password=user_data.password),
+        hashed_password=hash_password(user_data.password),
+    )
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email já registrado"
         )
     
-    user_counter += 1
-    user_id = user_counter
+    profiles[user.id] = {"full_name": user_data.full_name, "created_at": datetime.utcnow()}
     
-    users_db[user_id] = {
-        "id": user_id,
-        "email": user_data.email,
-        "password": hash_password(user_data.password),
-        "full_name": user_data.full_name,
-        "created_at": datetime.utcnow()
-    }
-    
-    return users_db[user_id]
+    return user_out(user)
 
 
 @app.post("/auth/login", response_model=TokenResponse)
@@ -217,13 +253,9 @@ async def login(email: str, password: str):
     - **password**: Senha do usuário
     """
     # Buscar usuário
-    user = None
-    for u in users_db.values():
-        if u["email"] == email:
-            user = u
-            break
+    user = repository.get_user_by_email(None, email)
     
-    if not user or user["password"] != hash_password(password):
+    if not user or user.hashed_password != hash_password(password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos"
@@ -232,7 +264,7 @@ async def login(email: str, password: str):
     # Criar token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user["email"]},
+        data={"sub": user.email},
         expires_delta=access_token_expires
     )
     
@@ -250,169 +282,94 @@ async def login(email: str, password: str):
 @app.post("/tasks", response_model=Task, status_code=status.HTTP_201_CREATED)
 async def create_task(
     task_data: TaskCreate,
-    credentials: HTTPAuthCredentials = Depends(security)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
     Criar nova tarefa (requer autenticação)
     """
-    global task_counter
-    
-    payload = verify_token(credentials)
-    
-    # Buscar ID do usuário
-    user_id = None
-    for u in users_db.values():
-        if u["email"] == payload["sub"]:
-            user_id = u["id"]
-            break
-    
-    task_counter += 1
-    task_id = task_counter
-    now = datetime.utcnow()
-    
-    tasks_db[task_id] = {
-        "id": task_id,
-        "user_id": user_id,
-        "title": task_data.title,
-        "description": task_data.description,
-        "priority": task_data.priority,
-        "completed": False,
-        "created_at": now,
-        "updated_at": now
-    }
+    user_id = current_user_id(credentials)
+    task = repository.create_user_task(
+        None,
+        schemas.TaskCreate(
+            title=task_data.title,
+            description=task_data.description,
+            priority=PRIORITIES[task_data.priority],
+        ),
+        user_id,
+    )
     
-    return tasks_db[task_id]
+    return task_out(task)
 
 
 @app.get("/tasks", response_model=list[Task])
-async def list_tasks(credentials: HTTPAuthCredentials = Depends(security)):
+async def list_tasks(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Listar tarefas do usuário autenticado
     """
-    payload = verify_token(credentials)
-    
-    # Buscar ID do usuário
-    user_id = None
-    for u in users_db.values():
-        if u["email"] == payload["sub"]:
-            user_id = u["id"]
-            break
+    user_id = current_user_id(credentials)
     
-    return [t for t in tasks_db.values() if t["user_id"] == user_id]
+    # Índice por dono: só as tarefas do usuário são lidas
+    tasks = repository.get_tasks_by_owner(None, user_id, limit=None)
+    return [task_out(task) for task in tasks]
 
 
 @app.get("/tasks/{task_id}", response_model=Task)
-async def get_task(task_id: int, credentials: HTTPAuthCredentials = Depends(security)):
+async def get_task(task_id: int, credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Obter detalhes de uma tarefa específica
     """
-    payload = verify_token(credentials)
-    
-    if task_id not in tasks_db:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    
-    task = tasks_db[task_id]
-    
-    # Verificar se pertence ao usuário
-    user_id = None
-    for u in users_db.values():
-        if u["email"] == payload["sub"]:
-            user_id = u["id"]
-            break
-    
-    if task["user_id"] != user_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    
-    return task
+    return task_out(owned_task(task_id, current_user_id(credentials)))
 
 
 @app.put("/tasks/{task_id}", response_model=Task)
 async def update_task(
     task_id: int,
     task_data: TaskCreate,
-    credentials: HTTPAuthCredentials = Depends(security)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
     Atualizar uma tarefa
     """
-    payload = verify_token(credentials)
-    
-    if task_id not in tasks_db:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    
-    task = tasks_db[task_id]
-    
-    # Verificar se pertence ao usuário
-    user_id = None
-    for u in users_db.values():
-        if u["email"] == payload["sub"]:
-            user_id = u["id"]
-            break
-    
-    if task["user_id"] != user_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    user_id = current_user_id(credentials)
+    owned_task(task_id, user_id)
     
-    task.update({
+    task = repository.update_user_task(None, task_id, user_id, {
         "title": task_data.title,
         "description": task_data.description,
-        "priority": task_data.priority,
-        "updated_at": datetime.utcnow()
+        "priority": PRIORITIES[task_data.priority],
     })
+    if task is None:
+        # Excluída entre a verificação e a escrita
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     
-    return task
+    return task_out(task)
 
 
 @app.delete("/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(task_id: int, credentials: HTTPAuthCredentials = Depends(security)):
+async def delete_task(task_id: int, credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Deletar uma tarefa
     """
-    payload = verify_token(credentials)
-    
-    if task_id not in tasks_db:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    
-    task = tasks_db[task_id]
-    
-    # Verificar se pertence ao usuário
-    user_id = None
-    for u in users_db.values():
-        if u["email"] == payload["sub"]:
-            user_id = u["id"]
-            break
-    
-    if task["user_id"] != user_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+    user_id = current_user_id(credentials)
+    owned_task(task_id, user_id)
     
-    del tasks_db[task_id]
+    repository.delete_user_task(None, task_id, user_id)
 
 
 @app.patch("/tasks/{task_id}/complete")
-async def complete_task(task_id: int, credentials: HTTPAuthCredentials = Depends(security)):
+async def complete_task(task_id: int, credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Marcar tarefa como completa
     """
-    payload = verify_token(credentials)
+    user_id = current_user_id(credentials)
+    owned_task(task_id, user_id)
     
-    if task_id not in tasks_db:
+    task = repository.update_user_task(None, task_id, user_id, {"completed": True})
+    if task is None:
+        # Excluída entre a verificação e a escrita
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
     
-    task = tasks_db[task_id]
-    
-    # Verificar se pertence ao usuário
-    user_id = None
-    for u in users_db.values():
-        if u["email"] == payload["sub"]:
-            user_id = u["id"]
-            break
-    
-    if task["user_id"] != user_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
-    
-    task["completed"] = True
-    task["updated_at"] = datetime.utcnow()
-    
-    return task
+    return task_out(task)
 
 
 # ============================================================================